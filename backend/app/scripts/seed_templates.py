@@ -7,7 +7,6 @@ Usage:
     python -m app.scripts.seed_templates
 """
 
-import json
 import os
 import sys
 from datetime import datetime
@@ -15,12 +14,15 @@ from pathlib import Path
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+# The extractor's src, for its serialization (compact/gzip/zstd JSON)
+sys.path.insert(0, str(Path(__file__).parent.parent.parent.parent / "src"))
 
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
 from app.db.database import SessionLocal, engine
 from app.db.models import WorkoutTemplate
+from cycling_workout_extractor import serialization
 
 
 def load_templates_from_json(file_path: str) -> list[dict]:
@@ -28,8 +30,8 @@ def load_templates_from_json(file_path: str) -> list[dict]:
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Templates file not found: {file_path}")
     
-    with open(file_path, 'r') as f:
-        data = json.load(f)
+    # The templates file may be compact, pretty or gzip/zstd framed.
+    data = serialization.load(file_path)
     
     templates = []
     
@@ -1,142 +1,588 @@
 from __future__ import annotations
 
+import argparse
+import logging
 import os
+import socket
+import subprocess
 import sys
+from typing import Any, Callable, Iterable, Iterator
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
 
-from cycling_workout_extractor.classifier import classify_workout_type
+from cycling_workout_extractor.archive import RawArchive
+from cycling_workout_extractor.checkpoint import Checkpoint
 from cycling_workout_extractor.config import load_config, setup_logging
-from cycling_workout_extractor.exporter import (
-    ensure_output_dirs,
-    write_json,
-    write_review_log,
-    write_summary_csv,
+from cycling_workout_extractor.corpus_store import CorpusStore
+from cycling_workout_extractor.exporter import SummaryWriter, ensure_output_dirs
+from cycling_workout_extractor.extractor import VIDEOS_BATCH_SIZE, iter_playlist_items
+from cycling_workout_extractor.instrumentation import Metrics
+from cycling_workout_extractor.manifest import Manifest, settings_fingerprint
+from cycling_workout_extractor.parser import fetch_transcript
+from cycling_workout_extractor.pipeline import (
+    TranscriptFetcher,
+    VideoResult,
+    iter_archived_metadata,
+    collect_results,
+    iter_video_metadata,
+    process_videos,
+    result_status,
+    triage_item,
 )
-from cycling_workout_extractor.extractor import (
-    build_youtube_client,
-    fetch_playlist_video_ids,
-    fetch_video_metadata,
+from cycling_workout_extractor.quota import (
+    QuotaExhausted,
+    QuotaScheduler,
+    ScheduledYouTube,
+    estimate_quota,
+    load_api_keys,
 )
-from cycling_workout_extractor.parser import (
-    parse_description_timestamps,
-    parse_transcript_intervals,
-)
-from cycling_workout_extractor.validator import is_probable_workout, validate_workout
+from cycling_workout_extractor.search import SearchIndex
+from cycling_workout_extractor.simulator import YouTubeSimulator
+from cycling_workout_extractor.utils import chunked
+from cycling_workout_extractor.workqueue import LEASED, PENDING, WorkQueue
+
 
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="extract",
+        choices=["extract", "reprocess", "enqueue", "work", "merge"],
+        help=(
+            "extract from the API, reprocess the raw archive offline, or run a "
+            "distributed crawl: enqueue (coordinator), work (workers), merge"
+        ),
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="estimate the API quota an extract run needs, without calling the API",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "dump a cProfile of the run and per-stage tracemalloc snapshots with "
+            "the run report; processes videos on one thread"
+        ),
+    )
+    parser.add_argument(
+        "--worker-id",
+        default=f"{socket.gethostname()}-{os.getpid()}",
+        help="lease owner name for the work command",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=1,
+        help="number of local worker processes for the work command",
+    )
+    args = parser.parse_args(argv)
 
-def main() -> int:
     config_path = os.getenv("CONFIG_PATH", "config.yaml")
     config = load_config(config_path)
     logger = setup_logging(config["output"]["processing_log"])
 
     ensure_output_dirs(config["output"])
+    if args.profile:
+        # The run's single profiler only sees every stage on one thread.
+        config["pipeline"]["workers"] = 1
+
+    if args.command == "reprocess":
+        return reprocess(config, logger, _build_metrics(config, args.profile))
+    if args.command == "enqueue":
+        return enqueue(config, logger)
+    if args.command == "work":
+        if args.processes > 1:
+            return spawn_workers(args.worker_id, args.processes, logger, args.profile)
+        return work(
+            config,
+            logger,
+            args.worker_id,
+            _build_metrics(config, args.profile, args.worker_id),
+        )
+    if args.command == "merge":
+        return merge(config, logger)
+    if args.dry_run:
+        return estimate(config, logger)
+    return extract(config, logger, _build_metrics(config, args.profile))
+
+
+def extract(
+    config: dict[str, Any], logger: logging.Logger, metrics: Metrics | None = None
+) -> int:
+    scheduler = _build_scheduler(config, logger)
+    if scheduler is None:
+        return 1
+    youtube = ScheduledYouTube(scheduler)
+
+    manifest = _load_manifest(config)
+    settings = settings_fingerprint(config)
+    checkpoint = _load_checkpoint(config, settings)
+    incremental = bool(config["pipeline"].get("incremental", False))
+
+    done_ids = checkpoint.completed_ids()
+    if done_ids:
+        logger.info("Resuming from checkpoint: %d videos already done", len(done_ids))
+    # Rows, payloads and results stream through; what grows with the
+    # catalogue is ID bookkeeping (seen_ids, done_ids, the manifest), on the
+    # order of a hundred bytes per video.
+    outputs = SummaryWriter.from_config(config)
+    outputs.start(checkpoint.results(), keep_previous=incremental)
+
+    archive = RawArchive.from_config(config)
+    transcript_fetcher = _transcript_fetcher(config)
+    if archive is not None:
+        transcript_fetcher = archive.cached_fetcher("transcript", transcript_fetcher)
+
+    seen_ids: set[str] = set()
+    candidate_ids = _iter_candidate_ids(
+        youtube,
+        config,
+        seen_ids,
+        done_ids,
+        lambda result: _record(result, manifest, checkpoint, settings, outputs),
+        metrics,
+    )
+    items = manifest.track(
+        iter_video_metadata(youtube, candidate_ids, archive, metrics),
+        settings,
+        skip_current=incremental,
+    )
+
+    try:
+        _process(
+            items,
+            config,
+            manifest,
+            checkpoint,
+            settings,
+            transcript_fetcher,
+            outputs,
+            metrics=metrics,
+        )
+    except QuotaExhausted:
+        logger.error("API quota exhausted; rerun to resume from the checkpoint")
+        outputs.close()
+        checkpoint.close()
+        manifest.save()
+        scheduler.save()
+        if archive is not None:
+            archive.save()
+        _write_report(config, metrics, logger)
+        return 1
+
+    logger.info("Found %d unique videos", len(seen_ids))
+    removed_ids = manifest.tombstone_missing(seen_ids)
+    if removed_ids:
+        logger.info("Tombstoned %d removed videos", len(removed_ids))
+        _drop_removed(config, removed_ids)
+
+    keep_ids = seen_ids - checkpoint.completed_ids() if incremental else set()
+    outputs.finish(*collect_results(checkpoint.results()), keep_ids)
+    manifest.save()
+    checkpoint.clear()
+    scheduler.save()
+    if archive is not None:
+        archive.save()
+    _write_report(config, metrics, logger)
+
+    logger.info("Quota remaining per key: %s", scheduler.remaining())
+    logger.info("Done")
+    return 0
+
+
+def estimate(config: dict[str, Any], logger: logging.Logger) -> int:
+    manifest = _load_manifest(config)
+    known = [entry for entry in manifest.entries.values() if not entry.get("removed")]
+    triaged = 0
+    if config["pipeline"].get("triage", False):
+        triaged = sum(1 for entry in known if entry.get("status") == "skipped")
+
+    usage = estimate_quota(len(config["playlists"]), len(known), triaged)
+    logger.info(
+        "Estimated quota for %d known videos: %d units (%s)",
+        len(known),
+        usage["total"],
+        ", ".join(f"{method}={units}" for method, units in usage.items() if method != "total"),
+    )
+
+    api_keys = load_api_keys(config)
+    if api_keys:
+        remaining = QuotaScheduler.from_config(config, api_keys).remaining()
+        logger.info(
+            "Remaining today across %d keys: %d units",
+            len(api_keys),
+            sum(remaining.values()),
+        )
+    return 0
+
+
+def reprocess(
+    config: dict[str, Any], logger: logging.Logger, metrics: Metrics | None = None
+) -> int:
+    archive = RawArchive.from_config(config)
+    if archive is None:
+        logger.error("Reprocessing needs archive.dir in the config")
+        return 1
+
+    manifest = _load_manifest(config)
+    settings = settings_fingerprint(config)
+    checkpoint = _load_checkpoint(config, settings)
+    done_ids = checkpoint.completed_ids()
+    video_ids = [
+        video_id
+        for video_id in archive.video_ids("metadata")
+        if not manifest.entries.get(video_id, {}).get("removed")
+        and video_id not in done_ids
+    ]
+    logger.info("Reprocessing %d archived videos", len(video_ids))
+    outputs = SummaryWriter.from_config(config)
+    outputs.start(checkpoint.results(), keep_previous=True)
+
+    items = manifest.track(
+        iter_archived_metadata(archive, video_ids), settings, skip_current=False
+    )
+    transcript_fetcher = archive.cached_fetcher(
+        "transcript", fetch_transcript, offline=True
+    )
+    _process(
+        items,
+        config,
+        manifest,
+        checkpoint,
+        settings,
+        transcript_fetcher,
+        outputs,
+        workers=1,
+        metrics=metrics,
+    )
+
+    # Videos settled without a metadata fetch (triaged non-workouts) have
+    # nothing archived, so their previous rows are carried over.
+    active_ids = {
+        video_id
+        for video_id, entry in manifest.entries.items()
+        if not entry.get("removed")
+    }
+    outputs.finish(
+        *collect_results(checkpoint.results()),
+        active_ids - checkpoint.completed_ids(),
+    )
+    manifest.save()
+    checkpoint.clear()
+    _write_report(config, metrics, logger)
+
+    logger.info("Done")
+    return 0
+
 
-    api_key_env = config["api"].get("key_env", "YOUTUBE_API_KEY")
-    api_key = os.getenv(api_key_env)
-    if not api_key:
-        logger.error("Missing API key in env var: %s", api_key_env)
+def enqueue(config: dict[str, Any], logger: logging.Logger) -> int:
+    scheduler = _build_scheduler(config, logger)
+    if scheduler is None:
         return 1
+    youtube = ScheduledYouTube(scheduler)
 
-    youtube = build_youtube_client(api_key)
+    queue = WorkQueue.from_config(config)
+    queue.reset()
+
+    seen_ids: set[str] = set()
+    settled: list[VideoResult] = []
+    candidate_ids = _iter_candidate_ids(
+        youtube, config, seen_ids, set(), settled.append
+    )
+    try:
+        for batch in chunked(candidate_ids, 500):
+            queue.enqueue(batch)
+    except QuotaExhausted:
+        logger.error("API quota exhausted while fetching playlists")
+        scheduler.save()
+        return 1
+
+    queue.complete_settled(settled)
+    scheduler.save()
+    logger.info(
+        "Queued %d of %d videos (%d settled by triage)",
+        len(seen_ids) - len(settled),
+        len(seen_ids),
+        len(settled),
+    )
+    return 0
+
+
+def work(
+    config: dict[str, Any],
+    logger: logging.Logger,
+    worker_id: str,
+    metrics: Metrics | None = None,
+) -> int:
+    scheduler = _build_scheduler(config, logger)
+    if scheduler is None:
+        return 1
+    youtube = ScheduledYouTube(scheduler)
+
+    queue = WorkQueue.from_config(config)
+    manifest = _load_manifest(config)
+    settings = settings_fingerprint(config)
+    incremental = bool(config["pipeline"].get("incremental", False))
+    workers = int(config["pipeline"].get("workers", 1))
+    batch_size = int(config.get("queue", {}).get("batch_size", VIDEOS_BATCH_SIZE))
+    archive = RawArchive.from_config(config)
+    transcript_fetcher = _transcript_fetcher(config)
+    if archive is not None:
+        transcript_fetcher = archive.cached_fetcher("transcript", transcript_fetcher)
+
+    processed = 0
+    while True:
+        batch = queue.claim(worker_id, batch_size)
+        if not batch:
+            break
+
+        items = manifest.track(
+            iter_video_metadata(youtube, batch, archive, metrics),
+            settings,
+            skip_current=incremental,
+        )
+        finished: set[str] = set()
+        try:
+            for result in process_videos(
+                items,
+                config,
+                workers=workers,
+                transcript_fetcher=transcript_fetcher,
+                metrics=metrics,
+            ):
+                if not queue.complete(
+                    worker_id, result, manifest.take_fingerprint(result[0])
+                ):
+                    logger.warning(
+                        "Lease on %s expired before it finished; discarding", result[0]
+                    )
+                finished.add(result[0])
+        except QuotaExhausted:
+            queue.release(worker_id, set(batch) - finished)
+            logger.error("API quota exhausted; worker %s stopping", worker_id)
+            scheduler.save()
+            if archive is not None:
+                archive.save()
+            _write_report(config, metrics, logger)
+            return 1
+
+        queue.mark_unchanged(worker_id, set(batch) - finished)
+        processed += len(batch)
+
+    scheduler.save()
+    if archive is not None:
+        archive.save()
+    _write_report(config, metrics, logger)
+    logger.info("Worker %s finished %d videos", worker_id, processed)
+    return 0
+
+
+def spawn_workers(
+    worker_id: str, processes: int, logger: logging.Logger, profile: bool = False
+) -> int:
+    command = [sys.executable, os.path.abspath(__file__), "work"]
+    if profile:
+        command.append("--profile")
+    children = [
+        subprocess.Popen([*command, "--worker-id", f"{worker_id}-{index}"])
+        for index in range(processes)
+    ]
+    codes = [child.wait() for child in children]
+    logger.info("Worker processes exited with %s", codes)
+    return max(codes)
+
+
+def merge(config: dict[str, Any], logger: logging.Logger) -> int:
+    queue = WorkQueue.from_config(config)
+    counts = queue.counts()
+    outstanding = counts.get(PENDING, 0) + counts.get(LEASED, 0)
+    if outstanding:
+        logger.error("%d queued videos are not finished yet", outstanding)
+        return 1
+
+    manifest = _load_manifest(config)
+    settings = settings_fingerprint(config)
+    incremental = bool(config["pipeline"].get("incremental", False))
+
+    finished_ids: set[str] = set()
+    for result, fingerprint in queue.results():
+        manifest.record(result[0], result_status(result), settings, fingerprint)
+        finished_ids.add(result[0])
+
+    seen_ids = queue.video_ids()
+    removed_ids = manifest.tombstone_missing(seen_ids)
+    if removed_ids:
+        logger.info("Tombstoned %d removed videos", len(removed_ids))
+        _drop_removed(config, removed_ids)
+
+    keep_ids = seen_ids - finished_ids if incremental else set()
+    outputs = SummaryWriter.from_config(config)
+    outputs.start(keep_previous=incremental)
+    outputs.finish(*collect_results(result for result, _ in queue.results()), keep_ids)
+    manifest.save()
+
+    logger.info("Merged %d videos: %s", len(seen_ids), counts)
+    return 0
+
+
+def _drop_removed(config: dict[str, Any], video_ids: list[str]) -> None:
+    # Tombstoned videos stop being searchable and leave the corpus's live
+    # rows; build_corpus.py --compact reclaims their space.
+    search = SearchIndex.from_config(config)
+    if search is not None:
+        search.remove_many(video_ids)
+    corpus = CorpusStore.from_config(config)
+    if corpus is not None:
+        corpus.remove(video_ids)
+
+
+def _build_scheduler(
+    config: dict[str, Any], logger: logging.Logger
+) -> QuotaScheduler | None:
+    simulator = YouTubeSimulator.from_config(config)
+    if simulator is not None:
+        logger.info("Using the simulated YouTube API (%d videos)", simulator.videos)
+        # Never the real keys or their quota state: simulated calls would be
+        # charged to the real daily quota in logs/quota.json.
+        return QuotaScheduler.from_config(
+            config,
+            simulator.api_keys,
+            state_path=None,
+            client_factory=simulator.client,
+        )
+
+    api_keys = load_api_keys(config)
+    if not api_keys:
+        logger.error(
+            "Missing API key in env vars: %s or %s",
+            config["api"].get("key_env", "YOUTUBE_API_KEY"),
+            config["api"].get("keys_env", "YOUTUBE_API_KEYS"),
+        )
+        return None
+    return QuotaScheduler.from_config(config, api_keys)
+
+
+def _build_metrics(
+    config: dict[str, Any], profile: bool, worker_id: str = ""
+) -> Metrics | None:
+    instrumentation = config["instrumentation"]
+    if not (profile or instrumentation.get("enabled", False)):
+        return None
+    profile_dir = None
+    if profile:
+        profile_dir = instrumentation.get(
+            "profile_dir", os.path.join(config["output"]["logs_dir"], "profile")
+        )
+        if worker_id:
+            profile_dir = os.path.join(profile_dir, worker_id)
+    return Metrics(profile_dir, label=worker_id)
+
+
+def _write_report(
+    config: dict[str, Any], metrics: Metrics | None, logger: logging.Logger
+) -> None:
+    if metrics is None:
+        return
+    path = config["instrumentation"].get(
+        "report", os.path.join(config["output"]["logs_dir"], "run_report.json")
+    )
+    if metrics.label:
+        stem, ext = os.path.splitext(path)
+        path = f"{stem}-{metrics.label}{ext}"
+    metrics.write_report(path)
+    logger.info("Wrote run report to %s", path)
+
+
+def _transcript_fetcher(config: dict[str, Any]) -> TranscriptFetcher:
+    simulator = YouTubeSimulator.from_config(config)
+    if simulator is not None:
+        return simulator.fetch_transcript
+    return fetch_transcript
+
+
+def _load_manifest(config: dict[str, Any]) -> Manifest:
+    output = config["output"]
+    return Manifest.load(
+        output.get("manifest", os.path.join(output["logs_dir"], "manifest.jsonl"))
+    )
+
+
+def _load_checkpoint(config: dict[str, Any], settings: str) -> Checkpoint:
+    output = config["output"]
+    path = output.get("checkpoint", os.path.join(output["logs_dir"], "checkpoint.jsonl"))
+    return Checkpoint(path, settings)
+
+
+def _iter_candidate_ids(
+    youtube: Any,
+    config: dict[str, Any],
+    seen_ids: set[str],
+    done_ids: set[str],
+    on_settled: Callable[[VideoResult], None],
+    metrics: Metrics | None = None,
+) -> Iterator[str]:
+    triage = bool(config["pipeline"].get("triage", False))
+    skip_unknown = bool(config["pipeline"].get("triage_skip_unknown", False))
+    logger = logging.getLogger("cycling_workout_extractor")
 
-    video_ids: list[str] = []
     for playlist in config["playlists"]:
         playlist_id = playlist["id"]
         logger.info("Fetching playlist: %s", playlist_id)
-        video_ids.extend(fetch_playlist_video_ids(youtube, playlist_id))
+        for item in iter_playlist_items(youtube, playlist_id, metrics):
+            video_id = item["video_id"]
+            if video_id in seen_ids:
+                continue
+            seen_ids.add(video_id)
+            if video_id in done_ids:
+                continue
 
-    unique_ids = sorted(set(video_ids))
-    logger.info("Found %d unique videos", len(unique_ids))
+            if triage:
+                result = triage_item(item, config, skip_unknown)
+                if result is not None:
+                    on_settled(result)
+                    continue
 
-    summary_rows = []
-    review_entries = []
+            yield video_id
 
-    for video_id in unique_ids:
-        try:
-            metadata = fetch_video_metadata(youtube, video_id)
-            if not metadata:
-                review_entries.append(f"{video_id}\tmissing metadata")
-                continue
 
-            title = metadata["title"]
-            description = metadata["description"]
+def _process(
+    items: Iterable[tuple[str, dict[str, Any] | None, str]],
+    config: dict[str, Any],
+    manifest: Manifest,
+    checkpoint: Checkpoint,
+    settings: str,
+    transcript_fetcher: TranscriptFetcher,
+    outputs: SummaryWriter,
+    workers: int | None = None,
+    metrics: Metrics | None = None,
+) -> None:
+    if workers is None:
+        workers = int(config["pipeline"].get("workers", 1))
 
-            if not is_probable_workout(
-                title,
-                description,
-                config.get("non_workout_keywords", []),
-            ):
-                review_entries.append(f"{video_id}\tnon-workout: {title}")
-                summary_rows.append(
-                    {
-                        "video_id": video_id,
-                        "title": title,
-                        "url": metadata["url"],
-                        "workout_type": "Non-workout",
-                        "duration_minutes": metadata["duration_minutes"],
-                        "intervals_count": 0,
-                        "status": "skipped",
-                        "review_reason": "non-workout",
-                    }
-                )
-                continue
+    for result in process_videos(
+        items,
+        config,
+        workers=workers,
+        transcript_fetcher=transcript_fetcher,
+        metrics=metrics,
+    ):
+        _record(result, manifest, checkpoint, settings, outputs)
 
-            intervals = parse_description_timestamps(
-                description, metadata["duration_seconds"]
-            )
-            if not intervals:
-                intervals = parse_transcript_intervals(
-                    video_id, metadata["duration_seconds"]
-                )
-
-            workout_type = classify_workout_type(
-                title,
-                description,
-                config["classification"]["keywords"],
-                config["classification"]["priority"],
-            )
-
-            record = {
-                "video_id": video_id,
-                "title": title,
-                "url": metadata["url"],
-                "workout_type": workout_type,
-                "duration_minutes": metadata["duration_minutes"],
-                "intervals": intervals,
-            }
-
-            is_valid, reasons = validate_workout(record)
-            status = "ok" if is_valid else "needs_review"
-            review_reason = "; ".join(reasons) if reasons else ""
-            if not is_valid:
-                review_entries.append(f"{video_id}\t{review_reason}")
-
-            if intervals:
-                write_json(record, config["output"]["workouts_dir"])
-
-            summary_rows.append(
-                {
-                    "video_id": video_id,
-                    "title": title,
-                    "url": metadata["url"],
-                    "workout_type": workout_type,
-                    "duration_minutes": metadata["duration_minutes"],
-                    "intervals_count": len(intervals),
-                    "status": status,
-                    "review_reason": review_reason,
-                }
-            )
-
-        except Exception as exc:  # noqa: BLE001
-            logger.exception("Failed processing %s", video_id)
-            review_entries.append(f"{video_id}\terror: {exc}")
-
-    write_summary_csv(summary_rows, config["output"]["summary_csv"])
-    write_review_log(review_entries, config["output"]["review_log"])
 
-    logger.info("Done")
-    return 0
+def _record(
+    result: VideoResult,
+    manifest: Manifest,
+    checkpoint: Checkpoint,
+    settings: str,
+    outputs: SummaryWriter,
+) -> None:
+    # Checkpoint first: on resume the outputs are rebuilt from it.
+    checkpoint.append(result)
+    outputs.append(result)
+    manifest.record(result[0], result_status(result), settings)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from generators.audit import GENERATED, PROCESSED, audit_directory
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", nargs="?", default=os.path.join("data", "processed"))
+    parser.add_argument("--kind", choices=[PROCESSED, GENERATED], default=None)
+    parser.add_argument("--output", default=None, help="write the full report as JSON")
+
+    args = parser.parse_args()
+
+    report = audit_directory(args.directory, args.kind)
+    payload = report.to_dict()
+
+    print(f"{payload['failed']} of {payload['records']} workouts failed")
+    for rule, count in sorted(payload["record_counts"].items()):
+        if count:
+            intervals = payload["interval_counts"].get(rule)
+            suffix = f" ({intervals} intervals)" if intervals is not None else ""
+            print(f"  {rule}: {count}{suffix}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(payload, handle, indent=2)
+    return 1 if payload["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cycling_workout_extractor.corpus_store import CorpusStore, build_corpus
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Convert a directory of workout JSON into the columnar corpus store."
+    )
+    parser.add_argument("source", nargs="?", default=os.path.join("data", "processed"))
+    parser.add_argument("--output", default=os.path.join("data", "corpus"))
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Rewrite the existing store with only its live rows instead of converting",
+    )
+    args = parser.parse_args()
+
+    if args.compact:
+        dropped = CorpusStore(args.output).compact()
+        print(f"Dropped {dropped} superseded rows from {args.output}")
+        return 0
+
+    count = build_corpus(args.source, args.output)
+    print(f"Wrote {count} workouts to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
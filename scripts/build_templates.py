@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from generators.pattern_analyzer import (
+    DEFAULT_PROCESSED_GLOB,
+    DEFAULT_TEMPLATES_PATH,
+    ENGINES,
+    NUMPY_ENGINE,
+    analyze_patterns,
+    save_templates,
+)
+from generators.template_manager import refresh_templates
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Rebuild workout templates, in one full pass or incrementally."
+    )
+    parser.add_argument("source", nargs="?", default=DEFAULT_PROCESSED_GLOB)
+    parser.add_argument("--corpus", default=None, help="read a columnar corpus store instead")
+    parser.add_argument("--engine", choices=ENGINES, default=NUMPY_ENGINE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--output", default=DEFAULT_TEMPLATES_PATH)
+    parser.add_argument(
+        "--state",
+        default=None,
+        help="analysis state file; re-reads only files changed since it was written",
+    )
+    parser.add_argument(
+        "--refresh",
+        action="store_true",
+        help="sync ./workouts and update --output incrementally (what generators use)",
+    )
+    args = parser.parse_args()
+
+    if args.refresh:
+        payload = refresh_templates(args.output)
+    else:
+        payload = analyze_patterns(
+            args.source,
+            corpus_dir=args.corpus,
+            state_path=args.state,
+            engine=args.engine,
+            workers=args.workers,
+        )
+        save_templates(payload, args.output)
+    count = sum(len(durations) for durations in payload["templates"].values())
+    print(f"Wrote {count} templates to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
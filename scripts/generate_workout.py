@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 import argparse
-import json
 import os
 import sys
 from datetime import datetime
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
+from cycling_workout_extractor.serialization import COMPACT, GZIP, PRETTY, ZSTD, Serializer
 from generators.workout_generator import WorkoutGenerator
 
 
@@ -17,23 +17,37 @@ def main() -> int:
     parser.add_argument("--duration", required=True, type=int)
     parser.add_argument("--ftp", type=int, default=None)
     parser.add_argument("--level", default="intermediate")
+    parser.add_argument("--pretty", action="store_true", help="Indented JSON output")
+    parser.add_argument("--compress", choices=[GZIP, ZSTD], default=None)
+    parser.add_argument("--intervals", type=int, default=None, help="preferred interval count")
+    parser.add_argument("--ratio", default=None, help="preferred work:rest, e.g. 1:1")
 
     args = parser.parse_args()
 
-    generator = WorkoutGenerator()
+    constraints = {"interval_count": args.intervals, "work_rest_ratio": args.ratio}
+    if any(value is not None for value in constraints.values()):
+        # Only nearest-template queries use the config (for feature weights).
+        from cycling_workout_extractor.config import load_config
+
+        generator = WorkoutGenerator.from_config(
+            load_config(os.getenv("CONFIG_PATH", "config.yaml"))
+        )
+    else:
+        generator = WorkoutGenerator()
     workout = generator.generate(
         duration=args.duration,
         workout_type=args.workout_type,
         user_ftp=args.ftp,
         fitness_level=args.level,
+        **constraints,
     )
 
     os.makedirs(os.path.join("data", "generated"), exist_ok=True)
     timestamp = datetime.utcnow().strftime("%Y%m%d%H%M%S")
     path = os.path.join("data", "generated", f"workout_{timestamp}.json")
 
-    with open(path, "w", encoding="utf-8") as handle:
-        json.dump(workout, handle, indent=2)
+    serializer = Serializer(PRETTY if args.pretty else COMPACT, args.compress)
+    serializer.dump(workout, path)
 
     print(path)
     return 0
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from cycling_workout_extractor.search import SearchIndex, index_directory
+
+
+def _bound(value: str) -> int | tuple[int, int]:
+    low, _, high = value.partition("-")
+    return (int(low), int(high)) if high else int(low)
+
+
+def _archived_descriptions(archive_dir: str) -> dict[str, str]:
+    from cycling_workout_extractor.archive import RawArchive
+
+    archive = RawArchive(archive_dir)
+    descriptions: dict[str, str] = {}
+    for video_id in archive.video_ids("metadata"):
+        item = archive.get("metadata", video_id) or {}
+        descriptions[video_id] = item.get("snippet", {}).get("description", "")
+    return descriptions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Search indexed workouts by text, type, duration, cadence and power."
+    )
+    parser.add_argument("text", nargs="?", default="", help="words or hyphenated phrases")
+    parser.add_argument("--type", dest="workout_type")
+    parser.add_argument("--duration", type=_bound, help="minutes, e.g. 45 or 40-50")
+    parser.add_argument("--cadence", type=_bound, help="rpm of any interval, e.g. 95")
+    parser.add_argument("--power", type=_bound, help="power level out of 10, e.g. 7-8")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--rank", action="store_true", help="order text matches by relevance")
+    parser.add_argument("--index", default=os.path.join("data", "search.db"))
+    parser.add_argument(
+        "--rebuild",
+        metavar="DIR",
+        help="make the index match the workout JSON in DIR before searching",
+    )
+    parser.add_argument(
+        "--archive",
+        default=os.path.join("data", "raw"),
+        help="raw archive to take video descriptions from when rebuilding",
+    )
+    args = parser.parse_args()
+
+    index = SearchIndex(args.index)
+    if args.rebuild:
+        descriptions = (
+            _archived_descriptions(args.archive) if os.path.isdir(args.archive) else {}
+        )
+        count = index_directory(index, args.rebuild, descriptions)
+        print(f"Indexed {count} workouts from {args.rebuild}")
+        if not (args.text or args.workout_type or args.duration or args.cadence or args.power):
+            return 0
+
+    hits = index.search(
+        args.text,
+        workout_type=args.workout_type,
+        duration=args.duration,
+        cadence=args.cadence,
+        power=args.power,
+        limit=args.limit,
+        ranked=args.rank,
+    )
+    for hit in hits:
+        print(f"{hit.video_id}\t{hit.title}" + (f"\t{hit.snippet}" if hit.snippet else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import fcntl
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Callable
+
+INDEX_FILENAME = "index.json"
+
+
+# Payloads are stored once per content hash under objects/<aa>/<sha256>.json.gz;
+# index.json maps "kind:video_id" to the digest, compressed size and fetch time.
+class RawArchive:
+    def __init__(
+        self,
+        root: str,
+        ttl_seconds: int = 0,
+        max_bytes: int = 0,
+    ) -> None:
+        self.root = root
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: dict[str, dict[str, Any]] = {}
+
+        index_path = os.path.join(root, INDEX_FILENAME)
+        if os.path.exists(index_path):
+            with open(index_path, "r", encoding="utf-8") as handle:
+                self._index = json.load(handle)
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "RawArchive | None":
+        archive_config = config.get("archive", {})
+        root = archive_config.get("dir")
+        if not root:
+            return None
+        ttl_days = float(archive_config.get("ttl_days", 0))
+        max_megabytes = float(archive_config.get("max_megabytes", 0))
+        return cls(
+            root,
+            ttl_seconds=int(ttl_days * 86400),
+            max_bytes=int(max_megabytes * 1024 * 1024),
+        )
+
+    def put(self, kind: str, video_id: str, payload: Any) -> str:
+        data = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as handle:
+                handle.write(gzip.compress(data, mtime=0))
+            os.replace(tmp_path, path)
+
+        with self._lock:
+            self._index[_key(kind, video_id)] = {
+                "digest": digest,
+                "size": os.path.getsize(path),
+                "fetched_at": time.time(),
+            }
+        return digest
+
+    def get(self, kind: str, video_id: str) -> Any | None:
+        with self._lock:
+            entry = self._index.get(_key(kind, video_id))
+        if not entry:
+            return None
+
+        path = self._object_path(entry["digest"])
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as handle:
+            return json.loads(gzip.decompress(handle.read()))
+
+    def is_fresh(self, kind: str, video_id: str) -> bool:
+        with self._lock:
+            entry = self._index.get(_key(kind, video_id))
+        if not entry:
+            return False
+        if not self.ttl_seconds:
+            return True
+        return time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def video_ids(self, kind: str) -> list[str]:
+        prefix = f"{kind}:"
+        with self._lock:
+            return sorted(key[len(prefix):] for key in self._index if key.startswith(prefix))
+
+    def cached_fetcher(
+        self,
+        kind: str,
+        fetch: Callable[[str], Any],
+        offline: bool = False,
+    ) -> Callable[[str], Any]:
+        def fetcher(video_id: str) -> Any:
+            if offline or self.is_fresh(kind, video_id):
+                payload = self.get(kind, video_id)
+                if payload is not None or offline:
+                    return payload
+            payload = fetch(video_id)
+            self.put(kind, video_id, payload)
+            return payload
+
+        return fetcher
+
+    def evict(self) -> int:
+        if not self.max_bytes:
+            return 0
+
+        with self._lock:
+            sizes = {entry["digest"]: entry["size"] for entry in self._index.values()}
+            total = sum(sizes.values())
+            refs: dict[str, int] = {}
+            for entry in self._index.values():
+                refs[entry["digest"]] = refs.get(entry["digest"], 0) + 1
+
+            evicted = 0
+            oldest_first = sorted(
+                self._index.items(), key=lambda item: item[1]["fetched_at"]
+            )
+            for key, entry in oldest_first:
+                if total <= self.max_bytes:
+                    break
+                del self._index[key]
+                evicted += 1
+                digest = entry["digest"]
+                refs[digest] -= 1
+                if refs[digest] == 0:
+                    total -= sizes[digest]
+                    path = self._object_path(digest)
+                    if os.path.exists(path):
+                        os.remove(path)
+        return evicted
+
+    def save(self) -> None:
+        # Worker processes share the archive, so the index on disk is merged
+        # in under a lock rather than overwritten; the later fetch wins.
+        os.makedirs(self.root, exist_ok=True)
+        index_path = os.path.join(self.root, INDEX_FILENAME)
+        with open(f"{index_path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(index_path):
+                    with open(index_path, "r", encoding="utf-8") as handle:
+                        saved = json.load(handle)
+                    with self._lock:
+                        for key, entry in saved.items():
+                            current = self._index.get(key)
+                            if current is None or current["fetched_at"] < entry["fetched_at"]:
+                                self._index[key] = entry
+                self.evict()
+                tmp_path = f"{index_path}.tmp"
+                with self._lock:
+                    with open(tmp_path, "w", encoding="utf-8") as handle:
+                        json.dump(self._index, handle, sort_keys=True)
+                os.replace(tmp_path, index_path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.json.gz")
+
+
+def _key(kind: str, video_id: str) -> str:
+    return f"{kind}:{video_id}"
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Iterator, TextIO
+
+from cycling_workout_extractor.pipeline import VideoResult
+from cycling_workout_extractor.utils import iter_jsonl, open_jsonl_append
+
+
+class Checkpoint:
+    # One JSON line per finished video, flushed as soon as it completes. The
+    # header pins the settings digest so a resumed run never mixes results
+    # produced under different classification or parser settings.
+    def __init__(self, path: str, settings: str) -> None:
+        self.path = path
+        self.settings = settings
+        self._handle: TextIO | None = None
+
+    def results(self) -> Iterator[VideoResult]:
+        entries = iter_jsonl(self.path)
+        header = next(entries, None)
+        if not header or header.get("settings") != self.settings:
+            return
+        for entry in entries:
+            yield entry["video_id"], entry["row"], entry["entries"]
+
+    def completed_ids(self) -> set[str]:
+        return {video_id for video_id, _, _ in self.results()}
+
+    def append(self, result: VideoResult) -> None:
+        if self._handle is None:
+            self._handle = self._open()
+        video_id, row, entries = result
+        self._handle.write(
+            json.dumps({"video_id": video_id, "row": row, "entries": entries})
+        )
+        self._handle.write("\n")
+        self._handle.flush()
+
+    def clear(self) -> None:
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+    def _open(self) -> TextIO:
+        header = next(iter_jsonl(self.path), None)
+        if header and header.get("settings") == self.settings:
+            return open_jsonl_append(self.path)
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        handle = open(self.path, "w", encoding="utf-8")
+        handle.write(json.dumps({"settings": self.settings}))
+        handle.write("\n")
+        return handle
@@ -1,6 +1,106 @@
 from __future__ import annotations
 
-from typing import Mapping
+import re
+from functools import lru_cache
+from typing import Any, Iterable, Mapping, NamedTuple
+
+UNKNOWN = "Unknown"
+# Below this many distinct keywords, plain substring checks beat a regex scan.
+TRIE_MIN_KEYWORDS = 64
+
+
+class Classification(NamedTuple):
+    workout_type: str
+    is_workout: bool
+
+
+class KeywordClassifier:
+    # Answers "which workout type" and "is this a non-workout" with the same
+    # precedence as the original loops: the first priority class with any
+    # keyword present wins, and any non-workout keyword present rejects.
+    def __init__(
+        self,
+        keywords: Mapping[str, list[str]],
+        priority: list[str],
+        non_workout_keywords: Iterable[str] = (),
+    ) -> None:
+        self._by_type = [
+            (workout_type, [keyword.lower() for keyword in keywords.get(workout_type, [])])
+            for workout_type in priority
+        ]
+        self._types = [workout_type for workout_type, _ in self._by_type]
+        self._non_workout = list(dict.fromkeys(k.lower() for k in non_workout_keywords))
+
+        ranks: dict[str, int] = {}
+        for rank, (_, type_keywords) in enumerate(self._by_type):
+            for keyword in type_keywords:
+                ranks.setdefault(keyword, rank)
+        non_workout = set(self._non_workout)
+
+        terms = sorted((set(ranks) | non_workout) - {""})
+        self._scan: re.Pattern[str] | None = None
+        if len(terms) >= TRIE_MIN_KEYWORDS:
+            self._scan = re.compile(_trie_pattern(terms))
+            # The scan reports the longest term at each offset; every shorter
+            # term that is a prefix of it is present there as well.
+            self._closure = {
+                term: (
+                    min(
+                        (ranks[term[:end]] for end in range(1, len(term) + 1)
+                         if term[:end] in ranks),
+                        default=len(self._by_type),
+                    ),
+                    any(term[:end] in non_workout for end in range(1, len(term) + 1)),
+                )
+                for term in terms
+            }
+            # An empty keyword matches every text.
+            self._base_rank = ranks.get("", len(self._by_type))
+            self._base_non_workout = "" in non_workout
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "KeywordClassifier":
+        return classifier_from_config(config)
+
+    def classify(self, title: str, description: str) -> Classification:
+        haystack = f"{title} {description}".lower()
+        if self._scan is None:
+            return Classification(
+                self._first_type(haystack),
+                not any(keyword in haystack for keyword in self._non_workout),
+            )
+
+        best = self._base_rank
+        non_workout = self._base_non_workout
+        search = self._scan.search
+        position = 0
+        while True:
+            match = search(haystack, position)
+            if match is None:
+                break
+            rank, rejects = self._closure[match.group()]
+            if rank < best:
+                best = rank
+            non_workout = non_workout or rejects
+            if best == 0 and non_workout:
+                break
+            position = match.start() + 1
+
+        workout_type = self._types[best] if best < len(self._types) else UNKNOWN
+        return Classification(workout_type, not non_workout)
+
+    def classify_many(
+        self, items: Iterable[tuple[str, str]]
+    ) -> list[Classification]:
+        classify = self.classify
+        return [classify(title, description) for title, description in items]
+
+    def _first_type(self, haystack: str) -> str:
+        for workout_type, type_keywords in self._by_type:
+            for keyword in type_keywords:
+                if keyword in haystack:
+                    return workout_type
+        return UNKNOWN
 
 
 def classify_workout_type(
@@ -9,11 +109,63 @@ def classify_workout_type(
     keywords: Mapping[str, list[str]],
     priority: list[str],
 ) -> str:
-    haystack = f"{title} {description}".lower()
+    classifier = _compiled(_freeze_keywords(keywords, priority), ())
+    return classifier.classify(title, description).workout_type
+
+
+def non_workout_classifier(non_workout_keywords: Iterable[str]) -> KeywordClassifier:
+    return _compiled((), tuple(non_workout_keywords))
+
+
+def classifier_from_config(config: dict[str, Any]) -> KeywordClassifier:
+    classification = config.get("classification", {})
+    return _compiled(
+        _freeze_keywords(
+            classification.get("keywords", {}), classification.get("priority", [])
+        ),
+        tuple(config.get("non_workout_keywords", [])),
+    )
+
+
+@lru_cache(maxsize=32)
+def _compiled(
+    keywords: tuple[tuple[str, tuple[str, ...]], ...],
+    non_workout_keywords: tuple[str, ...],
+) -> KeywordClassifier:
+    return KeywordClassifier(
+        {workout_type: list(words) for workout_type, words in keywords},
+        [workout_type for workout_type, _ in keywords],
+        non_workout_keywords,
+    )
+
+
+def _freeze_keywords(
+    keywords: Mapping[str, list[str]], priority: list[str]
+) -> tuple[tuple[str, tuple[str, ...]], ...]:
+    return tuple(
+        (workout_type, tuple(keywords.get(workout_type, []))) for workout_type in priority
+    )
+
+
+def _trie_pattern(terms: list[str]) -> str:
+    # Alternatives share their prefixes, and deeper branches are tried before a
+    # term ends, so each match is the longest term starting at its offset.
+    trie: dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
 
-    for workout_type in priority:
-        for keyword in keywords.get(workout_type, []):
-            if keyword.lower() in haystack:
-                return workout_type
+    def build(node: dict[str, Any]) -> str:
+        branches = [
+            re.escape(char) + build(child) for char, child in sorted(node.items()) if char
+        ]
+        if not branches:
+            return ""
+        body = "|".join(branches)
+        if "" in node:
+            return f"(?:{body})?"
+        return f"(?:{body})" if len(branches) > 1 else body
 
-    return "Unknown"
+    return build(trie)
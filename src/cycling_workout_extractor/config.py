@@ -5,10 +5,11 @@ import os
 from typing import Any
 
 import yaml
-from dotenv import load_dotenv
 
 
 def load_config(path: str) -> dict[str, Any]:
+    from dotenv import load_dotenv
+
     load_dotenv()
 
     with open(path, "r", encoding="utf-8") as handle:
@@ -20,6 +21,12 @@ def load_config(path: str) -> dict[str, Any]:
     config.setdefault("classification", {})
     config.setdefault("non_workout_keywords", [])
     config.setdefault("parser", {})
+    config.setdefault("pipeline", {})
+    config.setdefault("archive", {})
+    config.setdefault("queue", {})
+    config.setdefault("simulator", {})
+    config.setdefault("instrumentation", {})
+    config.setdefault("templates", {})
 
     return config
 
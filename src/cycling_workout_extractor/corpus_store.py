@@ -0,0 +1,371 @@
+from __future__ import annotations
+
+import fcntl
+import glob
+import json
+import os
+import shutil
+import struct
+import threading
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from typing import Any, Iterable, Iterator
+
+from cycling_workout_extractor import serialization
+from cycling_workout_extractor.utils import parse_timestamp_to_seconds
+
+STORE_VERSION = 1
+SCHEMA_FILENAME = "schema.json"
+RECORDS_FILENAME = "records.bin"
+INTERVALS_FILENAME = "intervals.bin"
+STRINGS_FILENAME = "strings.jsonl"
+
+# Little-endian, unpadded rows. String columns hold ids into strings.jsonl,
+# where line N is the string with id N. A record row with interval_count -1
+# is a tombstone: the video was removed.
+RECORD_COLUMNS = [
+    ("video_id", "<i4"),
+    ("workout_type", "<i4"),
+    ("duration_minutes", "<i4"),
+    ("interval_offset", "<i8"),
+    ("interval_count", "<i4"),
+]
+INTERVAL_COLUMNS = [
+    ("video_id", "<i4"),
+    ("start_seconds", "<i4"),
+    ("duration_seconds", "<i4"),
+    ("power_level", "<i4"),
+    ("cadence_rpm", "<i4"),
+    ("zone", "<i4"),
+]
+_RECORD = struct.Struct("<iiiqi")
+_INTERVAL = struct.Struct("<iiiiii")
+
+
+class CorpusStore:
+    # Append-only: intervals and new strings are written before the record
+    # row that points at them, so a crash leaves unreferenced bytes rather
+    # than a dangling record. Rows for a video written again supersede the
+    # older ones when read. Writers from threads and worker processes take a
+    # lock file next to the store exclusively, readers take it shared while
+    # mapping, so compact() can swap in a rewritten directory.
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+        self._strings: dict[str | None, int] = {}
+        self._strings_read = 0
+        self._strings_inode = 0
+        os.makedirs(os.path.dirname(os.path.abspath(root)), exist_ok=True)
+        with _locked(root, fcntl.LOCK_EX):
+            # A crash between the two renames of a swap leaves only the
+            # previous store.
+            previous = f"{os.path.normpath(root)}.previous"
+            if not os.path.exists(root) and os.path.exists(previous):
+                os.replace(previous, root)
+        os.makedirs(root, exist_ok=True)
+        schema_path = os.path.join(root, SCHEMA_FILENAME)
+        if not os.path.exists(schema_path):
+            serialization.Serializer(serialization.PRETTY).dump(_schema(), schema_path)
+        _check_schema(root)
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "CorpusStore | None":
+        root = config.get("output", {}).get("corpus_dir")
+        if not root:
+            return None
+        return _open_store(os.path.abspath(root))
+
+    def append(self, record: dict[str, Any]) -> None:
+        self.extend([record])
+
+    def extend(self, records: Iterable[dict[str, Any]]) -> int:
+        records = list(records)
+        if not records:
+            return 0
+        with self._lock, _locked(self.root, fcntl.LOCK_EX):
+            return self._extend_locked(records)
+
+    def remove(self, video_ids: Iterable[str]) -> int:
+        # Tombstones supersede the videos' rows like any newer row would;
+        # compact() drops both.
+        video_ids = list(video_ids)
+        if not video_ids:
+            return 0
+        with self._lock, _locked(self.root, fcntl.LOCK_EX):
+            self._sync_strings()
+            offset = _truncate_rows(self._path(INTERVALS_FILENAME), _INTERVAL.size)
+            _truncate_rows(self._path(RECORDS_FILENAME), _RECORD.size)
+            new_strings: list[str | None] = []
+            intern = self._interner(new_strings)
+            record_rows = bytearray()
+            for video_id in video_ids:
+                record_rows += _RECORD.pack(intern(video_id), intern(None), 0, offset, -1)
+            self._write(new_strings, bytearray(), record_rows)
+        return len(video_ids)
+
+    def compact(self) -> int:
+        # Rewrites the store with only the live rows, dropping superseded
+        # rows, tombstones and their intervals; returns the rows dropped.
+        # String ids are kept, so the dictionary is copied as is.
+        import numpy as np
+
+        with self._lock, _locked(self.root, fcntl.LOCK_EX):
+            snapshot = CorpusSnapshot(self.root, lock=False)
+            dropped = len(snapshot.records) - len(snapshot)
+            if not dropped:
+                return 0
+            records = snapshot.records[snapshot.live]
+            counts = records["interval_count"].astype(np.int64)
+            offsets = np.cumsum(counts) - counts
+            rows = np.repeat(records["interval_offset"] - offsets, counts) + np.arange(
+                counts.sum()
+            )
+            records["interval_offset"] = offsets
+
+            staging = f"{os.path.normpath(self.root)}.compacting"
+            shutil.rmtree(staging, ignore_errors=True)
+            os.makedirs(staging)
+            for filename in (SCHEMA_FILENAME, STRINGS_FILENAME):
+                if os.path.exists(self._path(filename)):
+                    shutil.copy2(self._path(filename), os.path.join(staging, filename))
+            records.tofile(os.path.join(staging, RECORDS_FILENAME))
+            snapshot.intervals[rows].tofile(os.path.join(staging, INTERVALS_FILENAME))
+            del snapshot
+            _swap(staging, self.root)
+        return dropped
+
+    def read(self) -> "CorpusSnapshot":
+        return CorpusSnapshot(self.root)
+
+    def _extend_locked(self, records: list[dict[str, Any]]) -> int:
+        self._sync_strings()
+        offset = _truncate_rows(self._path(INTERVALS_FILENAME), _INTERVAL.size)
+        _truncate_rows(self._path(RECORDS_FILENAME), _RECORD.size)
+
+        new_strings: list[str | None] = []
+        intern = self._interner(new_strings)
+        interval_rows = bytearray()
+        record_rows = bytearray()
+        for record in records:
+            video_id = intern(record.get("video_id", ""))
+            intervals = record.get("intervals") or []
+            for interval in intervals:
+                interval_rows += _INTERVAL.pack(
+                    video_id,
+                    parse_timestamp_to_seconds(interval.get("start_time") or "0:0"),
+                    int(interval.get("duration_seconds") or 0),
+                    intern(interval.get("power_level") or ""),
+                    int(interval.get("cadence_rpm") or 0),
+                    intern(interval.get("zone") or ""),
+                )
+            record_rows += _RECORD.pack(
+                video_id,
+                # Same default as the analyzer's grouping: a missing type is
+                # "Unknown" and an explicit null stays null (JSON lines hold it).
+                intern(record.get("workout_type", "Unknown")),
+                int(record.get("duration_minutes") or 0),
+                offset,
+                len(intervals),
+            )
+            offset += len(intervals)
+        self._write(new_strings, interval_rows, record_rows)
+        return len(records)
+
+    def _write(
+        self, new_strings: list[str | None], interval_rows: bytearray, record_rows: bytearray
+    ) -> None:
+        if new_strings:
+            lines = "".join(json.dumps(value) + "\n" for value in new_strings)
+            with open(self._path(STRINGS_FILENAME), "ab") as handle:
+                handle.write(lines.encode("utf-8"))
+                self._strings_read = handle.tell()
+        _append(self._path(INTERVALS_FILENAME), interval_rows)
+        _append(self._path(RECORDS_FILENAME), record_rows)
+
+    def _interner(self, new_strings: list[str | None]) -> Any:
+        strings = self._strings
+
+        def intern(value: str | None) -> int:
+            index = strings.get(value)
+            if index is None:
+                index = strings[value] = len(strings)
+                new_strings.append(value)
+            return index
+
+        return intern
+
+    def _sync_strings(self) -> None:
+        # Picks up strings other processes appended since the last call and
+        # drops a line torn by a crashed writer. A rebuilt store starts over.
+        path = self._path(STRINGS_FILENAME)
+        status = os.stat(path) if os.path.exists(path) else None
+        if (
+            status is None
+            or status.st_ino != self._strings_inode
+            or status.st_size < self._strings_read
+        ):
+            self._strings.clear()
+            self._strings_read = 0
+            self._strings_inode = status.st_ino if status else 0
+        if status is None:
+            return
+        with open(path, "rb+") as handle:
+            handle.seek(self._strings_read)
+            tail = handle.read()
+            complete = tail.rfind(b"\n") + 1
+            for line in tail[:complete].splitlines():
+                self._strings.setdefault(json.loads(line), len(self._strings))
+            self._strings_read += complete
+            if complete < len(tail):
+                handle.truncate(self._strings_read)
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.root, filename)
+
+
+class CorpusSnapshot:
+    # Columns are memory-mapped; only the string dictionary is read eagerly.
+    # The maps keep a swapped-out store's files alive.
+    def __init__(self, root: str, lock: bool = True) -> None:
+        with _locked(root, fcntl.LOCK_SH) if lock else nullcontext():
+            self._load(root)
+
+    def _load(self, root: str) -> None:
+        import numpy as np
+
+        _check_schema(root)
+        records_path = os.path.join(root, RECORDS_FILENAME)
+        record_count = _row_count(records_path, _RECORD.size)
+        self.records = _map(np, records_path, RECORD_COLUMNS, record_count)
+        interval_count = int(
+            (self.records["interval_offset"] + self.records["interval_count"]).max(initial=0)
+        )
+        self.intervals = _map(
+            np, os.path.join(root, INTERVALS_FILENAME), INTERVAL_COLUMNS, interval_count
+        )
+        self.strings: list[str | None] = []
+        strings_path = os.path.join(root, STRINGS_FILENAME)
+        if os.path.exists(strings_path):
+            with open(strings_path, "r", encoding="utf-8") as handle:
+                self.strings = [json.loads(line) for line in handle if line.endswith("\n")]
+
+        # The newest row per video wins, unless it is a tombstone.
+        video_ids = self.records["video_id"][::-1]
+        _, last = np.unique(video_ids, return_index=True)
+        live = np.sort(len(video_ids) - 1 - last)
+        self.live = live[self.records["interval_count"][live] >= 0]
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+    def iter_records(self) -> Iterator[dict[str, Any]]:
+        # Records shaped like the processed JSON, limited to the stored fields.
+        strings = self.strings
+        records = self.records[self.live]
+        columns = {name: self.intervals[name].tolist() for name, _ in INTERVAL_COLUMNS}
+        for video_id, workout_type, duration, offset, count in records.tolist():
+            intervals = [
+                {
+                    "start_seconds": columns["start_seconds"][index],
+                    "duration_seconds": columns["duration_seconds"][index],
+                    "power_level": strings[columns["power_level"][index]],
+                    "cadence_rpm": columns["cadence_rpm"][index],
+                    "zone": strings[columns["zone"][index]],
+                }
+                for index in range(offset, offset + count)
+            ]
+            yield {
+                "video_id": strings[video_id],
+                "workout_type": strings[workout_type],
+                "duration_minutes": duration,
+                "intervals": intervals,
+            }
+
+
+def build_corpus(source_dir: str, corpus_dir: str) -> int:
+    # Builds next to the target and swaps it in, so readers never see a
+    # half-converted store.
+    staging = f"{os.path.normpath(corpus_dir)}.building"
+    shutil.rmtree(staging, ignore_errors=True)
+    store = CorpusStore(staging)
+    paths = sorted(glob.glob(os.path.join(source_dir, "*.json")))
+    count = store.extend(serialization.load(path) for path in paths)
+    os.remove(_lock_path(staging))
+    with _locked(corpus_dir, fcntl.LOCK_EX):
+        _swap(staging, corpus_dir)
+    _open_store.cache_clear()
+    return count
+
+
+def _swap(staging: str, root: str) -> None:
+    # Callers hold the store lock. A crash between the renames leaves only
+    # <root>.previous, which the next CorpusStore moves back.
+    previous = f"{os.path.normpath(root)}.previous"
+    shutil.rmtree(previous, ignore_errors=True)
+    if os.path.exists(root):
+        os.replace(root, previous)
+    os.replace(staging, root)
+    shutil.rmtree(previous, ignore_errors=True)
+
+
+@contextmanager
+def _locked(root: str, operation: int) -> Iterator[None]:
+    with open(_lock_path(root), "a") as lock:
+        fcntl.flock(lock, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _lock_path(root: str) -> str:
+    # Outside the store, so it survives the directory being swapped.
+    return f"{os.path.normpath(root)}.lock"
+
+
+@lru_cache(maxsize=8)
+def _open_store(root: str) -> CorpusStore:
+    return CorpusStore(root)
+
+
+def _schema() -> dict[str, Any]:
+    return {
+        "version": STORE_VERSION,
+        "records": RECORD_COLUMNS,
+        "intervals": INTERVAL_COLUMNS,
+    }
+
+
+def _check_schema(root: str) -> None:
+    schema = serialization.load(os.path.join(root, SCHEMA_FILENAME))
+    expected = json.loads(json.dumps(_schema()))
+    if schema != expected:
+        raise ValueError(f"Unsupported corpus store layout in {root}")
+
+
+def _row_count(path: str, row_size: int) -> int:
+    if not os.path.exists(path):
+        return 0
+    return os.path.getsize(path) // row_size
+
+
+def _truncate_rows(path: str, row_size: int) -> int:
+    # Drops a partial row left by a crashed writer; returns the row count.
+    rows = _row_count(path, row_size)
+    if os.path.exists(path) and os.path.getsize(path) != rows * row_size:
+        os.truncate(path, rows * row_size)
+    return rows
+
+
+def _append(path: str, data: bytes | bytearray) -> None:
+    if not data:
+        return
+    with open(path, "ab") as handle:
+        handle.write(data)
+
+
+def _map(np: Any, path: str, columns: list[tuple[str, str]], rows: int) -> Any:
+    dtype = np.dtype(columns)
+    if not rows:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=(rows,))
@@ -1,10 +1,27 @@
 from __future__ import annotations
 
-import json
+import csv
 import os
-from typing import Any
+from typing import Any, Container, Iterable, Optional, TextIO
 
-import pandas as pd
+from cycling_workout_extractor.corpus_store import CorpusStore
+from cycling_workout_extractor.instrumentation import VIDEO_STAGES
+from cycling_workout_extractor.search import SearchIndex
+from cycling_workout_extractor.serialization import Serializer
+
+SUMMARY_COLUMNS = [
+    "video_id",
+    "title",
+    "url",
+    "workout_type",
+    "duration_minutes",
+    "intervals_count",
+    "status",
+    "review_reason",
+]
+
+# (video_id, summary row or None, review entries)
+VideoResult = tuple[str, Optional[dict[str, Any]], list[str]]
 
 
 def ensure_output_dirs(output_config: dict[str, str]) -> None:
@@ -12,36 +29,134 @@ def ensure_output_dirs(output_config: dict[str, str]) -> None:
     os.makedirs(output_config["logs_dir"], exist_ok=True)
 
 
-def write_json(record: dict[str, Any], workouts_dir: str) -> None:
-    os.makedirs(workouts_dir, exist_ok=True)
+def write_json(
+    record: dict[str, Any],
+    workouts_dir: str,
+    serializer: Serializer | None = None,
+    corpus: CorpusStore | None = None,
+    search: SearchIndex | None = None,
+    description: str = "",
+) -> str:
+    # description is the video description; it is only indexed, since
+    # workout records do not carry it.
     filename = f"{record['video_id']}.json"
     path = os.path.join(workouts_dir, filename)
-    with open(path, "w", encoding="utf-8") as handle:
-        json.dump(record, handle, indent=2)
-
-
-def write_summary_csv(rows: list[dict[str, Any]], path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    if rows:
-        df = pd.DataFrame(rows)
-    else:
-        df = pd.DataFrame(
-            columns=[
-                "video_id",
-                "title",
-                "url",
-                "workout_type",
-                "duration_minutes",
-                "intervals_count",
-                "status",
-                "review_reason",
-            ]
+    (serializer or Serializer()).dump(record, path)
+    if corpus is not None:
+        corpus.append(record)
+    if search is not None:
+        search.add(record, description)
+    return path
+
+
+class SummaryWriter:
+    # summary.csv rows and review.log lines, appended and flushed as each
+    # video settles, so a crash loses at most the videos in flight. Rows a run
+    # carries over from the previous one (videos it did not reprocess) wait in
+    # <path>.previous until finish(), which rewrites both files in video_id
+    # order so the finished outputs do not depend on completion order.
+    def __init__(self, summary_path: str, review_path: str, columns: list[str]) -> None:
+        self.summary_path = summary_path
+        self.review_path = review_path
+        self.columns = columns
+        self._summary: TextIO | None = None
+        self._review: TextIO | None = None
+        self._writer: Any = None
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "SummaryWriter":
+        columns = list(SUMMARY_COLUMNS)
+        if config.get("instrumentation", {}).get("summary_timings", False):
+            columns.extend(f"{name}_ms" for name in VIDEO_STAGES)
+        output = config["output"]
+        return cls(output["summary_csv"], output["review_log"], columns)
+
+    def start(self, settled: Iterable[VideoResult] = (), keep_previous: bool = False) -> None:
+        # Starts both files over from the results already settled, such as a
+        # resumed checkpoint's.
+        for path in (self.summary_path, self.review_path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            previous = f"{path}.previous"
+            # An existing .previous belongs to a run that never finished, and
+            # the file beside it is only that run's partial output.
+            if keep_previous and os.path.exists(path) and not os.path.exists(previous):
+                os.replace(path, previous)
+        self._summary = open(self.summary_path, "w", encoding="utf-8", newline="")
+        self._review = open(self.review_path, "w", encoding="utf-8")
+        self._writer = csv.DictWriter(
+            self._summary,
+            fieldnames=self.columns,
+            extrasaction="ignore",
+            lineterminator="\n",
         )
-    df.to_csv(path, index=False)
+        self._writer.writeheader()
+        for result in settled:
+            self._write(result)
+        self._flush()
+
+    def append(self, result: VideoResult) -> None:
+        self._write(result)
+        self._flush()
+
+    def finish(
+        self,
+        summary_rows: list[dict[str, Any]],
+        review_entries: list[str],
+        keep_ids: Container[str] = (),
+    ) -> None:
+        # Rewrites both files from the run's results plus the previous run's
+        # rows and review lines for keep_ids, sorted by video_id.
+        self.close()
+        rows = list(summary_rows)
+        previous = f"{self.summary_path}.previous"
+        if os.path.exists(previous):
+            with open(previous, "r", encoding="utf-8", newline="") as handle:
+                rows.extend(
+                    row for row in csv.DictReader(handle) if row.get("video_id") in keep_ids
+                )
+        entries = list(review_entries)
+        previous_review = f"{self.review_path}.previous"
+        if os.path.exists(previous_review):
+            with open(previous_review, "r", encoding="utf-8") as handle:
+                entries.extend(
+                    line.rstrip("\n")
+                    for line in handle
+                    if line.strip() and line.split("\t", 1)[0] in keep_ids
+                )
+        rows.sort(key=lambda row: row["video_id"])
+        entries.sort(key=lambda entry: entry.split("\t", 1)[0])
 
+        tmp_path = f"{self.summary_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(
+                handle, fieldnames=self.columns, extrasaction="ignore", lineterminator="\n"
+            )
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmp_path, self.summary_path)
+        tmp_path = f"{self.review_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            handle.writelines(f"{entry}\n" for entry in entries)
+        os.replace(tmp_path, self.review_path)
+        for path in (previous, previous_review):
+            if os.path.exists(path):
+                os.remove(path)
 
-def write_review_log(entries: list[str], path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as handle:
+    def close(self) -> None:
+        for handle in (self._summary, self._review):
+            if handle is not None:
+                handle.close()
+        self._summary = self._review = self._writer = None
+
+    def _write(self, result: VideoResult) -> None:
+        assert self._review is not None
+        _, row, entries = result
+        if row is not None:
+            self._writer.writerow(row)
         for entry in entries:
-            handle.write(f"{entry}\n")
+            self._review.write(f"{entry}\n")
+
+    def _flush(self) -> None:
+        assert self._summary is not None and self._review is not None
+        self._summary.flush()
+        self._review.flush()
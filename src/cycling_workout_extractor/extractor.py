@@ -1,44 +1,75 @@
 from __future__ import annotations
 
-from typing import Any
-
-from googleapiclient.discovery import build
+from typing import Any, Iterator
 
+from cycling_workout_extractor.instrumentation import Metrics, payload_size, stage
 from cycling_workout_extractor.utils import parse_iso8601_duration
 
+VIDEOS_BATCH_SIZE = 50
+
 
 def build_youtube_client(api_key: str) -> Any:
+    # googleapiclient takes ~150ms to import, so commands that never reach the
+    # API (reprocess, merge, --dry-run) don't pay for it.
+    from googleapiclient.discovery import build
+
     return build("youtube", "v3", developerKey=api_key)
 
 
 def fetch_playlist_video_ids(youtube: Any, playlist_id: str) -> list[str]:
     video_ids: list[str] = []
+    for item in _iter_playlist_items(youtube, playlist_id, "contentDetails"):
+        content = item.get("contentDetails", {})
+        video_id = content.get("videoId")
+        if video_id:
+            video_ids.append(video_id)
+    return video_ids
+
+
+def iter_playlist_items(
+    youtube: Any, playlist_id: str, metrics: Metrics | None = None
+) -> Iterator[dict[str, Any]]:
+    for item in _iter_playlist_items(
+        youtube, playlist_id, "snippet,contentDetails", metrics
+    ):
+        video_id = item.get("contentDetails", {}).get("videoId")
+        if not video_id:
+            continue
+        snippet = item.get("snippet", {})
+        yield {
+            "video_id": video_id,
+            "title": snippet.get("title", ""),
+            "description": snippet.get("description", ""),
+            "url": _video_url(video_id),
+        }
+
+
+def _iter_playlist_items(
+    youtube: Any, playlist_id: str, part: str, metrics: Metrics | None = None
+) -> Iterator[dict[str, Any]]:
     page_token = None
 
     while True:
-        response = (
-            youtube.playlistItems()
-            .list(
-                part="contentDetails",
-                playlistId=playlist_id,
-                maxResults=50,
-                pageToken=page_token,
+        with stage(metrics, "playlist") as sample:
+            response = (
+                youtube.playlistItems()
+                .list(
+                    part=part,
+                    playlistId=playlist_id,
+                    maxResults=50,
+                    pageToken=page_token,
+                )
+                .execute()
             )
-            .execute()
-        )
+            if metrics is not None:
+                sample.bytes = payload_size(response)
 
-        for item in response.get("items", []):
-            content = item.get("contentDetails", {})
-            video_id = content.get("videoId")
-            if video_id:
-                video_ids.append(video_id)
+        yield from response.get("items", [])
 
         page_token = response.get("nextPageToken")
         if not page_token:
             break
 
-    return video_ids
-
 
 def fetch_video_metadata(youtube: Any, video_id: str) -> dict[str, Any] | None:
     response = (
@@ -51,7 +82,24 @@ def fetch_video_metadata(youtube: Any, video_id: str) -> dict[str, Any] | None:
     if not items:
         return None
 
-    item = items[0]
+    return normalize_video_item(video_id, items[0])
+
+
+def fetch_video_batch(
+    youtube: Any, video_ids: list[str]
+) -> list[tuple[str, dict[str, Any] | None]]:
+    # One videos.list call for up to VIDEOS_BATCH_SIZE ids; callers batch.
+    response = (
+        youtube.videos()
+        .list(part="snippet,contentDetails", id=",".join(video_ids))
+        .execute()
+    )
+
+    found = {item["id"]: item for item in response.get("items", []) if item.get("id")}
+    return [(video_id, found.get(video_id)) for video_id in video_ids]
+
+
+def normalize_video_item(video_id: str, item: dict[str, Any]) -> dict[str, Any]:
     snippet = item.get("snippet", {})
     content_details = item.get("contentDetails", {})
 
@@ -64,5 +112,9 @@ def fetch_video_metadata(youtube: Any, video_id: str) -> dict[str, Any] | None:
         "description": snippet.get("description", ""),
         "duration_seconds": duration_seconds,
         "duration_minutes": duration_minutes,
-        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "url": _video_url(video_id),
     }
+
+
+def _video_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
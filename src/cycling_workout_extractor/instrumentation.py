@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator
+
+VIDEO_STAGES = ("metadata", "transcript", "parse", "classify", "validate", "write")
+# Per-video timings wait here until process_video folds them into the summary
+# row. Videos skipped as unchanged never collect theirs, so the oldest entries
+# are dropped; the in-flight window is far smaller than this.
+MAX_TRACKED_VIDEOS = 4096
+PROFILE_FILENAME = "run.prof"
+
+logger = logging.getLogger("cycling_workout_extractor")
+
+
+class StageSample:
+    def __init__(self) -> None:
+        self.bytes = 0
+
+
+class Metrics:
+    def __init__(self, profile_dir: str | None = None, label: str = "") -> None:
+        self.profile_dir = profile_dir
+        self.label = label
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._samples: dict[str, list[float]] = {}
+        self._bytes: dict[str, int] = {}
+        self._videos: OrderedDict[str, dict[str, float]] = OrderedDict()
+        self._profile: Any = None
+        self._alloc_peaks: dict[str, int] = {}
+        self._snapshots: dict[str, Any] = {}
+
+        if profile_dir:
+            import cProfile
+            import tracemalloc
+
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # One profiler for the whole run, enabled on the thread that
+            # creates the metrics; --profile runs keep to that one thread.
+            # Another active profiler (python -m cProfile, a debugger) costs
+            # the profile, never the run.
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as exc:
+                logger.warning("Not profiling this run: %s", exc)
+            else:
+                self._profile = profile
+
+    @contextmanager
+    def stage(self, name: str, video_id: str = "") -> Iterator[StageSample]:
+        sample = StageSample()
+        allocated = _traced_memory() if self.profile_dir else 0
+        start = time.perf_counter()
+        try:
+            yield sample
+        finally:
+            elapsed = time.perf_counter() - start
+            if self.profile_dir:
+                self._track_allocations(name, _traced_memory() - allocated)
+            self.record(name, elapsed, video_id, sample.bytes)
+
+    def record(
+        self, name: str, seconds: float, video_id: str = "", nbytes: int = 0
+    ) -> None:
+        with self._lock:
+            self._samples.setdefault(name, []).append(seconds)
+            self._bytes[name] = self._bytes.get(name, 0) + nbytes
+            if video_id:
+                self._add_video_time(video_id, name, seconds)
+
+    def share(self, name: str, seconds: float, video_ids: list[str]) -> None:
+        # Batched calls (videos.list) are split evenly across their videos.
+        if not video_ids:
+            return
+        with self._lock:
+            for video_id in video_ids:
+                self._add_video_time(video_id, name, seconds / len(video_ids))
+
+    def video_timings(self, video_id: str) -> dict[str, float]:
+        with self._lock:
+            timings = self._videos.pop(video_id, {})
+        return {
+            f"{stage}_ms": round(timings.get(stage, 0.0) * 1000, 1)
+            for stage in VIDEO_STAGES
+        }
+
+    def report(self) -> dict[str, Any]:
+        with self._lock:
+            stages = {
+                name: _summarize(samples, self._bytes.get(name, 0))
+                for name, samples in sorted(self._samples.items())
+            }
+            for name, peak in self._alloc_peaks.items():
+                stages[name]["peak_alloc_bytes"] = peak
+        return {
+            "label": self.label,
+            "wall_seconds": round(time.perf_counter() - self.started, 3),
+            "stages": stages,
+        }
+
+    def write_report(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self.report(), handle, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+        if self.profile_dir:
+            self._dump_profiles()
+
+    def _add_video_time(self, video_id: str, name: str, seconds: float) -> None:
+        timings = self._videos.get(video_id)
+        if timings is None:
+            timings = self._videos[video_id] = {}
+            while len(self._videos) > MAX_TRACKED_VIDEOS:
+                self._videos.popitem(last=False)
+        timings[name] = timings.get(name, 0.0) + seconds
+
+    def _track_allocations(self, name: str, allocated: int) -> None:
+        import tracemalloc
+
+        with self._lock:
+            if allocated <= self._alloc_peaks.get(name, 0):
+                return
+            self._alloc_peaks[name] = allocated
+        # Keep the heap as it stood after the stage's largest allocation.
+        snapshot = tracemalloc.take_snapshot()
+        with self._lock:
+            self._snapshots[name] = snapshot
+
+    def _dump_profiles(self) -> None:
+        assert self.profile_dir is not None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        with self._lock:
+            profile, self._profile = self._profile, None
+            snapshots = dict(self._snapshots)
+
+        if profile is not None:
+            profile.disable()
+            profile.dump_stats(os.path.join(self.profile_dir, PROFILE_FILENAME))
+        for name, snapshot in snapshots.items():
+            snapshot.dump(os.path.join(self.profile_dir, f"{name}.tracemalloc"))
+
+
+def stage(
+    metrics: Metrics | None, name: str, video_id: str = ""
+) -> ContextManager[StageSample]:
+    if metrics is None:
+        return nullcontext(StageSample())
+    return metrics.stage(name, video_id)
+
+
+def payload_size(payload: Any) -> int:
+    return len(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    # Nearest-rank percentile on a sorted copy.
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(fraction * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _summarize(samples: list[float], nbytes: int) -> dict[str, Any]:
+    return {
+        "calls": len(samples),
+        "total_seconds": round(sum(samples), 3),
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 0.95) * 1000, 2),
+        "max_ms": round(max(samples) * 1000, 2) if samples else 0.0,
+        "bytes": nbytes,
+    }
+
+
+def _traced_memory() -> int:
+    import tracemalloc
+
+    return tracemalloc.get_traced_memory()[0]
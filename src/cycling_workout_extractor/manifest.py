@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, TextIO
+
+from cycling_workout_extractor.parser import PARSER_VERSION
+from cycling_workout_extractor.utils import iter_jsonl, open_jsonl_append
+
+RETRY_STATUSES = {"error", "missing"}
+
+
+def metadata_fingerprint(metadata: dict[str, Any]) -> str:
+    digest = hashlib.sha256()
+    for value in (
+        metadata.get("title", ""),
+        metadata.get("description", ""),
+        str(metadata.get("duration_seconds", 0)),
+    ):
+        digest.update(value.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def settings_fingerprint(config: dict[str, Any]) -> str:
+    settings = {
+        "classification": config.get("classification", {}),
+        "non_workout_keywords": config.get("non_workout_keywords", []),
+        "parser": config.get("parser", {}),
+    }
+    encoded = json.dumps(settings, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class Manifest:
+    def __init__(self, path: str, entries: dict[str, dict[str, Any]] | None = None) -> None:
+        self.path = path
+        self.entries = entries or {}
+        self._pending: dict[str, str] = {}
+        self._handle: TextIO | None = None
+
+    @classmethod
+    def load(cls, path: str) -> "Manifest":
+        entries = {entry["video_id"]: entry for entry in iter_jsonl(path)}
+        return cls(path, entries)
+
+    def is_current(self, video_id: str, fingerprint: str, settings: str) -> bool:
+        entry = self.entries.get(video_id)
+        if not entry or entry.get("removed"):
+            return False
+        return (
+            entry.get("fingerprint") == fingerprint
+            and entry.get("parser_version") == PARSER_VERSION
+            and entry.get("settings") == settings
+            and entry.get("status") not in RETRY_STATUSES
+        )
+
+    def track(
+        self,
+        items: Iterable[tuple[str, dict[str, Any] | None, str]],
+        settings: str,
+        skip_current: bool = True,
+    ) -> Iterator[tuple[str, dict[str, Any] | None, str]]:
+        for video_id, metadata, error in items:
+            fingerprint = metadata_fingerprint(metadata) if metadata else ""
+            if (
+                skip_current
+                and fingerprint
+                and self.is_current(video_id, fingerprint, settings)
+            ):
+                continue
+            self._pending[video_id] = fingerprint
+            yield video_id, metadata, error
+
+    def take_fingerprint(self, video_id: str) -> str:
+        return self._pending.pop(video_id, "")
+
+    def record(
+        self,
+        video_id: str,
+        status: str,
+        settings: str,
+        fingerprint: str | None = None,
+    ) -> None:
+        if fingerprint is None:
+            fingerprint = self.take_fingerprint(video_id)
+        entry = {
+            "video_id": video_id,
+            "fingerprint": fingerprint,
+            "parser_version": PARSER_VERSION,
+            "settings": settings,
+            "status": status,
+            "updated_at": _now(),
+        }
+        self.entries[video_id] = entry
+
+        # Append as we go so an interrupted run keeps what it finished; save()
+        # compacts the file back to one line per video.
+        if self._handle is None:
+            self._handle = open_jsonl_append(self.path)
+        self._handle.write(json.dumps(entry, sort_keys=True))
+        self._handle.write("\n")
+        self._handle.flush()
+
+    def tombstone_missing(self, video_ids: Iterable[str]) -> list[str]:
+        current = set(video_ids)
+        removed: list[str] = []
+        for video_id, entry in self.entries.items():
+            if video_id in current or entry.get("removed"):
+                continue
+            entry["removed"] = True
+            entry["updated_at"] = _now()
+            removed.append(video_id)
+        return sorted(removed)
+
+    def save(self) -> None:
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            for video_id in sorted(self.entries):
+                handle.write(json.dumps(self.entries[video_id], sort_keys=True))
+                handle.write("\n")
+        os.replace(tmp_path, self.path)
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -1,26 +1,42 @@
 from __future__ import annotations
 
 import re
-from typing import Any
-
-from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled, YouTubeTranscriptApi
+import threading
+from functools import lru_cache
+from typing import Any, NamedTuple
 
 from cycling_workout_extractor.utils import (
     parse_timestamp_to_seconds,
     seconds_to_mmss,
 )
 
+PARSER_VERSION = 1
+
 POWER_PATTERNS = [
     re.compile(r"(?P<level>\d{1,2})\s*/\s*10"),
     re.compile(r"(?P<level>\d{1,2})\s*out\s*of\s*10"),
     re.compile(r"effort\s*level\s*(?P<level>\d{1,2})"),
 ]
 
+LEVEL_PATTERN = re.compile(r"level\s*(?P<level>\d{1,2})")
+
 CADENCE_PATTERNS = [
     re.compile(r"(?P<rpm>\d{2,3})\s*rpm"),
     re.compile(r"cadence\s*of\s*(?P<rpm>\d{2,3})"),
 ]
 
+CADENCE_WORD_PATTERNS = [
+    re.compile(r"cadence\s*of\s*(?P<word>[a-z]+)"),
+    re.compile(r"(?P<word>[a-z]+)\s*rpm"),
+]
+
+DURATION_PATTERN = re.compile(
+    r"(?:next|for the next|for)\s+(?P<value>\d+|[a-z]+)\s+"
+    r"(?P<unit>seconds|second|minutes|minute)"
+)
+
+TIMESTAMP_LINE_PATTERN = re.compile(r"^(?P<ts>(?:\d{1,2}:)?\d{1,2}:\d{2})\s+(?P<text>.+)")
+
 ZONE_KEYWORDS = {
     "warmup": "warmup",
     "warm up": "warmup",
@@ -43,17 +59,102 @@ WORD_NUMBERS = {
     "hundred": 100,
 }
 
+_thread_state = threading.local()
+
+
+class Cues(NamedTuple):
+    power: str
+    cadence: int
+    zone: str
+    duration: int | None
+
+    def __bool__(self) -> bool:
+        return bool(self.power or self.cadence or self.zone)
+
+
+NO_CUES = Cues("", 0, "", None)
+
+
+class CueEngine:
+    # Most transcript segments carry no cue at all. One search over the union
+    # of every cue pattern settles those; only segments that hit it run the
+    # per-field extractors, which keep the original precedence rules.
+    def __init__(self, zone_keywords: dict[str, str] | None = None) -> None:
+        self.zone_keywords = dict(ZONE_KEYWORDS)
+        for keyword, zone in (zone_keywords or {}).items():
+            self.zone_keywords.setdefault(keyword.lower(), zone)
+
+        patterns = [
+            *POWER_PATTERNS,
+            LEVEL_PATTERN,
+            *CADENCE_PATTERNS,
+            *CADENCE_WORD_PATTERNS,
+            DURATION_PATTERN,
+        ]
+        alternatives = [_prefilter_source(pattern.pattern) for pattern in patterns]
+        alternatives.extend(map(re.escape, self.zone_keywords))
+        self._prefilter = re.compile("|".join(dict.fromkeys(alternatives)))
+
+        # A zero-width lookahead tries every offset, longest keyword first, so
+        # overlapping keywords are all seen; a shorter keyword that is a
+        # prefix of the one found at an offset is present there too.
+        by_length = sorted(self.zone_keywords, key=len, reverse=True)
+        self._zone_scan = re.compile(
+            "(?=(" + "|".join(map(re.escape, by_length)) + "))"
+        )
+        order = {keyword: index for index, keyword in enumerate(self.zone_keywords)}
+        self._zone_rank = {
+            keyword: min(order[other] for other in order if keyword.startswith(other))
+            for keyword in order
+        }
+        self._zone_by_rank = list(self.zone_keywords.values())
+
+    def extract(self, text: str) -> Cues:
+        if not self._prefilter.search(text):
+            return NO_CUES
+        return Cues(
+            _extract_power(text),
+            _extract_cadence(text),
+            self.extract_zone(text),
+            _extract_duration_override(text),
+        )
+
+    def extract_zone(self, text: str) -> str:
+        # The first configured keyword present anywhere wins, as with the
+        # original dict scan.
+        ranks = [self._zone_rank[match.group(1)] for match in self._zone_scan.finditer(text)]
+        return self._zone_by_rank[min(ranks)] if ranks else ""
+
+
+def cue_engine(config: dict[str, Any] | None = None) -> CueEngine:
+    zone_keywords = (config or {}).get("parser", {}).get("zone_keywords") or {}
+    return _cached_engine(tuple(zone_keywords.items()))
+
+
+@lru_cache(maxsize=8)
+def _cached_engine(zone_items: tuple[tuple[str, str], ...]) -> CueEngine:
+    return CueEngine(dict(zone_items))
+
+
+def _prefilter_source(pattern: str) -> str:
+    # Any match of a pattern also matches it without its leading number or
+    # word capture, and dropping those keeps the combined search from retrying
+    # a character class at every offset.
+    pattern = re.sub(r"\(\?P<\w+>", "(?:", pattern)
+    return re.sub(r"^\(\?:(?:\\d\{\d,\d\}|\[a-z\]\+)\)(?:\\s\*)?", "", pattern)
+
 
 def parse_description_timestamps(
-    description: str, total_duration_seconds: int
+    description: str,
+    total_duration_seconds: int,
+    engine: CueEngine | None = None,
 ) -> list[dict[str, Any]]:
+    engine = engine or cue_engine()
     lines = [line.strip() for line in description.splitlines() if line.strip()]
     matches: list[tuple[int, str]] = []
 
     for line in lines:
-        match = re.match(
-            r"^(?P<ts>(?:\d{1,2}:)?\d{1,2}:\d{2})\s+(?P<text>.+)", line
-        )
+        match = TIMESTAMP_LINE_PATTERN.match(line)
         if match:
             timestamp = match.group("ts")
             text = match.group("text").strip()
@@ -68,7 +169,7 @@ def parse_description_timestamps(
         elif total_duration_seconds:
             end_seconds = total_duration_seconds
 
-        interval = _build_interval(start_seconds, end_seconds, text)
+        interval = _build_interval(start_seconds, end_seconds, text, engine)
         intervals.append(interval)
 
     return intervals
@@ -77,28 +178,40 @@ def parse_description_timestamps(
 def parse_transcript_intervals(
     video_id: str, total_duration_seconds: int
 ) -> list[dict[str, Any]]:
+    transcript = fetch_transcript(video_id)
+    return transcript_to_intervals(transcript, total_duration_seconds)
+
+
+def fetch_transcript(video_id: str) -> list[dict[str, Any]]:
+    from youtube_transcript_api import NoTranscriptFound, TranscriptsDisabled
+
     try:
-        transcript = _fetch_transcript(video_id)
+        return _fetch_transcript(video_id) or []
     except (TranscriptsDisabled, NoTranscriptFound):
         return []
 
+
+def transcript_to_intervals(
+    transcript: list[dict[str, Any]],
+    total_duration_seconds: int,
+    engine: CueEngine | None = None,
+) -> list[dict[str, Any]]:
     if not transcript:
         return []
 
+    engine = engine or cue_engine()
     intervals: list[dict[str, Any]] = []
     for segment in transcript:
         text = segment.get("text", "")
         lower = text.lower()
 
-        power = _extract_power(lower)
-        cadence = _extract_cadence(lower)
-        zone = _extract_zone(lower)
-
-        if not (power or cadence or zone):
+        cues = engine.extract(lower)
+        if not cues:
             continue
+        power, cadence, zone = cues.power, cues.cadence, cues.zone
 
         start_seconds = int(segment.get("start", 0))
-        duration_seconds = _extract_duration_override(lower)
+        duration_seconds = cues.duration
         if duration_seconds is None:
             duration_seconds = int(segment.get("duration", 0))
 
@@ -122,10 +235,12 @@ def parse_transcript_intervals(
 
 
 def _fetch_transcript(video_id: str) -> list[dict[str, Any]]:
+    from youtube_transcript_api import YouTubeTranscriptApi
+
     if hasattr(YouTubeTranscriptApi, "get_transcript"):
         return YouTubeTranscriptApi.get_transcript(video_id)
 
-    api = YouTubeTranscriptApi() if callable(YouTubeTranscriptApi) else None
+    api = _transcript_api()
     if api and hasattr(api, "get_transcript"):
         return api.get_transcript(video_id)
 
@@ -134,36 +249,61 @@ def _fetch_transcript(video_id: str) -> list[dict[str, Any]]:
         transcripts = YouTubeTranscriptApi.list_transcripts(video_id)
     elif api and hasattr(api, "list_transcripts"):
         transcripts = api.list_transcripts(video_id)
+    elif api and hasattr(api, "list"):
+        transcripts = api.list(video_id)
 
     if not transcripts:
         return []
 
     try:
-        return transcripts.find_transcript(["en"]).fetch()
+        return _raw_transcript(transcripts.find_transcript(["en"]).fetch())
     except Exception:  # noqa: BLE001
         pass
 
     try:
-        return transcripts.find_generated_transcript(["en"]).fetch()
+        return _raw_transcript(transcripts.find_generated_transcript(["en"]).fetch())
     except Exception:  # noqa: BLE001
         pass
 
     for transcript in transcripts:
         try:
-            return transcript.fetch()
+            return _raw_transcript(transcript.fetch())
         except Exception:  # noqa: BLE001
             continue
 
     return []
 
 
+def _transcript_api() -> Any:
+    # One client per worker thread: each keeps its own keep-alive session, so
+    # concurrent transcript fetches reuse connections without sharing state.
+    api = getattr(_thread_state, "api", None)
+    if api is None:
+        import requests
+        from youtube_transcript_api import YouTubeTranscriptApi
+
+        try:
+            api = YouTubeTranscriptApi(http_client=requests.Session())
+        except TypeError:
+            api = YouTubeTranscriptApi() if callable(YouTubeTranscriptApi) else None
+        _thread_state.api = api
+    return api
+
+
+def _raw_transcript(transcript: Any) -> list[dict[str, Any]]:
+    if hasattr(transcript, "to_raw_data"):
+        return transcript.to_raw_data()
+    return transcript
+
+
 def _build_interval(
-    start_seconds: int, end_seconds: int | None, text: str
+    start_seconds: int,
+    end_seconds: int | None,
+    text: str,
+    engine: CueEngine | None = None,
 ) -> dict[str, Any]:
-    lower = text.lower()
-    power = _extract_power(lower)
-    cadence = _extract_cadence(lower)
-    zone = _extract_zone(lower)
+    cues = (engine or cue_engine()).extract(text.lower())
+    power, cadence, zone = cues.power, cues.cadence, cues.zone
 
     duration_seconds = end_seconds - start_seconds if end_seconds else 0
     return {
@@ -177,52 +317,47 @@ def _build_interval(
     }
 
 
+# Each extractor first checks for a literal that all of its patterns need.
 def _extract_power(text: str) -> str:
+    if "10" not in text and "level" not in text:
+        return ""
     for pattern in POWER_PATTERNS:
         match = pattern.search(text)
         if match:
             level = int(match.group("level"))
             return f"{level}/10"
-    match = re.search(r"level\s*(\d{1,2})", text)
+    match = LEVEL_PATTERN.search(text)
     if match:
-        return f"{int(match.group(1))}/10"
+        return f"{int(match.group('level'))}/10"
     return ""
 
 
 def _extract_cadence(text: str) -> int:
+    if "rpm" not in text and "cadence" not in text:
+        return 0
     for pattern in CADENCE_PATTERNS:
         match = pattern.search(text)
         if match:
             return int(match.group("rpm"))
 
-    match = re.search(r"cadence\s*of\s*(?P<word>[a-z]+)", text)
-    if match:
-        word = match.group("word")
-        if word in WORD_NUMBERS:
-            return WORD_NUMBERS[word]
-
-    word_match = re.search(r"(?P<word>[a-z]+)\s*rpm", text)
-    if word_match:
-        word = word_match.group("word")
-        if word in WORD_NUMBERS:
-            return WORD_NUMBERS[word]
+    for pattern in CADENCE_WORD_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            word = match.group("word")
+            if word in WORD_NUMBERS:
+                return WORD_NUMBERS[word]
 
     return 0
 
 
 def _extract_zone(text: str) -> str:
-    for keyword, zone in ZONE_KEYWORDS.items():
-        if keyword in text:
-            return zone
-    return ""
+    return cue_engine().extract_zone(text)
 
 
 def _extract_duration_override(text: str) -> int | None:
-    match = re.search(
-        r"(?:next|for the next|for)\s+(?P<value>\d+|[a-z]+)\s+"
-        r"(?P<unit>seconds|second|minutes|minute)",
-        text,
-    )
+    if "second" not in text and "minute" not in text:
+        return None
+    match = DURATION_PATTERN.search(text)
     if not match:
         return None
 
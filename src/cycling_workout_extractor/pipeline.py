@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator
+
+from cycling_workout_extractor.archive import RawArchive
+from cycling_workout_extractor.classifier import UNKNOWN, classifier_from_config
+from cycling_workout_extractor.corpus_store import CorpusStore
+from cycling_workout_extractor.exporter import VideoResult, write_json
+from cycling_workout_extractor.extractor import (
+    VIDEOS_BATCH_SIZE,
+    fetch_video_batch,
+    normalize_video_item,
+)
+from cycling_workout_extractor.instrumentation import Metrics, payload_size, stage
+from cycling_workout_extractor.parser import (
+    cue_engine,
+    fetch_transcript,
+    parse_description_timestamps,
+    transcript_to_intervals,
+)
+from cycling_workout_extractor.quota import QuotaExhausted
+from cycling_workout_extractor.search import SearchIndex
+from cycling_workout_extractor.serialization import Serializer
+from cycling_workout_extractor.utils import chunked
+from cycling_workout_extractor.validator import validate_workout
+
+logger = logging.getLogger("cycling_workout_extractor")
+
+TranscriptFetcher = Callable[[str], list[dict[str, Any]]]
+
+
+def iter_video_metadata(
+    youtube: Any,
+    video_ids: Iterable[str],
+    archive: RawArchive | None = None,
+    metrics: Metrics | None = None,
+) -> Iterator[tuple[str, dict[str, Any] | None, str]]:
+    for batch in chunked(video_ids, VIDEOS_BATCH_SIZE):
+        try:
+            with stage(metrics, "metadata") as sample:
+                started = time.perf_counter()
+                fetched = fetch_video_batch(youtube, batch)
+                if metrics is not None:
+                    sample.bytes = payload_size([item for _, item in fetched])
+                    metrics.share("metadata", time.perf_counter() - started, batch)
+        except QuotaExhausted:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Failed fetching metadata for %d videos", len(batch))
+            for video_id in batch:
+                yield video_id, None, str(exc)
+            continue
+
+        for video_id, item in fetched:
+            if not item:
+                yield video_id, None, ""
+                continue
+            if archive is not None:
+                archive.put("metadata", video_id, item)
+            yield video_id, normalize_video_item(video_id, item), ""
+
+
+def iter_archived_metadata(
+    archive: RawArchive, video_ids: Iterable[str] | None = None
+) -> Iterator[tuple[str, dict[str, Any] | None, str]]:
+    if video_ids is None:
+        video_ids = archive.video_ids("metadata")
+    for video_id in video_ids:
+        item = archive.get("metadata", video_id)
+        metadata = normalize_video_item(video_id, item) if item else None
+        yield video_id, metadata, ""
+
+
+def process_videos(
+    items: Iterable[tuple[str, dict[str, Any] | None, str]],
+    config: dict[str, Any],
+    workers: int = 1,
+    transcript_fetcher: TranscriptFetcher = fetch_transcript,
+    metrics: Metrics | None = None,
+) -> Iterator[VideoResult]:
+    if workers <= 1:
+        for video_id, metadata, error in items:
+            yield process_video(
+                video_id, metadata, config, error, transcript_fetcher, metrics
+            )
+        return
+
+    # Items are pulled lazily on the calling thread, so the next metadata batch
+    # is fetched while workers are busy with transcripts; the in-flight window
+    # keeps memory bounded.
+    max_pending = workers * 2
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="video") as pool:
+        pending = set()
+        try:
+            for video_id, metadata, error in items:
+                pending.add(
+                    pool.submit(
+                        process_video,
+                        video_id,
+                        metadata,
+                        config,
+                        error,
+                        transcript_fetcher,
+                        metrics,
+                    )
+                )
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+        except Exception:
+            # The items stopped (an exhausted quota, say): the videos already
+            # in flight still finish and are handed back before the error.
+            for future in pending:
+                yield future.result()
+            raise
+
+        for future in pending:
+            yield future.result()
+
+
+def process_video(
+    video_id: str,
+    metadata: dict[str, Any] | None,
+    config: dict[str, Any],
+    error: str = "",
+    transcript_fetcher: TranscriptFetcher = fetch_transcript,
+    metrics: Metrics | None = None,
+) -> VideoResult:
+    if error:
+        return video_id, None, [f"{video_id}\terror: {error}"]
+
+    try:
+        if not metadata:
+            return video_id, None, [f"{video_id}\tmissing metadata"]
+
+        title = metadata["title"]
+        description = metadata["description"]
+
+        with stage(metrics, "classify", video_id):
+            classification = classifier_from_config(config).classify(title, description)
+        if not classification.is_workout:
+            result = _skipped_result(
+                video_id, title, metadata["url"], metadata["duration_minutes"]
+            )
+            return _with_timings(result, config, metrics)
+
+        engine = cue_engine(config)
+        with stage(metrics, "parse", video_id):
+            intervals = parse_description_timestamps(
+                description, metadata["duration_seconds"], engine
+            )
+        if not intervals:
+            with stage(metrics, "transcript", video_id) as sample:
+                transcript = transcript_fetcher(video_id) or []
+                if metrics is not None:
+                    sample.bytes = payload_size(transcript)
+            with stage(metrics, "parse", video_id):
+                intervals = transcript_to_intervals(
+                    transcript, metadata["duration_seconds"], engine
+                )
+
+        workout_type = classification.workout_type
+        record = {
+            "video_id": video_id,
+            "title": title,
+            "url": metadata["url"],
+            "workout_type": workout_type,
+            "duration_minutes": metadata["duration_minutes"],
+            "intervals": intervals,
+        }
+
+        review_entries: list[str] = []
+        with stage(metrics, "validate", video_id):
+            is_valid, reasons = validate_workout(record)
+        status = "ok" if is_valid else "needs_review"
+        review_reason = "; ".join(reasons) if reasons else ""
+        if not is_valid:
+            review_entries.append(f"{video_id}\t{review_reason}")
+
+        if intervals:
+            with stage(metrics, "write", video_id) as sample:
+                path = write_json(
+                    record,
+                    config["output"]["workouts_dir"],
+                    Serializer.from_config(config),
+                    CorpusStore.from_config(config),
+                    SearchIndex.from_config(config),
+                    description,
+                )
+                if metrics is not None:
+                    sample.bytes = os.path.getsize(path)
+
+        row = {
+            "video_id": video_id,
+            "title": title,
+            "url": metadata["url"],
+            "workout_type": workout_type,
+            "duration_minutes": metadata["duration_minutes"],
+            "intervals_count": len(intervals),
+            "status": status,
+            "review_reason": review_reason,
+        }
+        return _with_timings((video_id, row, review_entries), config, metrics)
+
+    except Exception as exc:  # noqa: BLE001
+        logger.exception("Failed processing %s", video_id)
+        return video_id, None, [f"{video_id}\terror: {exc}"]
+
+
+def triage_item(
+    item: dict[str, Any],
+    config: dict[str, Any],
+    skip_unknown: bool = False,
+) -> VideoResult | None:
+    # Playlist snippets carry the same title and description as videos.list,
+    # so obvious non-workouts are settled here without a metadata or
+    # transcript fetch.
+    video_id = item["video_id"]
+    title = item["title"]
+    description = item["description"]
+
+    # Playlist items carry no duration, so the row leaves it blank unless
+    # the item has one; 0 would read as a zero-minute video.
+    duration_minutes = item.get("duration_minutes")
+
+    classification = classifier_from_config(config).classify(title, description)
+    if not classification.is_workout:
+        return _skipped_result(video_id, title, item["url"], duration_minutes)
+
+    if skip_unknown and classification.workout_type == UNKNOWN:
+        return _skipped_result(
+            video_id,
+            title,
+            item["url"],
+            duration_minutes,
+            workout_type=UNKNOWN,
+            reason="unclassified",
+        )
+
+    return None
+
+
+def collect_results(
+    results: Iterable[VideoResult],
+) -> tuple[list[dict[str, Any]], list[str]]:
+    summary_rows: list[dict[str, Any]] = []
+    review_entries: list[str] = []
+    for _, row, entries in sorted(results, key=lambda result: result[0]):
+        if row is not None:
+            summary_rows.append(row)
+        review_entries.extend(entries)
+    return summary_rows, review_entries
+
+
+def result_status(result: VideoResult) -> str:
+    _, row, entries = result
+    if row is not None:
+        return row["status"]
+    if any("\terror: " in entry for entry in entries):
+        return "error"
+    return "missing"
+
+
+def _skipped_result(
+    video_id: str,
+    title: str,
+    url: str,
+    duration_minutes: int | None,
+    workout_type: str = "Non-workout",
+    reason: str = "non-workout",
+) -> VideoResult:
+    row = {
+        "video_id": video_id,
+        "title": title,
+        "url": url,
+        "workout_type": workout_type,
+        "duration_minutes": duration_minutes,
+        "intervals_count": 0,
+        "status": "skipped",
+        "review_reason": reason,
+    }
+    return video_id, row, [f"{video_id}\t{reason}: {title}"]
+
+
+def _with_timings(
+    result: VideoResult, config: dict[str, Any], metrics: Metrics | None
+) -> VideoResult:
+    video_id, row, entries = result
+    if metrics is None or row is None:
+        return result
+    timings = metrics.video_timings(video_id)
+    if not config.get("instrumentation", {}).get("summary_timings", False):
+        return result
+    return video_id, {**row, **timings}, entries
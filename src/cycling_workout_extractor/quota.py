@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from cycling_workout_extractor.extractor import VIDEOS_BATCH_SIZE, build_youtube_client
+
+logger = logging.getLogger("cycling_workout_extractor")
+
+DEFAULT_DAILY_QUOTA = 10000
+METHOD_COSTS = {
+    "playlistItems.list": 1,
+    "videos.list": 1,
+}
+QUOTA_REASONS = (b"quotaExceeded", b"dailyLimitExceeded")
+RATE_LIMIT_REASONS = (b"rateLimitExceeded", b"userRateLimitExceeded")
+RETRY_STATUSES = {403, 429, 500, 503}
+
+
+class QuotaExhausted(RuntimeError):
+    pass
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate: float,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            if self._tokens < 1:
+                self._sleep((1 - self._tokens) / self.rate)
+                self._tokens = 1
+                self._updated = self._clock()
+            self._tokens -= 1
+
+
+class QuotaScheduler:
+    def __init__(
+        self,
+        api_keys: list[str],
+        state_path: str | None = None,
+        daily_quota: int = DEFAULT_DAILY_QUOTA,
+        requests_per_second: float = 0,
+        max_retries: int = 5,
+        backoff_seconds: float = 1.0,
+        client_factory: Callable[[str], Any] = build_youtube_client,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.api_keys = list(api_keys)
+        self.state_path = state_path
+        self.daily_quota = daily_quota
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._client_factory = client_factory
+        self._sleep = sleep
+        self._bucket = TokenBucket(requests_per_second, sleep=sleep)
+        self._clients: dict[str, Any] = {}
+        self._exhausted: set[str] = set()
+        self._lock = threading.Lock()
+        self._day = _quota_day()
+        self._used: dict[str, int] = self._load_usage()
+        # Usage as last read from state_path; save() adds only what this
+        # process spent since, so concurrent workers do not overwrite each
+        # other's spend.
+        self._saved: dict[str, int] = dict(self._used)
+
+    @classmethod
+    def from_config(
+        cls, config: dict[str, Any], api_keys: list[str], **kwargs: Any
+    ) -> "QuotaScheduler":
+        # kwargs override the configured settings, state_path=None included.
+        api_config = config.get("api", {})
+        settings: dict[str, Any] = {
+            "state_path": api_config.get(
+                "quota_state", os.path.join(config["output"]["logs_dir"], "quota.json")
+            ),
+            "daily_quota": int(api_config.get("daily_quota", DEFAULT_DAILY_QUOTA)),
+            "requests_per_second": float(api_config.get("requests_per_second", 0)),
+        }
+        return cls(api_keys, **{**settings, **kwargs})
+
+    def remaining(self) -> dict[str, int]:
+        with self._lock:
+            self._roll_day()
+            return {
+                _key_id(key): max(0, self.daily_quota - self._used.get(_key_id(key), 0))
+                for key in self.api_keys
+            }
+
+    def execute(self, method: str, build_request: Callable[[Any], Any]) -> Any:
+        cost = METHOD_COSTS.get(method, 1)
+        # Only transient errors use up retries; a key out of quota is dropped
+        # and the request moves on until _pick_key runs out of keys.
+        attempt = 0
+        while True:
+            key = self._pick_key(cost)
+            self._bucket.acquire()
+            try:
+                response = build_request(self._client(key)).execute()
+            except Exception as exc:  # noqa: BLE001
+                status = _http_status(exc)
+                if status == 403 and _has_reason(exc, QUOTA_REASONS):
+                    logger.warning("API key %s exhausted its quota", _key_id(key))
+                    self._exhaust(key)
+                    continue
+                self._spend(key, cost)
+                if (
+                    status not in RETRY_STATUSES
+                    or (status == 403 and not _has_reason(exc, RATE_LIMIT_REASONS))
+                    or attempt >= self.max_retries
+                ):
+                    raise
+                delay = self.backoff_seconds * (2**attempt) * (1 + random.random())
+                logger.warning("%s returned %s, retrying in %.1fs", method, status, delay)
+                self._sleep(delay)
+                attempt += 1
+                continue
+
+            self._spend(key, cost)
+            return response
+
+    def save(self) -> None:
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with self._lock, open(f"{self.state_path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._roll_day()
+                used = self._load_usage()
+                for key_id, value in self._used.items():
+                    spent = value - self._saved.get(key_id, 0)
+                    used[key_id] = min(self.daily_quota, used.get(key_id, 0) + spent)
+                tmp_path = f"{self.state_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as handle:
+                    json.dump(
+                        {"day": self._day, "used": used}, handle, indent=2, sort_keys=True
+                    )
+                os.replace(tmp_path, self.state_path)
+                self._used = dict(used)
+                self._saved = dict(used)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _pick_key(self, cost: int) -> str:
+        with self._lock:
+            self._roll_day()
+            best_key = None
+            best_remaining = 0
+            for key in self.api_keys:
+                if key in self._exhausted:
+                    continue
+                remaining = self.daily_quota - self._used.get(_key_id(key), 0)
+                if remaining >= cost and remaining > best_remaining:
+                    best_key, best_remaining = key, remaining
+            if best_key is None:
+                raise QuotaExhausted("All API keys have exhausted today's quota")
+            return best_key
+
+    def _spend(self, key: str, cost: int) -> None:
+        with self._lock:
+            key_id = _key_id(key)
+            self._used[key_id] = self._used.get(key_id, 0) + cost
+
+    def _exhaust(self, key: str) -> None:
+        with self._lock:
+            self._exhausted.add(key)
+            self._used[_key_id(key)] = self.daily_quota
+
+    def _client(self, key: str) -> Any:
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._client_factory(key)
+                self._clients[key] = client
+            return client
+
+    def _roll_day(self) -> None:
+        day = _quota_day()
+        if day != self._day:
+            self._day = day
+            self._used = {}
+            self._saved = {}
+            self._exhausted.clear()
+
+    def _load_usage(self) -> dict[str, int]:
+        if not self.state_path or not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, "r", encoding="utf-8") as handle:
+            state = json.load(handle)
+        if state.get("day") != self._day:
+            return {}
+        return {key: int(value) for key, value in state.get("used", {}).items()}
+
+
+class ScheduledYouTube:
+    # Mimics the googleapiclient resource interface so the extractor functions
+    # work unchanged, routing every execute() through the scheduler.
+    def __init__(self, scheduler: QuotaScheduler) -> None:
+        self.scheduler = scheduler
+
+    def playlistItems(self) -> "_ScheduledResource":  # noqa: N802
+        return _ScheduledResource(self.scheduler, "playlistItems")
+
+    def videos(self) -> "_ScheduledResource":
+        return _ScheduledResource(self.scheduler, "videos")
+
+
+class _ScheduledResource:
+    def __init__(self, scheduler: QuotaScheduler, name: str) -> None:
+        self._scheduler = scheduler
+        self._name = name
+
+    def list(self, **kwargs: Any) -> "_ScheduledRequest":
+        def build_request(client: Any) -> Any:
+            return getattr(client, self._name)().list(**kwargs)
+
+        return _ScheduledRequest(self._scheduler, f"{self._name}.list", build_request)
+
+
+class _ScheduledRequest:
+    def __init__(
+        self,
+        scheduler: QuotaScheduler,
+        method: str,
+        build_request: Callable[[Any], Any],
+    ) -> None:
+        self._scheduler = scheduler
+        self._method = method
+        self._build_request = build_request
+
+    def execute(self) -> Any:
+        return self._scheduler.execute(self._method, self._build_request)
+
+
+def load_api_keys(config: dict[str, Any]) -> list[str]:
+    api_config = config.get("api", {})
+    keys: list[str] = []
+    pool = os.getenv(api_config.get("keys_env", "YOUTUBE_API_KEYS"), "")
+    keys.extend(key.strip() for key in pool.split(",") if key.strip())
+    single = os.getenv(api_config.get("key_env", "YOUTUBE_API_KEY"), "").strip()
+    if single and single not in keys:
+        keys.append(single)
+    return keys
+
+
+def estimate_quota(
+    playlist_count: int, known_videos: int, triaged_videos: int = 0
+) -> dict[str, int]:
+    playlist_pages = playlist_count + math.ceil(known_videos / 50)
+    video_batches = math.ceil(max(0, known_videos - triaged_videos) / VIDEOS_BATCH_SIZE)
+    usage = {
+        "playlistItems.list": playlist_pages * METHOD_COSTS["playlistItems.list"],
+        "videos.list": video_batches * METHOD_COSTS["videos.list"],
+    }
+    usage["total"] = sum(usage.values())
+    return usage
+
+
+def _http_status(exc: Exception) -> int | None:
+    resp = getattr(exc, "resp", None)
+    status = getattr(resp, "status", None)
+    try:
+        return int(status) if status is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _has_reason(exc: Exception, reasons: tuple[bytes, ...]) -> bool:
+    content = getattr(exc, "content", b"") or b""
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return any(reason in content for reason in reasons)
+
+
+def _key_id(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _quota_day() -> str:
+    # YouTube quotas reset at midnight Pacific time.
+    try:
+        from zoneinfo import ZoneInfo
+
+        pacific = ZoneInfo("America/Los_Angeles")
+    except Exception:  # noqa: BLE001
+        pacific = timezone(timedelta(hours=-8))
+    return datetime.now(pacific).date().isoformat()
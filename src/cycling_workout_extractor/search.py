@@ -0,0 +1,483 @@
+from __future__ import annotations
+
+import glob
+import math
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from contextlib import contextmanager
+from itertools import accumulate
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, NamedTuple, Union
+
+from cycling_workout_extractor import serialization
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workouts (
+    id INTEGER PRIMARY KEY,
+    video_id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    url TEXT NOT NULL,
+    workout_type TEXT NOT NULL,
+    duration_minutes INTEGER NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workouts_type ON workouts (workout_type, duration_minutes);
+CREATE INDEX IF NOT EXISTS workouts_duration ON workouts (duration_minutes);
+CREATE TABLE IF NOT EXISTS intervals (
+    workout_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    cadence_rpm INTEGER NOT NULL,
+    power INTEGER,
+    PRIMARY KEY (workout_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS intervals_cadence ON intervals (cadence_rpm, workout_id);
+CREATE INDEX IF NOT EXISTS intervals_power ON intervals (power, workout_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS workout_text USING fts5(
+    title, description, intervals, tokenize = 'porter unicode61'
+);
+"""
+
+# Row counts per (type, duration) and per interval value for search()'s plan
+# choice, adjusted by _count as workouts are written and removed. A database
+# from before them is backfilled once.
+COUNTS_SCHEMA = (
+    """CREATE TABLE workout_counts (
+        workout_type TEXT NOT NULL,
+        duration_minutes INTEGER NOT NULL,
+        row_count INTEGER NOT NULL,
+        PRIMARY KEY (workout_type, duration_minutes)
+    ) WITHOUT ROWID""",
+    """CREATE TABLE interval_counts (
+        column_name TEXT NOT NULL,
+        value INTEGER NOT NULL,
+        row_count INTEGER NOT NULL,
+        PRIMARY KEY (column_name, value)
+    ) WITHOUT ROWID""",
+    """INSERT INTO workout_counts SELECT workout_type, duration_minutes, COUNT(*)
+    FROM workouts GROUP BY workout_type, duration_minutes""",
+    """INSERT INTO interval_counts SELECT 'cadence_rpm', cadence_rpm, COUNT(*)
+    FROM intervals GROUP BY cadence_rpm""",
+    """INSERT INTO interval_counts SELECT 'power', power, COUNT(*)
+    FROM intervals WHERE power IS NOT NULL GROUP BY power""",
+)
+INTERVAL_INDEXES = {"cadence_rpm": "intervals_cadence", "power": "intervals_power"}
+
+SNIPPET_TOKENS = 12
+
+# search() plans: walk workouts (or text matches) in id order and stop at
+# the limit, or fetch candidates through the type/duration index or an
+# interval index first. The cheapest by estimated rows touched wins.
+_SCAN = "scan"
+_WORKOUTS = "workouts"
+_INTERVALS = "intervals"
+# Costs of checking one workout's intervals and its text, relative to
+# reading its row.
+_PROBE_COST = 4.0
+_MATCH_COST = 100.0
+
+# An exact value or an inclusive (low, high) range.
+Bound = Union[int, tuple[int, int]]
+
+
+class SearchHit(NamedTuple):
+    video_id: str
+    title: str
+    snippet: str
+
+
+class _Histogram:
+    # Row counts by value, summed over a Bound by bisection.
+    def __init__(self, counts: Iterable[tuple[int, int]]) -> None:
+        pairs = sorted(counts)
+        self.values = [value for value, _ in pairs]
+        self.totals = [0, *accumulate(count for _, count in pairs)]
+
+    def within(self, bound: Bound | None) -> int:
+        if bound is None:
+            return self.totals[-1]
+        low, high = bound if isinstance(bound, tuple) else (bound, bound)
+        start = bisect_left(self.values, low)
+        end = max(bisect_right(self.values, high), start)
+        return self.totals[end] - self.totals[start]
+
+
+class _PlannerCounts(NamedTuple):
+    workouts: int
+    # Duration histograms per workout type; None holds every type.
+    durations: dict[str | None, _Histogram]
+    intervals: int
+    values: dict[str, _Histogram]
+
+
+class SearchIndex:
+    # workout_text shares its rowid with workouts.id, so replacing a video's
+    # text is a delete and insert by key. Interval filters (cadence, power)
+    # must hold for the same interval.
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=60, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._counts: _PlannerCounts | None = None
+        self._counts_version = -1
+        if not self._has_counts():
+            with self._transaction() as conn:
+                if not self._has_counts():
+                    for statement in COUNTS_SCHEMA:
+                        conn.execute(statement)
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "SearchIndex | None":
+        path = config.get("output", {}).get("search_index")
+        if not path:
+            return None
+        return _open_index(os.path.abspath(path))
+
+    def add(self, record: dict[str, Any], description: str = "") -> None:
+        with self._transaction() as conn:
+            self._insert(conn, record, description)
+
+    def add_many(
+        self, items: Iterable[tuple[dict[str, Any], str]], replace: bool = False
+    ) -> int:
+        # replace=True also drops every video not among the items, in the
+        # same transaction, so the index ends up holding exactly them.
+        video_ids: set[str] = set()
+        with self._transaction() as conn:
+            for record, description in items:
+                self._insert(conn, record, description)
+                video_ids.add(record["video_id"])
+            if replace:
+                indexed = [row[0] for row in conn.execute("SELECT video_id FROM workouts")]
+                for video_id in indexed:
+                    if video_id not in video_ids:
+                        self._delete(conn, video_id)
+        return len(video_ids)
+
+    def remove(self, video_id: str) -> bool:
+        return self.remove_many([video_id]) == 1
+
+    def remove_many(self, video_ids: Iterable[str]) -> int:
+        with self._transaction() as conn:
+            return sum(self._delete(conn, video_id) for video_id in video_ids)
+
+    def search(
+        self,
+        text: str = "",
+        workout_type: str | None = None,
+        duration: Bound | None = None,
+        cadence: Bound | None = None,
+        power: Bound | None = None,
+        limit: int = 50,
+        ranked: bool = False,
+    ) -> list[SearchHit]:
+        # Hits come back in indexing order, which lets SQLite stop at the
+        # limit; ranked=True orders text matches by bm25, which scores every
+        # match first.
+        with self._lock:
+            plan, interval_column = (
+                (_SCAN, None)
+                if text and ranked
+                else _choose_plan(
+                    self._planner_counts(), bool(text), workout_type, duration,
+                    cadence, power, limit,
+                )
+            )
+        clauses: list[str] = []
+        params: list[Any] = []
+        columns = "w.video_id, w.title, ''"
+        if text:
+            columns = (
+                "w.video_id, w.title, snippet(workout_text, -1, '[', ']', "
+                f"'...', {SNIPPET_TOKENS})"
+            )
+            clauses.append("workout_text MATCH ?")
+            params.append(_match_expression(text))
+        if text and plan == _SCAN:
+            source = "workout_text CROSS JOIN workouts w ON w.id = workout_text.rowid"
+            order = "workout_text.rank" if ranked else "workout_text.rowid"
+        else:
+            # The hints pin the plan chosen above; INTEGER PRIMARY KEY
+            # lookups stay available under NOT INDEXED.
+            if plan == _WORKOUTS:
+                hint = "INDEXED BY " + ("workouts_type" if workout_type else "workouts_duration")
+            else:
+                hint = "NOT INDEXED"
+            source = f"workouts w {hint}"
+            if text:
+                source += " CROSS JOIN workout_text ON workout_text.rowid = w.id"
+            order = "w.id"
+        if workout_type:
+            clauses.append("w.workout_type = ?")
+            params.append(workout_type)
+        if duration is not None:
+            clauses.append(_bound_clause("w.duration_minutes", duration, params))
+
+        interval_clauses: list[str] = []
+        for column, bound in (("cadence_rpm", cadence), ("power", power)):
+            if bound is not None:
+                interval_clauses.append(_bound_clause(f"i.{column}", bound, params))
+        if interval_clauses and plan == _INTERVALS:
+            clauses.append(
+                "w.id IN (SELECT i.workout_id FROM intervals i INDEXED BY "
+                f"{INTERVAL_INDEXES[interval_column]} WHERE "
+                + " AND ".join(interval_clauses)
+                + ")"
+            )
+        elif interval_clauses:
+            clauses.append(
+                "EXISTS (SELECT 1 FROM intervals i WHERE i.workout_id = w.id AND "
+                + " AND ".join(interval_clauses)
+                + ")"
+            )
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns} FROM {source}{where} ORDER BY {order} LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+        return [SearchHit(*row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM workouts").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _has_counts(self) -> bool:
+        row = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'workout_counts'"
+        ).fetchone()
+        return row is not None
+
+    def _planner_counts(self) -> _PlannerCounts:
+        # Callers hold self._lock. Reread only after a commit, here or (as
+        # data_version reports) from another connection.
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._counts is not None and version == self._counts_version:
+            return self._counts
+        by_type: dict[str | None, list[tuple[int, int]]] = {None: []}
+        for workout_type, duration, count in self._conn.execute(
+            "SELECT workout_type, duration_minutes, row_count FROM workout_counts"
+        ):
+            by_type.setdefault(workout_type, []).append((duration, count))
+            by_type[None].append((duration, count))
+        by_column: dict[str, list[tuple[int, int]]] = {name: [] for name in INTERVAL_INDEXES}
+        for column, value, count in self._conn.execute(
+            "SELECT column_name, value, row_count FROM interval_counts"
+        ):
+            by_column[column].append((value, count))
+        self._counts = _PlannerCounts(
+            workouts=sum(count for _, count in by_type[None]),
+            durations={key: _Histogram(counts) for key, counts in by_type.items()},
+            intervals=sum(count for _, count in by_column["cadence_rpm"]),
+            values={key: _Histogram(counts) for key, counts in by_column.items()},
+        )
+        self._counts_version = version
+        return self._counts
+
+    def _delete(self, conn: sqlite3.Connection, video_id: str) -> bool:
+        row = conn.execute("SELECT id FROM workouts WHERE video_id = ?", (video_id,)).fetchone()
+        if row is None:
+            return False
+        _count(conn, row[0], -1)
+        conn.execute("DELETE FROM intervals WHERE workout_id = ?", row)
+        conn.execute("DELETE FROM workout_text WHERE rowid = ?", row)
+        conn.execute("DELETE FROM workouts WHERE id = ?", row)
+        return True
+
+    def _insert(
+        self, conn: sqlite3.Connection, record: dict[str, Any], description: str
+    ) -> None:
+        intervals = record.get("intervals") or []
+        row = conn.execute(
+            "SELECT id FROM workouts WHERE video_id = ?", (record["video_id"],)
+        ).fetchone()
+        values = (
+            record.get("title") or "",
+            record.get("url") or "",
+            record.get("workout_type") or "",
+            int(record.get("duration_minutes") or 0),
+            time.time(),
+        )
+        if row is None:
+            workout_id = conn.execute(
+                "INSERT INTO workouts (title, url, workout_type, duration_minutes, "
+                "updated_at, video_id) VALUES (?, ?, ?, ?, ?, ?)",
+                (*values, record["video_id"]),
+            ).lastrowid
+        else:
+            workout_id = row[0]
+            _count(conn, workout_id, -1)
+            conn.execute(
+                "UPDATE workouts SET title = ?, url = ?, workout_type = ?, "
+                "duration_minutes = ?, updated_at = ? WHERE id = ?",
+                (*values, workout_id),
+            )
+            conn.execute("DELETE FROM intervals WHERE workout_id = ?", (workout_id,))
+            conn.execute("DELETE FROM workout_text WHERE rowid = ?", (workout_id,))
+
+        conn.executemany(
+            "INSERT INTO intervals (workout_id, position, cadence_rpm, power) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (
+                    workout_id,
+                    position,
+                    int(interval.get("cadence_rpm") or 0),
+                    _power(interval.get("power_level") or ""),
+                )
+                for position, interval in enumerate(intervals)
+            ),
+        )
+        _count(conn, workout_id, 1)
+        conn.execute(
+            "INSERT INTO workout_text (rowid, title, description, intervals) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                workout_id,
+                values[0],
+                description,
+                "\n".join(
+                    interval.get("description") or "" for interval in intervals
+                ),
+            ),
+        )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._counts = None
+
+
+def index_directory(
+    index: SearchIndex, directory: str, descriptions: dict[str, str] | None = None
+) -> int:
+    # Mirrors the directory: workouts no longer in it leave the index.
+    descriptions = descriptions or {}
+    records = (
+        serialization.load(path)
+        for path in sorted(glob.glob(os.path.join(directory, "*.json")))
+    )
+    return index.add_many(
+        ((record, descriptions.get(record.get("video_id", ""), "")) for record in records),
+        replace=True,
+    )
+
+
+def _count(conn: sqlite3.Connection, workout_id: int, sign: int) -> None:
+    # Adds a written workout to the planner counts, or with sign -1 takes it
+    # out before its rows change.
+    conn.execute(
+        "INSERT INTO workout_counts SELECT workout_type, duration_minutes, ? "
+        "FROM workouts WHERE id = ? ON CONFLICT (workout_type, duration_minutes) "
+        "DO UPDATE SET row_count = row_count + excluded.row_count",
+        (sign, workout_id),
+    )
+    for column in INTERVAL_INDEXES:
+        conn.execute(
+            f"INSERT INTO interval_counts SELECT '{column}', {column}, ? * COUNT(*) "
+            f"FROM intervals WHERE workout_id = ? AND {column} IS NOT NULL "
+            f"GROUP BY {column} ON CONFLICT (column_name, value) "
+            "DO UPDATE SET row_count = row_count + excluded.row_count",
+            (sign, workout_id),
+        )
+
+
+@lru_cache(maxsize=8)
+def _open_index(path: str) -> SearchIndex:
+    return SearchIndex(path)
+
+
+def _choose_plan(
+    counts: _PlannerCounts,
+    text: bool,
+    workout_type: str | None,
+    duration: Bound | None,
+    cadence: Bound | None,
+    power: Bound | None,
+    limit: int,
+) -> tuple[str, str | None]:
+    # Estimates assume the filters are independent and, for text, that most
+    # workouts match; only the plan depends on them, never the hits.
+    workouts = max(counts.workouts, 1)
+    durations = counts.durations.get(workout_type if workout_type else None)
+    matches = durations.within(duration) if durations is not None else 0
+    interval_rows = {
+        column: counts.values[column].within(bound)
+        for column, bound in (("cadence_rpm", cadence), ("power", power))
+        if bound is not None
+    }
+    share = 1.0
+    probe = 0.0
+    if interval_rows:
+        hits = float(max(counts.intervals, 1))
+        for rows in interval_rows.values():
+            hits *= rows / max(counts.intervals, 1)
+        # Share of workouts with at least one matching interval.
+        share = -math.expm1(-hits / workouts)
+        probe = _PROBE_COST
+    expected = matches * share
+    match = _MATCH_COST if text else 0.0
+
+    visited = workouts if expected < limit else limit * workouts / expected
+    costs = {(_SCAN, None): visited * (1 + text + probe * matches / workouts)}
+    if workout_type or duration is not None:
+        fetched = matches
+        if duration is not None and _is_exact(duration) and expected >= limit:
+            # One duration (and type) comes out of the index in id order, so
+            # this plan stops at the limit too.
+            fetched = limit * matches / expected
+        costs[(_WORKOUTS, None)] = fetched * (2 + probe + match)
+    for column, rows in interval_rows.items():
+        candidates = workouts * -math.expm1(-rows / workouts)
+        looked_up = candidates if expected < limit else limit * candidates / expected
+        costs[(_INTERVALS, column)] = rows * len(interval_rows) + looked_up * (1 + match)
+    return min(costs, key=costs.__getitem__)
+
+
+def _match_expression(text: str) -> str:
+    # Each whitespace-separated term is quoted, so "over-unders" is the
+    # phrase "over unders" rather than FTS5 column or NOT syntax, and all
+    # terms must be present.
+    terms = text.split()
+    return " ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def _is_exact(bound: Bound) -> bool:
+    return not isinstance(bound, tuple) or bound[0] == bound[1]
+
+
+def _bound_clause(column: str, bound: Bound, params: list[Any]) -> str:
+    # Exact values use "=", so the planner keeps index order and can stop
+    # at the limit instead of sorting every candidate.
+    if isinstance(bound, tuple):
+        low, high = bound
+        if low != high:
+            params.extend((int(low), int(high)))
+            return f"{column} BETWEEN ? AND ?"
+        bound = low
+    params.append(int(bound))
+    return f"{column} = ?"
+
+
+def _power(value: str) -> int | None:
+    token = value.split("/")[0].strip()
+    return int(token) if token.isdigit() else None
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Any
+
+PRETTY = "pretty"
+COMPACT = "compact"
+GZIP = "gzip"
+ZSTD = "zstd"
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class Serializer:
+    # Compact output goes through orjson when it is installed and the stdlib
+    # otherwise; both emit UTF-8 with no whitespace. Pretty output is the old
+    # indent=2 layout, kept for debugging.
+    def __init__(
+        self,
+        json_format: str = COMPACT,
+        compression: str | None = None,
+        level: int | None = None,
+    ) -> None:
+        if json_format not in (PRETTY, COMPACT):
+            raise ValueError(f"Unknown JSON format: {json_format}")
+        if compression not in (None, GZIP, ZSTD):
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == ZSTD:
+            _zstd()
+        self.json_format = json_format
+        self.compression = compression
+        self.level = level
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "Serializer":
+        output = config.get("output", {})
+        return _configured(
+            output.get("json_format", COMPACT),
+            output.get("compression") or None,
+            output.get("compression_level"),
+        )
+
+    def dumps(self, payload: Any) -> bytes:
+        if self.json_format == PRETTY:
+            data = json.dumps(payload, indent=2).encode("utf-8")
+        else:
+            orjson = _orjson()
+            if orjson is not None:
+                # Non-string keys are coerced like the stdlib does.
+                data = orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS)
+            else:
+                data = json.dumps(
+                    payload, separators=(",", ":"), ensure_ascii=False
+                ).encode("utf-8")
+
+        if self.compression == GZIP:
+            return gzip.compress(data, compresslevel=self.level or 6, mtime=0)
+        if self.compression == ZSTD:
+            return _zstd().compress(data, self.level or 3)
+        return data
+
+    def dump(self, payload: Any, path: str) -> int:
+        data = self.dumps(payload)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Unique per process and thread, so concurrent writers never share one.
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as handle:
+            handle.write(data)
+        os.replace(tmp_path, path)
+        return len(data)
+
+
+def loads(data: bytes) -> Any:
+    # Framing is recognised by magic bytes, so plain, gzip and zstd files can
+    # sit side by side under the same .json names.
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    elif data[:4] == ZSTD_MAGIC:
+        data = _zstd().decompress(data)
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def load(path: str) -> Any:
+    with open(path, "rb") as handle:
+        return loads(handle.read())
+
+
+@lru_cache(maxsize=8)
+def _configured(
+    json_format: str, compression: str | None, level: int | None
+) -> Serializer:
+    return Serializer(json_format, compression, level)
+
+
+@lru_cache(maxsize=1)
+def _orjson() -> Any:
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+class _ZstdCodec:
+    def __init__(self, module: Any, stdlib: bool) -> None:
+        self._module = module
+        self._stdlib = stdlib
+
+    def compress(self, data: bytes, level: int) -> bytes:
+        if self._stdlib:
+            return self._module.compress(data, level=level)
+        return self._module.ZstdCompressor(level=level).compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        if self._stdlib:
+            return self._module.decompress(data)
+        # Frames written by compress() carry their content size.
+        return self._module.ZstdDecompressor().decompress(data)
+
+
+@lru_cache(maxsize=1)
+def _zstd() -> _ZstdCodec:
+    try:
+        import zstandard
+
+        return _ZstdCodec(zstandard, stdlib=False)
+    except ImportError:
+        pass
+    try:
+        from compression import zstd  # Python 3.14+
+
+        return _ZstdCodec(zstd, stdlib=True)
+    except ImportError:
+        raise RuntimeError(
+            "zstd compression requires the zstandard package or Python 3.14+"
+        ) from None
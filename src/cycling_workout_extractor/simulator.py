@@ -0,0 +1,316 @@
+from __future__ import annotations
+
+import math
+import random
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from typing import Any
+
+WORKOUT_TITLES = [
+    "{minutes} Minute HIIT Cycling Workout",
+    "{minutes} Min Sweet Spot Intervals | Indoor Cycling",
+    "Zone 2 Endurance Ride - {minutes} Minutes",
+    "VO2 Max Efforts | {minutes} Minute Turbo Session",
+    "High Cadence Leg Speed Drills | {minutes} Mins",
+    "Low Cadence Strength Builder | {minutes} Minute Workout",
+    "Tempo Over-Unders | {minutes} Minute Threshold Ride",
+]
+NON_WORKOUT_TITLES = [
+    "Channel Announcement",
+    "Race Highlights: Stage {minutes}",
+    "Tech Tips: Setting Up Your Smart Trainer",
+    "Team News and Update",
+]
+CUES = [
+    ("warm up", "easy spin at 4 out of 10"),
+    ("main set", "push to 8/10 at 95 rpm"),
+    ("recovery", "spin easy, effort level 3"),
+    ("main set", "cadence of ninety, 7 out of 10"),
+    ("recovery", "for the next thirty seconds back off to 3/10"),
+    ("cool down", "easy spin at 2 out of 10"),
+]
+FILLER = [
+    "welcome back to the channel",
+    "remember to hydrate",
+    "keep your shoulders relaxed",
+    "don't forget to subscribe",
+]
+
+
+class SimulatedHttpError(Exception):
+    # Shaped like googleapiclient.errors.HttpError (resp.status and content),
+    # which is all the quota scheduler inspects.
+    def __init__(self, status: int, reason: str) -> None:
+        super().__init__(f"{status} {reason}")
+        self.resp = _Response(status)
+        self.content = f'{{"error": {{"errors": [{{"reason": "{reason}"}}]}}}}'.encode()
+
+
+class _Response:
+    def __init__(self, status: int) -> None:
+        self.status = status
+
+
+class YouTubeSimulator:
+    def __init__(
+        self,
+        playlist_ids: list[str],
+        videos: int = 10000,
+        latency_ms: float = 0,
+        error_rate: float = 0.0,
+        quota_units: int = 0,
+        transcript_latency_ms: float | None = None,
+        non_workout_rate: float = 0.3,
+        description_timestamp_rate: float = 0.5,
+        seed: int = 0,
+        keys: int = 1,
+    ) -> None:
+        self.playlist_ids = list(playlist_ids) or ["simulated"]
+        # Stand-ins for API keys, each with its own simulated quota.
+        self.api_keys = [f"simulated-{number}" for number in range(max(keys, 1))]
+        self.videos = videos
+        self.latency = latency_ms / 1000
+        self.transcript_latency = (
+            self.latency if transcript_latency_ms is None else transcript_latency_ms / 1000
+        )
+        self.error_rate = error_rate
+        self.quota_units = quota_units
+        self.non_workout_rate = non_workout_rate
+        self.description_timestamp_rate = description_timestamp_rate
+        self.seed = seed
+        self.calls: dict[str, int] = {}
+        self._used: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._playlists: dict[str, _Playlist] = {}
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "YouTubeSimulator | None":
+        sim_config = dict(config.get("simulator", {}))
+        if not sim_config.pop("enabled", False):
+            return None
+        playlist_ids = [playlist["id"] for playlist in config.get("playlists", [])]
+        return cls(playlist_ids, **sim_config)
+
+    def client(self, api_key: str) -> "SimulatedClient":
+        return SimulatedClient(self, api_key)
+
+    def fetch_transcript(self, video_id: str) -> list[dict[str, Any]]:
+        self._count("transcripts.fetch")
+        self._wait(self.transcript_latency)
+        index = _video_index(video_id)
+        if index is None or index >= self.videos:
+            return []
+        rng = random.Random(self.seed * 1_000_003 + index)
+        if rng.random() < self.error_rate:
+            raise ConnectionError(f"simulated transcript failure for {video_id}")
+        if rng.random() < 0.15:
+            return []
+
+        minutes = _duration_minutes(rng)
+        segments: list[dict[str, Any]] = []
+        start = 0.0
+        while start < minutes * 60:
+            duration = round(rng.uniform(2.0, 8.0), 2)
+            if rng.random() < 0.2:
+                zone, cue = rng.choice(CUES)
+                text = f"{zone}, {cue}"
+            else:
+                text = rng.choice(FILLER)
+            segments.append({"text": text, "start": round(start, 2), "duration": duration})
+            start += duration
+        return segments
+
+    def playlist_page(
+        self, api_key: str, playlist_id: str, page_token: str | None, max_results: int
+    ) -> dict[str, Any]:
+        self._request(api_key, "playlistItems.list")
+        playlist = self._playlist(playlist_id)
+        total = playlist.count(self.videos)
+        offset = int(page_token or 0)
+        page = [
+            playlist.member(position)
+            for position in range(offset, min(offset + max_results, total))
+        ]
+
+        response: dict[str, Any] = {
+            "items": [
+                {
+                    "snippet": {
+                        "title": self._title(index),
+                        "description": self._description(index),
+                    },
+                    "contentDetails": {"videoId": _video_id(index)},
+                }
+                for index in page
+            ],
+            "pageInfo": {"totalResults": total, "resultsPerPage": max_results},
+        }
+        if offset + max_results < total:
+            response["nextPageToken"] = str(offset + max_results)
+        return response
+
+    def video_items(self, api_key: str, video_ids: list[str]) -> dict[str, Any]:
+        self._request(api_key, "videos.list")
+        items = []
+        for video_id in video_ids:
+            index = _video_index(video_id)
+            if index is None or index >= self.videos:
+                continue
+            rng = random.Random(self.seed * 1_000_003 + index)
+            minutes = _duration_minutes(rng)
+            items.append(
+                {
+                    "id": video_id,
+                    "snippet": {
+                        "title": self._title(index),
+                        "description": self._description(index),
+                    },
+                    "contentDetails": {"duration": f"PT{minutes}M{index % 60}S"},
+                }
+            )
+        return {"items": items}
+
+    def _playlist(self, playlist_id: str) -> "_Playlist":
+        playlist = self._playlists.get(playlist_id)
+        if playlist is None:
+            if playlist_id in self.playlist_ids:
+                slot = self.playlist_ids.index(playlist_id)
+            else:
+                slot = zlib.crc32(playlist_id.encode("utf-8")) % len(self.playlist_ids)
+            playlist = self._playlists[playlist_id] = _Playlist(slot, len(self.playlist_ids))
+        return playlist
+
+    def _title(self, index: int) -> str:
+        rng = random.Random(self.seed * 1_000_003 + index)
+        minutes = _duration_minutes(rng)
+        if rng.random() < self.non_workout_rate:
+            return rng.choice(NON_WORKOUT_TITLES).format(minutes=minutes)
+        return rng.choice(WORKOUT_TITLES).format(minutes=minutes)
+
+    def _description(self, index: int) -> str:
+        rng = random.Random(self.seed * 7_919 + index)
+        if rng.random() >= self.description_timestamp_rate:
+            return "Join us for today's session. Grab a towel and a bottle."
+
+        minutes = _duration_minutes(random.Random(self.seed * 1_000_003 + index))
+        lines = ["Workout structure:"]
+        position = 0
+        while position < minutes * 60:
+            zone, cue = rng.choice(CUES)
+            hours, remainder = divmod(position, 3600)
+            stamp = f"{remainder // 60}:{remainder % 60:02d}"
+            if hours:
+                stamp = f"{hours}:{remainder // 60:02d}:{remainder % 60:02d}"
+            lines.append(f"{stamp} {zone.title()} - {cue}")
+            position += rng.choice([30, 60, 120, 240, 300])
+        return "\n".join(lines)
+
+    def _request(self, api_key: str, method: str) -> None:
+        self._count(method)
+        self._wait(self.latency)
+        with self._lock:
+            used = self._used.get(api_key, 0)
+            if self.quota_units and used >= self.quota_units:
+                raise SimulatedHttpError(403, "quotaExceeded")
+            self._used[api_key] = used + 1
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise SimulatedHttpError(503, "backendError")
+
+    def _count(self, method: str) -> None:
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+
+    def _wait(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class _Playlist:
+    # Every video lands in one playlist and about 5% also appear in the
+    # next, so cross-playlist de-duplication is exercised too. Membership
+    # repeats every lcm(20, playlists) indexes, so a page is arithmetic on
+    # one period's offsets rather than a scan of the catalog.
+    def __init__(self, slot: int, playlists: int) -> None:
+        self.period = math.lcm(20, playlists)
+        self.offsets = [
+            index
+            for index in range(self.period)
+            if index % playlists == slot or (index % 20 == 0 and (index + 1) % playlists == slot)
+        ]
+
+    def count(self, videos: int) -> int:
+        periods, rest = divmod(videos, self.period)
+        return periods * len(self.offsets) + bisect_left(self.offsets, rest)
+
+    def member(self, position: int) -> int:
+        periods, offset = divmod(position, len(self.offsets))
+        return periods * self.period + self.offsets[offset]
+
+
+class SimulatedClient:
+    def __init__(self, simulator: YouTubeSimulator, api_key: str) -> None:
+        self._simulator = simulator
+        self._api_key = api_key
+
+    def playlistItems(self) -> "_SimulatedPlaylistItems":  # noqa: N802
+        return _SimulatedPlaylistItems(self._simulator, self._api_key)
+
+    def videos(self) -> "_SimulatedVideos":
+        return _SimulatedVideos(self._simulator, self._api_key)
+
+
+class _SimulatedPlaylistItems:
+    def __init__(self, simulator: YouTubeSimulator, api_key: str) -> None:
+        self._simulator = simulator
+        self._api_key = api_key
+
+    def list(
+        self,
+        part: str,
+        playlistId: str,  # noqa: N803
+        maxResults: int = 5,  # noqa: N803
+        pageToken: str | None = None,  # noqa: N803
+    ) -> "_SimulatedRequest":
+        return _SimulatedRequest(
+            lambda: self._simulator.playlist_page(
+                self._api_key, playlistId, pageToken, min(maxResults, 50)
+            )
+        )
+
+
+class _SimulatedVideos:
+    def __init__(self, simulator: YouTubeSimulator, api_key: str) -> None:
+        self._simulator = simulator
+        self._api_key = api_key
+
+    def list(self, part: str, id: str) -> "_SimulatedRequest":  # noqa: A002
+        video_ids = [video_id for video_id in id.split(",") if video_id]
+        return _SimulatedRequest(
+            lambda: self._simulator.video_items(self._api_key, video_ids[:50])
+        )
+
+
+class _SimulatedRequest:
+    def __init__(self, run: Any) -> None:
+        self._run = run
+
+    def execute(self) -> dict[str, Any]:
+        return self._run()
+
+
+def _video_id(index: int) -> str:
+    return f"sim{index:08d}"
+
+
+def _video_index(video_id: str) -> int | None:
+    if not video_id.startswith("sim") or not video_id[3:].isdigit():
+        return None
+    return int(video_id[3:])
+
+
+def _duration_minutes(rng: random.Random) -> int:
+    return rng.choice([20, 25, 30, 40, 45, 60, 75, 90])
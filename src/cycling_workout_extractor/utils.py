@@ -1,6 +1,11 @@
 from __future__ import annotations
 
+import json
+import os
 import re
+from typing import Any, Iterable, Iterator, TextIO, TypeVar
+
+T = TypeVar("T")
 
 
 def parse_iso8601_duration(duration: str) -> int:
@@ -29,3 +34,39 @@ def parse_timestamp_to_seconds(value: str) -> int:
 def seconds_to_mmss(total_seconds: int) -> str:
     minutes, seconds = divmod(total_seconds, 60)
     return f"{minutes:02d}:{seconds:02d}"
+
+
+def chunked(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    batch: list[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_jsonl(path: str) -> Iterator[dict[str, Any]]:
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A line torn by an interrupted write; everything else is intact.
+                continue
+
+
+def open_jsonl_append(path: str) -> TextIO:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, "a+", encoding="utf-8")
+    if handle.tell():
+        handle.seek(handle.tell() - 1)
+        if handle.read(1) != "\n":
+            handle.write("\n")
+    return handle
@@ -2,12 +2,14 @@ from __future__ import annotations
 
 from typing import Any
 
+from cycling_workout_extractor.classifier import non_workout_classifier
+
 
 def is_probable_workout(
     title: str, description: str, non_workout_keywords: list[str]
 ) -> bool:
-    haystack = f"{title} {description}".lower()
-    return not any(keyword.lower() in haystack for keyword in non_workout_keywords)
+    classifier = non_workout_classifier(non_workout_keywords)
+    return classifier.classify(title, description).is_workout
 
 
 def validate_workout(record: dict[str, Any]) -> tuple[bool, list[str]]:
@@ -0,0 +1,224 @@
+from __future__ import annotations
+
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Iterable, Iterator
+
+from cycling_workout_extractor.pipeline import VideoResult
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    video_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    fingerprint TEXT,
+    row TEXT,
+    entries TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_expires);
+"""
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+UNCHANGED = "unchanged"
+FAILED = "failed"
+
+
+class WorkQueue:
+    # SQLite in WAL mode lets any number of worker processes, on this box or
+    # over a shared filesystem, claim batches under short write transactions.
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 600,
+        max_attempts: int = 3,
+    ) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "WorkQueue":
+        queue_config = config.get("queue", {})
+        return cls(
+            queue_config.get(
+                "path", os.path.join(config["output"]["logs_dir"], "queue.db")
+            ),
+            lease_seconds=float(queue_config.get("lease_seconds", 600)),
+            max_attempts=int(queue_config.get("max_attempts", 3)),
+        )
+
+    def reset(self) -> None:
+        self._conn.execute("DELETE FROM jobs")
+
+    def enqueue(self, video_ids: Iterable[str]) -> int:
+        now = time.time()
+        with self._transaction():
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (video_id, state, updated_at) VALUES (?, ?, ?)",
+                ((video_id, PENDING, now) for video_id in video_ids),
+            )
+        return cursor.rowcount
+
+    def claim(self, worker_id: str, limit: int) -> list[str]:
+        now = time.time()
+        with self._transaction():
+            # Leases that expired after the last allowed attempt are given up
+            # on, so one poisoned video cannot stall the queue.
+            expired = self._conn.execute(
+                "SELECT video_id FROM jobs WHERE state = ? AND lease_expires < ? "
+                "AND attempts >= ?",
+                (LEASED, now, self.max_attempts),
+            ).fetchall()
+            for (video_id,) in expired:
+                self._store(
+                    video_id,
+                    FAILED,
+                    None,
+                    [f"{video_id}\terror: abandoned after {self.max_attempts} attempts"],
+                    "",
+                    now,
+                )
+
+            rows = self._conn.execute(
+                "SELECT video_id FROM jobs WHERE state = ? "
+                "OR (state = ? AND lease_expires < ?) ORDER BY video_id LIMIT ?",
+                (PENDING, LEASED, now, limit),
+            ).fetchall()
+            video_ids = [video_id for (video_id,) in rows]
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, lease_owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1, updated_at = ? WHERE video_id = ?",
+                (
+                    (LEASED, worker_id, now + self.lease_seconds, now, video_id)
+                    for video_id in video_ids
+                ),
+            )
+        return video_ids
+
+    def release(self, worker_id: str, video_ids: Iterable[str]) -> None:
+        now = time.time()
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, "
+                "attempts = MAX(0, attempts - 1), updated_at = ? "
+                "WHERE video_id = ? AND lease_owner = ?",
+                ((PENDING, now, video_id, worker_id) for video_id in video_ids),
+            )
+
+    def complete(self, worker_id: str, result: VideoResult, fingerprint: str = "") -> bool:
+        # False when the lease expired and the video was reclaimed (or already
+        # finished) by another worker; that worker's result stands.
+        video_id, row, entries = result
+        now = time.time()
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, row = ?, entries = ?, fingerprint = ?, "
+                "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE video_id = ? AND lease_owner = ? AND lease_expires > ?",
+                (
+                    DONE,
+                    json.dumps(row) if row is not None else None,
+                    json.dumps(entries),
+                    fingerprint,
+                    now,
+                    video_id,
+                    worker_id,
+                    now,
+                ),
+            )
+        return cursor.rowcount > 0
+
+    def complete_settled(self, results: Iterable[VideoResult]) -> None:
+        now = time.time()
+        with self._transaction():
+            for video_id, row, entries in results:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO jobs (video_id, state, row, entries, "
+                    "updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (video_id, DONE, json.dumps(row), json.dumps(entries), now),
+                )
+
+    def mark_unchanged(self, worker_id: str, video_ids: Iterable[str]) -> None:
+        now = time.time()
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, "
+                "updated_at = ? WHERE video_id = ? AND lease_owner = ?",
+                ((UNCHANGED, now, video_id, worker_id) for video_id in video_ids),
+            )
+
+    def results(self) -> Iterator[tuple[VideoResult, str]]:
+        cursor = self._conn.execute(
+            "SELECT video_id, row, entries, fingerprint FROM jobs "
+            "WHERE state IN (?, ?) ORDER BY video_id",
+            (DONE, FAILED),
+        )
+        for video_id, row, entries, fingerprint in cursor:
+            result = (video_id, json.loads(row) if row else None, json.loads(entries or "[]"))
+            yield result, fingerprint or ""
+
+    def video_ids(self, state: str | None = None) -> set[str]:
+        if state is None:
+            cursor = self._conn.execute("SELECT video_id FROM jobs")
+        else:
+            cursor = self._conn.execute("SELECT video_id FROM jobs WHERE state = ?", (state,))
+        return {video_id for (video_id,) in cursor}
+
+    def counts(self) -> dict[str, int]:
+        cursor = self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state")
+        return dict(cursor.fetchall())
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _store(
+        self,
+        video_id: str,
+        state: str,
+        row: dict[str, Any] | None,
+        entries: list[str],
+        fingerprint: str,
+        now: float,
+    ) -> None:
+        self._conn.execute(
+            "UPDATE jobs SET state = ?, row = ?, entries = ?, fingerprint = ?, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE video_id = ?",
+            (
+                state,
+                json.dumps(row) if row is not None else None,
+                json.dumps(entries),
+                fingerprint,
+                now,
+                video_id,
+            ),
+        )
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self._conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self._conn.execute("COMMIT")
+        else:
+            self._conn.execute("ROLLBACK")
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import glob
+import math
+import os
+from array import array
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+
+from cycling_workout_extractor import serialization
+
+PROCESSED = "processed"
+GENERATED = "generated"
+REQUIRED_FIELDS = ["video_id", "title", "url", "workout_type", "duration_minutes"]
+MIN_POWER_WATTS = 30
+CADENCE_RANGE = (50, 140)
+MIN_RECOVERY_SECONDS = 60
+DURATION_TOLERANCE_MINUTES = 2
+
+
+class Corpus:
+    # One row per record and one row per interval; interval_record maps each
+    # interval back to its record so per-record totals are a bincount away.
+    # Records are consumed one at a time, so only the columns stay resident.
+    def __init__(self, records: Iterable[tuple[str, dict[str, Any]]]) -> None:
+        self.names: list[str] = []
+        missing = {field: array("b") for field in REQUIRED_FIELDS}
+        duration_minutes = array("d")
+        interval_record = array("i")
+        interval_index = array("i")
+        durations = array("d")
+        has_bounds = array("b")
+        power = array("d")
+        cadence = array("d")
+        recovery = array("b")
+
+        for row, (name, record) in enumerate(records):
+            self.names.append(name)
+            for field in REQUIRED_FIELDS:
+                missing[field].append(not record.get(field))
+            duration_minutes.append(_number(record.get("duration_minutes")))
+            for index, interval in enumerate(record.get("intervals") or [], start=1):
+                interval_record.append(row)
+                interval_index.append(index)
+                durations.append(_number(interval.get("duration_seconds")))
+                has_bounds.append(
+                    bool(interval.get("start_time")) and bool(interval.get("end_time"))
+                )
+                watts = interval.get("power_watts")
+                power.append(math.nan if watts is None else _number(watts))
+                cadence.append(_number(interval.get("cadence_rpm")))
+                recovery.append(interval.get("zone") == "recovery")
+
+        self.size = len(self.names)
+        self.missing = {field: _column(values, bool) for field, values in missing.items()}
+        self.duration_minutes = _column(duration_minutes)
+        self.interval_record = _column(interval_record)
+        self.interval_index = _column(interval_index)
+        self.durations = _column(durations)
+        self.has_bounds = _column(has_bounds, bool)
+        self.power_watts = _column(power)
+        self.cadence = _column(cadence)
+        self.recovery = _column(recovery, bool)
+        self.interval_counts = np.bincount(self.interval_record, minlength=self.size)
+
+    @classmethod
+    def load(cls, paths: Iterable[str]) -> "Corpus":
+        return cls(_read_records(sorted(paths)))
+
+    def per_record_sum(self, values: np.ndarray) -> np.ndarray:
+        return np.bincount(self.interval_record, weights=values, minlength=self.size)
+
+
+class AuditReport:
+    def __init__(self, names: list[str]) -> None:
+        self.names = names
+        self.reasons: dict[int, list[str]] = {}
+        self.record_counts: dict[str, int] = {}
+        self.interval_counts: dict[str, int] = {}
+
+    @property
+    def failed(self) -> int:
+        return len(self.reasons)
+
+    def add_records(self, rule: str, rows: np.ndarray) -> None:
+        self.record_counts[rule] = int(len(rows))
+        for row in rows.tolist():
+            self.reasons.setdefault(row, []).append(rule)
+
+    def add_intervals(self, rule: str, rows: np.ndarray, indexes: np.ndarray) -> None:
+        self.interval_counts[rule] = int(len(rows))
+        self.record_counts[rule] = int(len(np.unique(rows)))
+        for row, index in zip(rows.tolist(), indexes.tolist()):
+            self.reasons.setdefault(row, []).append(f"interval {index} {rule}")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "records": len(self.names),
+            "failed": self.failed,
+            "record_counts": self.record_counts,
+            "interval_counts": self.interval_counts,
+            "reasons": {
+                self.names[row]: reasons for row, reasons in sorted(self.reasons.items())
+            },
+        }
+
+
+def audit_corpus(corpus: Corpus, kind: str = PROCESSED) -> AuditReport:
+    if kind == PROCESSED:
+        return _audit_processed(corpus)
+    if kind == GENERATED:
+        return _audit_generated(corpus)
+    raise ValueError(f"Unknown corpus kind: {kind}")
+
+
+def audit_directory(directory: str, kind: str | None = None) -> AuditReport:
+    if kind is None:
+        name = os.path.basename(os.path.normpath(directory))
+        kind = GENERATED if name == GENERATED else PROCESSED
+    corpus = Corpus.load(glob.glob(os.path.join(directory, "*.json")))
+    return audit_corpus(corpus, kind)
+
+
+def _audit_processed(corpus: Corpus) -> AuditReport:
+    # Same rules and reason strings as validator.validate_workout, except that
+    # every interval without time bounds is reported, not just the first.
+    report = AuditReport(corpus.names)
+    for field in REQUIRED_FIELDS:
+        report.add_records(f"missing {field}", np.flatnonzero(corpus.missing[field]))
+    report.add_records("missing intervals", np.flatnonzero(corpus.interval_counts == 0))
+
+    bad = ~corpus.has_bounds
+    report.add_intervals(
+        "missing time bounds", corpus.interval_record[bad], corpus.interval_index[bad]
+    )
+    return report
+
+
+def _audit_generated(corpus: Corpus) -> AuditReport:
+    # Same rules as generators.validator.validate_generated, with each record's
+    # own duration_minutes as the target and every bad interval reported.
+    report = AuditReport(corpus.names)
+    empty = corpus.interval_counts == 0
+    report.add_records("missing intervals", np.flatnonzero(empty))
+
+    total_minutes = np.round(corpus.per_record_sum(corpus.durations) / 60)
+    mismatch = (
+        np.abs(total_minutes - corpus.duration_minutes) > DURATION_TOLERANCE_MINUTES
+    ) & ~empty
+    report.add_records("duration mismatch", np.flatnonzero(mismatch))
+
+    low_power = corpus.power_watts < MIN_POWER_WATTS
+    report.add_intervals(
+        "unrealistic power",
+        corpus.interval_record[low_power],
+        corpus.interval_index[low_power],
+    )
+    low, high = CADENCE_RANGE
+    bad_cadence = (corpus.cadence != 0) & (
+        (corpus.cadence < low) | (corpus.cadence > high)
+    )
+    report.add_intervals(
+        "unrealistic cadence",
+        corpus.interval_record[bad_cadence],
+        corpus.interval_index[bad_cadence],
+    )
+
+    recovery = corpus.per_record_sum(np.where(corpus.recovery, corpus.durations, 0.0))
+    short = (recovery != 0) & (recovery < MIN_RECOVERY_SECONDS)
+    report.add_records("insufficient recovery", np.flatnonzero(short))
+    return report
+
+
+def _read_records(paths: list[str]) -> Iterator[tuple[str, dict[str, Any]]]:
+    for path in paths:
+        record = serialization.load(path)
+        yield record.get("video_id") or os.path.splitext(os.path.basename(path))[0], record
+
+
+def _column(values: array, dtype: Any = None) -> np.ndarray:
+    # Wraps the typed buffer without copying it.
+    column = np.frombuffer(values, dtype=values.typecode) if len(values) else np.array(
+        [], dtype=values.typecode
+    )
+    return column.view(dtype) if dtype is not None else column
+
+
+def _number(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
@@ -1,111 +1,475 @@
 from __future__ import annotations
 
+import fnmatch
 import glob
-import json
+import hashlib
 import os
-from collections import defaultdict
-from statistics import median
-from typing import Any
+import shutil
+from typing import Any, Iterable, NamedTuple
+
+from cycling_workout_extractor import serialization
+from cycling_workout_extractor.corpus_store import CorpusSnapshot
+from cycling_workout_extractor.serialization import Serializer
+from generators.sketches import Histogram
 
 DEFAULT_TEMPLATES_PATH = os.path.join("data", "templates", "workout_templates.json")
 DEFAULT_PROCESSED_GLOB = os.path.join("data", "processed", "*.json")
+STATE_FILENAME = "analysis_state.json"
+DEFAULT_STATE_PATH = os.path.join("data", "templates", STATE_FILENAME)
+# Names the last sync copied into the processed dir.
+SYNC_MANIFEST = ".sync_manifest"
 TEMPLATE_VERSION = 2
-
-
-def mirror_workouts_to_processed(
-    workouts_dir: str = "workouts", processed_dir: str = "data/processed"
-) -> int:
+ANALYSIS_STATE_VERSION = 2
+ZONE_BUCKETS = ("warmup", "main set", "recovery", "cooldown")
+PYTHON_ENGINE = "python"
+NUMPY_ENGINE = "numpy"
+ENGINES = (PYTHON_ENGINE, NUMPY_ENGINE)
+# A saved state is reused only when all of these still match.
+_STATE_KEYS = ("state_version", "template_version", "source_glob")
+
+
+class SyncReport(NamedTuple):
+    # Processed-side paths, so callers can limit follow-up work to them.
+    copied: list[str]
+    removed: list[str]
+    unchanged: int
+
+    @property
+    def changed(self) -> list[str]:
+        return self.copied + self.removed
+
+
+def sync_workouts_to_processed(
+    workouts_dir: str = "workouts",
+    processed_dir: str = "data/processed",
+) -> SyncReport:
+    # Byte-level copies (shutil.copy2, which the kernel does without a JSON
+    # round trip) of new or changed files. A file is unchanged when its size
+    # and mtime match the copy, or when the sizes match and the hashes do.
+    # Only files an earlier sync copied are deleted when their source goes.
     os.makedirs(processed_dir, exist_ok=True)
-    count = 0
-    for path in glob.glob(os.path.join(workouts_dir, "*.json")):
-        filename = os.path.basename(path)
+    manifest_path = os.path.join(processed_dir, SYNC_MANIFEST)
+    previous = set(_read_manifest(manifest_path))
+    sources = {
+        os.path.basename(path): path
+        for path in glob.glob(os.path.join(workouts_dir, "*.json"))
+    }
+
+    copied: list[str] = []
+    unchanged = 0
+    for filename in sorted(sources):
+        source = sources[filename]
+        target = os.path.join(processed_dir, filename)
+        if _same_file(source, target):
+            unchanged += 1
+            continue
+        partial = f"{target}.{os.getpid()}.tmp"
+        shutil.copy2(source, partial)
+        os.replace(partial, target)
+        copied.append(target)
+
+    removed: list[str] = []
+    for filename in sorted(previous - set(sources)):
         target = os.path.join(processed_dir, filename)
-        with open(path, "r", encoding="utf-8") as handle:
-            payload = json.load(handle)
-        with open(target, "w", encoding="utf-8") as handle:
-            json.dump(payload, handle, indent=2)
-        count += 1
-    return count
+        if os.path.exists(target):
+            os.remove(target)
+            removed.append(target)
+
+    if previous != set(sources):
+        Serializer().dump(sorted(sources), manifest_path)
+    return SyncReport(copied, removed, unchanged)
+
+
+class TemplateStats:
+    # Mergeable statistics behind one (workout_type, duration) template,
+    # kept as exact histograms. Adding or removing a record's stats is exact,
+    # so shards and incremental refreshes combine to the same template as a
+    # single full pass, and any quantile is available, not just the median.
+    def __init__(self) -> None:
+        self.records = 0
+        self.interval_count = 0
+        self.work = Histogram()
+        self.rest = Histogram()
+        self.powers = Histogram()
+        self.cadences = Histogram()
+        self.zones = {zone: Histogram() for zone in ZONE_BUCKETS}
+        # Power by interval position, and how many positions each record had.
+        self.profile: list[Histogram] = []
+        self.profile_lengths = Histogram()
+
+    @classmethod
+    def from_record(cls, record: dict[str, Any]) -> "TemplateStats":
+        stats = cls()
+        stats.add_record(record)
+        return stats
+
+    def add_record(self, record: dict[str, Any]) -> None:
+        intervals = record.get("intervals", [])
+        self.records += 1
+        self.interval_count += len(intervals)
+        self.profile_lengths.add(len(intervals))
+        while len(self.profile) < len(intervals):
+            self.profile.append(Histogram())
+        for interval, position in zip(intervals, self.profile):
+            duration = int(interval.get("duration_seconds", 0))
+            zone = (interval.get("zone") or "").lower()
+            if zone in {"recovery", "cooldown"}:
+                self.rest.add(duration)
+            else:
+                self.work.add(duration)
+
+            power_level = interval.get("power_level", "")
+            level = _parse_level(power_level)
+            if level is not None:
+                self.powers.add(level)
+            power = _parse_power(power_level)
+            if power is not None:
+                position.add(power)
+                zone_key = _normalize_zone(zone)
+                if zone_key:
+                    self.zones[zone_key].add(power)
+
+            cadence = interval.get("cadence_rpm", 0)
+            if cadence:
+                self.cadences.add(int(cadence))
+
+    def merge(self, other: "TemplateStats", sign: int = 1) -> "TemplateStats":
+        self.records += sign * other.records
+        self.interval_count += sign * other.interval_count
+        self.work.merge(other.work, sign)
+        self.rest.merge(other.rest, sign)
+        self.powers.merge(other.powers, sign)
+        self.cadences.merge(other.cadences, sign)
+        for zone in ZONE_BUCKETS:
+            self.zones[zone].merge(other.zones[zone], sign)
+        while len(self.profile) < len(other.profile):
+            self.profile.append(Histogram())
+        for position, histogram in zip(self.profile, other.profile):
+            position.merge(histogram, sign)
+        self.profile_lengths.merge(other.profile_lengths, sign)
+        del self.profile[self.profile_lengths.max() if self.profile_lengths else 0 :]
+        return self
+
+    def subtract(self, other: "TemplateStats") -> "TemplateStats":
+        return self.merge(other, -1)
+
+    def template(self, workout_type: str, duration: int) -> dict[str, Any]:
+        work_duration = int(self.work.median()) if self.work else 0
+        rest_duration = int(self.rest.median()) if self.rest else 0
+        return {
+            "workout_type": workout_type,
+            "duration_minutes": duration,
+            "interval_count": self.interval_count,
+            "work_duration_seconds": work_duration,
+            "rest_duration_seconds": rest_duration,
+            "work_rest_ratio": _ratio(work_duration, rest_duration),
+            "warmup_minutes": 5,
+            "cooldown_minutes": 5,
+            "default_power_level": _power_label(self.powers),
+            "default_cadence_rpm": int(self.cadences.median()) if self.cadences else 0,
+            "power_profile": [_power_label(position) for position in self.profile],
+            "power_by_zone": {
+                zone: _power_label(histogram) for zone, histogram in self.zones.items()
+            },
+        }
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "records": self.records,
+            "interval_count": self.interval_count,
+            "work": self.work.to_pairs(),
+            "rest": self.rest.to_pairs(),
+            "powers": self.powers.to_pairs(),
+            "cadences": self.cadences.to_pairs(),
+            "zones": {zone: self.zones[zone].to_pairs() for zone in ZONE_BUCKETS},
+            "profile": [position.to_pairs() for position in self.profile],
+            "profile_lengths": self.profile_lengths.to_pairs(),
+        }
+
+    @classmethod
+    def from_dict(cls, payload: dict[str, Any]) -> "TemplateStats":
+        stats = cls()
+        stats.records = payload["records"]
+        stats.interval_count = payload["interval_count"]
+        for name in ("work", "rest", "powers", "cadences", "profile_lengths"):
+            setattr(stats, name, Histogram.from_pairs(payload[name]))
+        stats.zones = {
+            zone: Histogram.from_pairs(payload["zones"][zone]) for zone in ZONE_BUCKETS
+        }
+        stats.profile = [Histogram.from_pairs(pairs) for pairs in payload["profile"]]
+        return stats
 
 
 def analyze_patterns(
     processed_glob: str = DEFAULT_PROCESSED_GLOB,
+    corpus_dir: str | None = None,
+    state_path: str | None = None,
+    engine: str = PYTHON_ENGINE,
+    workers: int = 1,
+    changed: Iterable[str] | None = None,
 ) -> dict[str, Any]:
-    grouped: dict[str, dict[int, list[dict[str, Any]]]] = defaultdict(
-        lambda: defaultdict(list)
-    )
-
-    for path in glob.glob(processed_glob):
-        with open(path, "r", encoding="utf-8") as handle:
-            record = json.load(handle)
-        workout_type = record.get("workout_type", "Unknown")
-        duration = int(record.get("duration_minutes", 0))
-        intervals = record.get("intervals", [])
-        if duration and intervals:
-            grouped[workout_type][duration].append(record)
-
-    templates: dict[str, dict[str, Any]] = {}
-    for workout_type, durations in grouped.items():
-        templates[workout_type] = {}
-        for duration, records in durations.items():
-            template = _build_template(records, workout_type, duration)
-            templates[workout_type][str(duration)] = template
+    # With state_path, fingerprints, per-file stats and per-group totals from
+    # the last run are reused: only new or changed files are read, their old
+    # stats are subtracted and new ones added, and only those groups' templates
+    # are rebuilt. The result equals a full rebuild.
+    # changed (e.g. a SyncReport's) narrows that further to the listed paths,
+    # skipping the directory listing and the stat of every other file; it is
+    # ignored when there is no usable state yet.
+    # The numpy engine computes full passes column-wise (over the corpus
+    # store's arrays directly) and can spread groups over worker processes;
+    # its output is identical to the python engine's.
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown template engine: {engine!r}")
+    if corpus_dir:
+        snapshot = CorpusSnapshot(corpus_dir)
+        if engine == NUMPY_ENGINE:
+            templates = _vectorized_templates(snapshot, workers)
+        else:
+            templates = _templates(_corpus_stats(snapshot))
+        source = {"source_corpus": corpus_dir}
+    elif state_path:
+        templates = _refresh(state_path, processed_glob, changed)
+        source = {"source_glob": processed_glob}
+    else:
+        paths = sorted(glob.glob(processed_glob))
+        records = (serialization.load(path) for path in paths)
+        if engine == NUMPY_ENGINE:
+            templates = _vectorized_templates(records, workers)
+        else:
+            templates = _templates(_group_records(records))
+        source = {"source_glob": processed_glob}
 
     return {
-        "metadata": {"source_glob": processed_glob, "template_version": TEMPLATE_VERSION},
+        "metadata": {**source, "template_version": TEMPLATE_VERSION},
         "templates": templates,
     }
 
 
-def save_templates(payload: dict[str, Any], path: str = DEFAULT_TEMPLATES_PATH) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    with open(path, "w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2)
-
+def group_stats(
+    processed_glob: str = DEFAULT_PROCESSED_GLOB,
+) -> dict[tuple[Any, int], TemplateStats]:
+    # Per-(workout_type, duration) statistics, for percentiles beyond the
+    # medians a template carries. Shards can be combined with merge().
+    paths = sorted(glob.glob(processed_glob))
+    return _group_records(serialization.load(path) for path in paths)
+
+
+def save_templates(
+    payload: dict[str, Any],
+    path: str = DEFAULT_TEMPLATES_PATH,
+    serializer: Serializer | None = None,
+) -> None:
+    (serializer or Serializer()).dump(payload, path)
+
+
+def _group_records(
+    records: Iterable[dict[str, Any]],
+) -> dict[tuple[Any, int], TemplateStats]:
+    # Groups keep first-seen order; memory is one set of histograms per group.
+    groups: dict[tuple[Any, int], TemplateStats] = {}
+    for record in records:
+        group = _group_key(record)
+        if group is None:
+            continue
+        stats = groups.get(group)
+        if stats is None:
+            stats = groups[group] = TemplateStats()
+        stats.add_record(record)
+    return groups
+
+
+def _templates(
+    groups: dict[tuple[Any, int], TemplateStats],
+    cached: dict[str, dict[str, Any]] | None = None,
+    dirty: set[Any] | None = None,
+) -> dict[str, dict[str, Any]]:
+    templates: dict[str, dict[str, Any]] = {}
+    for (workout_type, duration), stats in groups.items():
+        template = ((cached or {}).get(workout_type) or {}).get(str(duration))
+        if template is None or dirty is None or (workout_type, duration) in dirty:
+            template = stats.template(workout_type, duration)
+        templates.setdefault(workout_type, {})[str(duration)] = template
+    return templates
 
-def _build_template(
-    records: list[dict[str, Any]], workout_type: str, duration: int
-) -> dict[str, Any]:
-    intervals = _flatten_intervals(records)
-    work_durations = [item["duration_seconds"] for item in intervals if item["is_work"]]
-    rest_durations = [item["duration_seconds"] for item in intervals if not item["is_work"]]
 
-    work_duration = int(median(work_durations)) if work_durations else 0
-    rest_duration = int(median(rest_durations)) if rest_durations else 0
+def _corpus_stats(snapshot: CorpusSnapshot) -> dict[tuple[Any, int], TemplateStats]:
+    # Straight from the store's columns; no per-interval dicts.
+    from generators import vectorized
 
-    power_profile = _power_profile(records)
-    power_by_zone = _power_by_zone(records)
+    parsers = (_parse_power, _parse_level, _normalize_zone)
+    return vectorized.table_stats(vectorized.table_from_corpus(snapshot, *parsers))
 
-    return {
-        "workout_type": workout_type,
-        "duration_minutes": duration,
-        "interval_count": len(intervals),
-        "work_duration_seconds": work_duration,
-        "rest_duration_seconds": rest_duration,
-        "work_rest_ratio": _ratio(work_duration, rest_duration),
-        "warmup_minutes": 5,
-        "cooldown_minutes": 5,
-        "default_power_level": _median_power(records),
-        "default_cadence_rpm": _median_cadence(records),
-        "power_profile": power_profile,
-        "power_by_zone": power_by_zone,
-    }
 
+def _vectorized_templates(
+    source: CorpusSnapshot | Iterable[dict[str, Any]], workers: int
+) -> dict[str, dict[str, Any]]:
+    from generators import vectorized
 
-def _flatten_intervals(records: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    flattened: list[dict[str, Any]] = []
-    for record in records:
-        for interval in record.get("intervals", []):
-            duration = int(interval.get("duration_seconds", 0))
-            zone = (interval.get("zone") or "").lower()
-            is_work = zone not in {"recovery", "cooldown"}
-            flattened.append(
-                {
-                    "duration_seconds": duration,
-                    "is_work": is_work,
-                }
-            )
-    return flattened
+    parsers = (_parse_power, _parse_level, _normalize_zone)
+    if isinstance(source, CorpusSnapshot):
+        table = vectorized.table_from_corpus(source, *parsers)
+    else:
+        table = vectorized.table_from_records(source, _group_key, *parsers)
+    return vectorized.build_templates(table, workers)
+
+
+def _refresh(
+    state_path: str, processed_glob: str, changed: Iterable[str] | None = None
+) -> dict[str, dict[str, Any]]:
+    state = _load_state(state_path, processed_glob)
+    files = state["files"]
+    totals = {
+        (workout_type, duration): TemplateStats.from_dict(stats)
+        for workout_type, duration, stats in state["groups"]
+    }
+    if changed is not None and files:
+        listed = [path for path in changed if fnmatch.fnmatch(path, processed_glob)]
+        paths = sorted(path for path in listed if os.path.exists(path))
+        removed = [path for path in listed if path in files and not os.path.exists(path)]
+    else:
+        paths = sorted(glob.glob(processed_glob))
+        current = set(paths)
+        removed = [path for path in files if path not in current]
+    dirty = _refresh_files(files, totals, paths, removed)
+
+    # Group order is first appearance over the sorted paths, as in a full pass.
+    groups: dict[tuple[Any, int], TemplateStats] = {}
+    for path in sorted(files):
+        group = _entry_group(files[path])
+        if group is not None and group not in groups:
+            groups[group] = totals[group]
+    templates = _templates(groups, state["templates"], dirty)
+
+    state["groups"] = [
+        [workout_type, duration, stats.to_dict()]
+        for (workout_type, duration), stats in groups.items()
+    ]
+    state["templates"] = templates
+    Serializer().dump(state, state_path)
+    return templates
+
+
+def _load_state(state_path: str, processed_glob: str) -> dict[str, Any]:
+    state: dict[str, Any] = {
+        "state_version": ANALYSIS_STATE_VERSION,
+        "template_version": TEMPLATE_VERSION,
+        "source_glob": processed_glob,
+        "files": {},
+        "groups": [],
+        "templates": {},
+    }
+    if not os.path.exists(state_path):
+        return state
+    try:
+        previous = serialization.load(state_path)
+    except (ValueError, OSError, EOFError):
+        return state
+    if all(previous.get(key) == state[key] for key in _STATE_KEYS):
+        return previous
+    return state
+
+
+def _refresh_files(
+    files: dict[str, dict[str, Any]],
+    totals: dict[tuple[Any, int], TemplateStats],
+    paths: list[str],
+    removed: list[str],
+) -> set[Any]:
+    # Moves changed files' stats between group totals and returns the groups
+    # that changed. Of paths, a file is re-read only when its mtime or size
+    # moved, and re-parsed only when its hash did too.
+    dirty: set[Any] = set()
+
+    def retire(entry: dict[str, Any]) -> None:
+        group = _entry_group(entry)
+        if group is None:
+            return
+        totals[group].subtract(TemplateStats.from_dict(entry["stats"]))
+        if not totals[group].records:
+            del totals[group]
+        dirty.add(group)
+
+    for path in removed:
+        retire(files.pop(path))
+
+    for path in paths:
+        status = os.stat(path)
+        entry = files.get(path)
+        if (
+            entry is not None
+            and entry["mtime_ns"] == status.st_mtime_ns
+            and entry["size"] == status.st_size
+        ):
+            continue
+        with open(path, "rb") as handle:
+            data = handle.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry is not None and entry["sha256"] == digest:
+            entry["mtime_ns"] = status.st_mtime_ns
+            continue
+
+        if entry is not None:
+            retire(entry)
+        record = serialization.loads(data)
+        group = _group_key(record)
+        stats = None
+        if group is not None:
+            record_stats = TemplateStats.from_record(record)
+            totals.setdefault(group, TemplateStats()).merge(record_stats)
+            stats = record_stats.to_dict()
+            dirty.add(group)
+        files[path] = {
+            "mtime_ns": status.st_mtime_ns,
+            "size": status.st_size,
+            "sha256": digest,
+            "group": list(group) if group is not None else None,
+            "stats": stats,
+        }
+    return dirty
+
+
+def _read_manifest(path: str) -> list[str]:
+    try:
+        return serialization.load(path)
+    except (ValueError, OSError, EOFError):
+        return []
+
+
+def _same_file(source: str, target: str) -> bool:
+    try:
+        target_status = os.stat(target)
+    except FileNotFoundError:
+        return False
+    source_status = os.stat(source)
+    if source_status.st_size != target_status.st_size:
+        return False
+    if source_status.st_mtime_ns == target_status.st_mtime_ns:
+        return True
+    if _file_digest(source) != _file_digest(target):
+        return False
+    # Same bytes: carry the mtime over so the next sync skips the hashing.
+    os.utime(target, ns=(target_status.st_atime_ns, source_status.st_mtime_ns))
+    return True
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_group(entry: dict[str, Any]) -> Any:
+    return tuple(entry["group"]) if entry["group"] is not None else None
+
+
+def _group_key(record: dict[str, Any]) -> tuple[Any, int] | None:
+    workout_type = record.get("workout_type", "Unknown")
+    duration = int(record.get("duration_minutes", 0))
+    if duration and record.get("intervals", []):
+        return workout_type, duration
+    return None
 
 
 def _ratio(work_seconds: int, rest_seconds: int) -> str:
@@ -114,62 +478,18 @@ def _ratio(work_seconds: int, rest_seconds: int) -> str:
     return f"{work_seconds}:{rest_seconds}"
 
 
-def _median_power(records: list[dict[str, Any]]) -> str:
-    values: list[int] = []
-    for record in records:
-        for interval in record.get("intervals", []):
-            power = interval.get("power_level", "")
-            if power and "/" in power:
-                try:
-                    values.append(int(power.split("/")[0]))
-                except ValueError:
-                    continue
-    if not values:
-        return ""
-    return f"{int(median(values))}/10"
-
+def _power_label(histogram: Histogram) -> str:
+    return f"{int(histogram.median())}/10" if histogram else ""
 
-def _power_profile(records: list[dict[str, Any]]) -> list[str]:
-    sequences: list[list[int | None]] = []
-    max_len = 0
-    for record in records:
-        values: list[int | None] = []
-        for interval in record.get("intervals", []):
-            value = _parse_power(interval.get("power_level", ""))
-            values.append(value)
-        max_len = max(max_len, len(values))
-        sequences.append(values)
-
-    profile: list[str] = []
-    for idx in range(max_len):
-        bucket: list[int] = []
-        for seq in sequences:
-            if idx < len(seq) and seq[idx] is not None:
-                bucket.append(int(seq[idx]))
-        if bucket:
-            profile.append(f"{int(median(bucket))}/10")
-        else:
-            profile.append("")
 
-    return profile
-
-
-def _power_by_zone(records: list[dict[str, Any]]) -> dict[str, str]:
-    buckets: dict[str, list[int]] = {"warmup": [], "main set": [], "recovery": [], "cooldown": []}
-    for record in records:
-        for interval in record.get("intervals", []):
-            zone = (interval.get("zone") or "").lower()
-            zone_key = _normalize_zone(zone)
-            if not zone_key:
-                continue
-            power = _parse_power(interval.get("power_level", ""))
-            if power is not None:
-                buckets[zone_key].append(power)
-
-    return {
-        zone: f"{int(median(values))}/10" if values else ""
-        for zone, values in buckets.items()
-    }
+def _parse_level(value: str) -> int | None:
+    # Looser than _parse_power: "-1/10" and " 8/10" count toward the default.
+    if value and "/" in value:
+        try:
+            return int(value.split("/")[0])
+        except ValueError:
+            return None
+    return None
 
 
 def _parse_power(value: str) -> int | None:
@@ -196,13 +516,3 @@ def _normalize_zone(zone: str) -> str:
     if "main" in zone:
         return "main set"
     return ""
-
-
-def _median_cadence(records: list[dict[str, Any]]) -> int:
-    values: list[int] = []
-    for record in records:
-        for interval in record.get("intervals", []):
-            cadence = interval.get("cadence_rpm", 0)
-            if cadence:
-                values.append(int(cadence))
-    return int(median(values)) if values else 0
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Callable, Iterable
 
 
 def scale_hiit(template: dict[str, Any], target_duration: int) -> dict[str, Any]:
@@ -78,6 +78,102 @@ def scale_cadence(template: dict[str, Any], target_duration: int) -> dict[str, A
     return scale_zone2(template, target_duration)
 
 
+def scale_batch(
+    scaler: Callable[[dict[str, Any], int], dict[str, Any]],
+    template: dict[str, Any],
+    target_durations: Iterable[int],
+) -> list[dict[str, Any]]:
+    # Same results as [scaler(template, duration) for duration in ...]. Counts
+    # come from vectorized arithmetic (numpy rounds half to even like round()),
+    # power is resolved once per position, and each variant copies prototype
+    # intervals instead of rebuilding them.
+    targets = list(target_durations)
+    layout = _LAYOUTS.get(scaler)
+    if layout is None or not targets:
+        return [scaler(template, duration) for duration in targets]
+    import numpy as np
+
+    kind, default_work, default_rest = layout
+    minutes = np.asarray(targets)
+    warmup = int(template.get("warmup_minutes", 5))
+    cooldown = int(template.get("cooldown_minutes", 5))
+    main_minutes = np.maximum(1, minutes - warmup - cooldown)
+    prototypes = _Prototypes(template)
+
+    if kind == _STEADY:
+        return [
+            _with_durations(
+                [
+                    prototypes.copy("warmup", warmup * 60, 0),
+                    prototypes.copy("main set", main * 60, 1),
+                    prototypes.copy("cooldown", cooldown * 60, 2),
+                ],
+                target,
+                template,
+            )
+            for target, main in zip(targets, main_minutes.tolist())
+        ]
+
+    work = int(template.get("work_duration_seconds", default_work))
+    rest = int(template.get("rest_duration_seconds", default_rest))
+    if kind == _FRAMED and work + rest == 0:
+        # The single scalers raise ZeroDivisionError here; keep it that way.
+        return [scaler(template, duration) for duration in targets]
+    if kind == _CYCLES:
+        base_duration = template["duration_minutes"]
+        base_count = max(1, int(template.get("interval_count", 1)))
+        ratio = minutes / base_duration if base_duration else np.ones(len(targets))
+        counts = np.maximum(1, np.rint(base_count * ratio)).astype(np.int64)
+        start = 0
+    else:
+        counts = np.maximum(1, np.rint(main_minutes / ((work + rest) / 60))).astype(np.int64)
+        start = 1
+
+    cycles = prototypes.cycles(int(counts.max()), work, rest, start)
+    results = []
+    for target, count in zip(targets, counts.tolist()):
+        intervals = [dict(interval) for interval in cycles[: 2 * count]]
+        if kind == _FRAMED:
+            intervals.insert(0, prototypes.copy("warmup", warmup * 60, 0))
+            intervals.append(prototypes.copy("cooldown", cooldown * 60, 2 * count + 1))
+        results.append(_with_durations(intervals, target, template))
+    return results
+
+
+class _Prototypes:
+    # Intervals past the power profile only differ by zone, so their power is
+    # resolved once per zone rather than once per interval.
+    def __init__(self, template: dict[str, Any]) -> None:
+        self.template = template
+        self.profile_length = len(template.get("power_profile", []))
+        self._zone_intervals: dict[tuple[str, int], dict[str, Any]] = {}
+
+    def interval(self, zone: str, duration_seconds: int, index: int) -> dict[str, Any]:
+        if index < self.profile_length:
+            return _interval(zone, duration_seconds, self.template, index)
+        key = (zone, duration_seconds)
+        interval = self._zone_intervals.get(key)
+        if interval is None:
+            interval = self._zone_intervals[key] = _interval(
+                zone, duration_seconds, self.template, index
+            )
+        return interval
+
+    def copy(self, zone: str, duration_seconds: int, index: int) -> dict[str, Any]:
+        return dict(self.interval(zone, duration_seconds, index))
+
+    def cycles(
+        self, count: int, work_seconds: int, rest_seconds: int, start_index: int
+    ) -> list[dict[str, Any]]:
+        # Work/recovery pairs for the longest variant; shorter ones use a prefix.
+        intervals: list[dict[str, Any]] = []
+        for offset in range(count):
+            index = start_index + 2 * offset
+            intervals.append(self.interval("main set", work_seconds, index))
+            intervals.append(self.interval("recovery", rest_seconds, index + 1))
+        return intervals
+
+
 def _build_intervals(
     count: int,
     work_seconds: int,
@@ -135,3 +231,17 @@ def _with_durations(
         "duration_minutes": target_duration,
         "estimated_seconds": total_seconds,
     }
+
+
+_CYCLES = "cycles"
+_FRAMED = "framed"
+_STEADY = "steady"
+# Layout and default work/rest seconds behind each scaler, for scale_batch.
+_LAYOUTS: dict[Callable[..., Any], tuple[str, int, int]] = {
+    scale_hiit: (_CYCLES, 30, 30),
+    scale_sweetspot: (_FRAMED, 600, 240),
+    scale_power: (_FRAMED, 600, 240),
+    scale_vo2max: (_FRAMED, 240, 240),
+    scale_zone2: (_STEADY, 0, 0),
+    scale_cadence: (_STEADY, 0, 0),
+}
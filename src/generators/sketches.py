@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import math
+from typing import Iterable
+
+
+class Histogram:
+    # Exact counts per distinct integer. Memory grows with the number of
+    # distinct values (power 0-10, cadence and interval lengths in seconds),
+    # not with the corpus; merging and subtracting are exact, so shards and
+    # incremental runs combine without error.
+    __slots__ = ("counts", "total")
+
+    def __init__(self, values: Iterable[int] = ()) -> None:
+        self.counts: dict[int, int] = {}
+        self.total = 0
+        for value in values:
+            self.add(value)
+
+    def add(self, value: int, count: int = 1) -> None:
+        counts = self.counts
+        if count > 0:
+            counts[value] = counts.get(value, 0) + count
+            self.total += count
+            return
+        remaining = counts.get(value, 0) + count
+        if remaining < 0:
+            raise ValueError(f"Histogram count for {value} would go negative")
+        if remaining:
+            counts[value] = remaining
+        else:
+            counts.pop(value, None)
+        self.total += count
+
+    def merge(self, other: "Histogram", sign: int = 1) -> "Histogram":
+        if sign < 0:
+            # Check first so a failed subtraction leaves this one untouched.
+            for value, count in other.counts.items():
+                if self.counts.get(value, 0) < count:
+                    raise ValueError(f"Histogram count for {value} would go negative")
+        for value, count in other.counts.items():
+            self.add(value, sign * count)
+        return self
+
+    def subtract(self, other: "Histogram") -> "Histogram":
+        return self.merge(other, -1)
+
+    def __len__(self) -> int:
+        return self.total
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Histogram) and self.counts == other.counts
+
+    def __repr__(self) -> str:
+        return f"Histogram({sorted(self.counts.items())})"
+
+    def max(self) -> int:
+        return max(self.counts)
+
+    def median(self) -> int | float:
+        # Same value as statistics.median over the expanded values.
+        if not self.total:
+            raise ValueError("median of an empty histogram")
+        middle = self.total // 2
+        if self.total % 2:
+            return self._at_rank(middle)
+        return (self._at_rank(middle - 1) + self._at_rank(middle)) / 2
+
+    def quantile(self, fraction: float) -> float:
+        # Linear interpolation between closest ranks (numpy's default).
+        if not self.total:
+            raise ValueError("quantile of an empty histogram")
+        if not 0 <= fraction <= 1:
+            raise ValueError("quantile fraction must be within [0, 1]")
+        position = (self.total - 1) * fraction
+        low = math.floor(position)
+        lower = self._at_rank(low)
+        if position == low:
+            return float(lower)
+        upper = self._at_rank(low + 1)
+        return lower + (upper - lower) * (position - low)
+
+    def to_pairs(self) -> list[list[int]]:
+        return [[value, count] for value, count in sorted(self.counts.items())]
+
+    @classmethod
+    def from_pairs(cls, pairs: Iterable[Iterable[int]]) -> "Histogram":
+        histogram = cls()
+        for value, count in pairs:
+            histogram.add(value, count)
+        return histogram
+
+    def _at_rank(self, rank: int) -> int:
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if rank < seen:
+                return value
+        raise IndexError(rank)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Mapping, NamedTuple
+
+import numpy as np
+
+FEATURES = (
+    "duration_minutes",
+    "interval_count",
+    "work_duration_seconds",
+    "rest_duration_seconds",
+    "work_rest_ratio",
+    "default_power_level",
+)
+# Duration dominates by default: a template far off the requested length
+# needs the most scaling, whatever else matches.
+DEFAULT_WEIGHTS = {
+    "duration_minutes": 4.0,
+    "interval_count": 1.0,
+    "work_duration_seconds": 1.0,
+    "rest_duration_seconds": 1.0,
+    "work_rest_ratio": 1.0,
+    "default_power_level": 1.0,
+}
+# Distance, in feature ranges, charged when a template lacks a queried value.
+MISSING_PENALTY = 1.0
+
+
+class TemplateMatch(NamedTuple):
+    distance: float
+    template: dict[str, Any]
+
+
+class TemplateIndex:
+    # Templates as rows of a feature matrix, one contiguous block per type.
+    # Queries name any subset of FEATURES; each difference is divided by that
+    # feature's range over the index and weighted, so distances are unitless.
+    def __init__(
+        self,
+        templates: Mapping[str, Mapping[str, dict[str, Any]]],
+        weights: Mapping[str, float] | None = None,
+    ) -> None:
+        unknown = set(weights or {}) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown template features: {sorted(unknown)}")
+        weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.weights = np.asarray([float(weights[name]) for name in FEATURES])
+
+        self.entries: list[dict[str, Any]] = []
+        self._type_rows: dict[str, slice] = {}
+        for workout_type, durations in templates.items():
+            start = len(self.entries)
+            for key in sorted(durations, key=int):
+                self.entries.append(durations[key])
+            self._type_rows[workout_type] = slice(start, len(self.entries))
+
+        self.features = np.asarray(
+            [_features(template) for template in self.entries], dtype=np.float64
+        ).reshape(len(self.entries), len(FEATURES))
+        self.scales = _spread(self.features)
+
+    def nearest(
+        self,
+        k: int = 1,
+        workout_type: str | None = None,
+        **constraints: Any,
+    ) -> list[TemplateMatch]:
+        if k < 1:
+            raise ValueError(f"k must be at least 1, got {k}")
+        unknown = set(constraints) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown template features: {sorted(unknown)}")
+        if workout_type is None:
+            rows = slice(0, len(self.entries))
+        elif workout_type in self._type_rows:
+            rows = self._type_rows[workout_type]
+        else:
+            return []
+
+        columns = [
+            index
+            for index, name in enumerate(FEATURES)
+            if constraints.get(name) is not None
+        ]
+        query = np.asarray(
+            [_feature(FEATURES[index], constraints[FEATURES[index]]) for index in columns]
+        )
+        if np.isnan(query).any():
+            raise ValueError(f"Unparseable template constraints: {constraints}")
+        offsets = (self.features[rows][:, columns] - query) / self.scales[columns]
+        offsets = np.where(np.isnan(offsets), MISSING_PENALTY, offsets)
+        distances = np.sqrt((self.weights[columns] * offsets**2).sum(axis=1))
+
+        count = min(k, len(distances))
+        if count < len(distances):
+            # Partition to the k best, then order just those; ties keep the
+            # type/duration order.
+            candidates = np.argpartition(distances, count - 1)[:count]
+            cutoff = distances[candidates].max()
+            candidates = np.flatnonzero(distances <= cutoff)
+        else:
+            candidates = np.arange(len(distances))
+        order = candidates[np.argsort(distances[candidates], kind="stable")][:count]
+        first = rows.start
+        return [
+            TemplateMatch(float(distances[index]), self.entries[first + index])
+            for index in order.tolist()
+        ]
+
+
+def _spread(features: np.ndarray) -> np.ndarray:
+    # Per-feature range over the known values; 1 where there is none.
+    known = ~np.isnan(features)
+    high = np.where(known, features, -np.inf).max(axis=0, initial=-np.inf)
+    low = np.where(known, features, np.inf).min(axis=0, initial=np.inf)
+    spread = high - low
+    return np.where(np.isfinite(spread) & (spread > 0), spread, 1.0)
+
+
+def _features(template: dict[str, Any]) -> list[float]:
+    return [_feature(name, template.get(name)) for name in FEATURES]
+
+
+def _feature(name: str, value: Any) -> float:
+    # Templates and queries share these encodings; anything unparseable is
+    # missing (NaN).
+    if value is None or value == "":
+        return math.nan
+    if name == "work_rest_ratio":
+        return _log_ratio(value)
+    if name == "default_power_level" and isinstance(value, str):
+        try:
+            return float(value.split("/")[0])
+        except ValueError:
+            return math.nan
+    return float(value)
+
+
+def _log_ratio(value: Any) -> float:
+    # log2 of work over rest, so 1:2 and 2:1 sit equally far from 1:1.
+    if isinstance(value, str):
+        work, _, rest = value.partition(":")
+        try:
+            value = float(work) / float(rest)
+        except (ValueError, ZeroDivisionError):
+            return math.nan
+    return math.log2(value) if value > 0 else math.nan
@@ -1,50 +1,165 @@
 from __future__ import annotations
 
-import json
+import bisect
+import fcntl
 import os
-from typing import Any
+import threading
+from typing import TYPE_CHECKING, Any, Mapping
 
+from cycling_workout_extractor import serialization
 from generators.pattern_analyzer import (
     DEFAULT_TEMPLATES_PATH,
+    STATE_FILENAME,
     TEMPLATE_VERSION,
     analyze_patterns,
-    mirror_workouts_to_processed,
     save_templates,
+    sync_workouts_to_processed,
 )
 
+if TYPE_CHECKING:
+    from generators.template_index import TemplateIndex
+
 
 def load_templates(path: str = DEFAULT_TEMPLATES_PATH) -> dict[str, Any]:
-    regenerate = True
-    if os.path.exists(path):
-        with open(path, "r", encoding="utf-8") as handle:
-            payload = json.load(handle)
-        version = payload.get("metadata", {}).get("template_version")
-        regenerate = version != TEMPLATE_VERSION
-
-    if regenerate:
-        mirror_workouts_to_processed()
-        payload = analyze_patterns()
-        save_templates(payload, path)
+    payload = _read_templates(path)
+    if payload is not None and _is_current(payload):
         return payload
 
-    return payload
+    # Single flight across processes: one caller rebuilds under the lock.
+    # While it does, callers with an older file keep serving it and callers
+    # with none wait for the rebuild; writes are atomic renames either way.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | (fcntl.LOCK_NB if payload is not None else 0))
+        except BlockingIOError:
+            return payload
+        try:
+            # Another process may have finished the rebuild while this one
+            # waited for the lock.
+            payload = _read_templates(path)
+            if payload is not None and _is_current(payload):
+                return payload
+            return _regenerate(path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def refresh_templates(path: str = DEFAULT_TEMPLATES_PATH) -> dict[str, Any]:
+    # Brings current templates up to date with ./workouts: syncs, and when
+    # anything changed re-reads just those files through the analysis state.
+    # Waits for (and then re-checks after) any rebuild already in flight.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            return _regenerate(path)
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class TemplateCatalog:
+    # A loaded templates payload with each type's durations kept sorted, so
+    # the nearest duration is a bisect rather than a scan.
+    def __init__(self, payload: dict[str, Any]) -> None:
+        self.payload = payload
+        self.templates: dict[str, dict[str, Any]] = payload.get("templates", {})
+        self._durations = {
+            workout_type: sorted(int(key) for key in durations)
+            for workout_type, durations in self.templates.items()
+        }
+        self._indexes: dict[Any, TemplateIndex] = {}
+
+    def get(self, workout_type: str, duration: int) -> dict[str, Any] | None:
+        durations = self.templates.get(workout_type)
+        if durations is None:
+            return None
+        template = durations.get(str(duration))
+        if template is not None:
+            return template
+        available = self._durations[workout_type]
+        if not available:
+            return None
+        # Of the neighbours around the insertion point, the smaller wins ties.
+        index = bisect.bisect_left(available, duration)
+        candidates = available[max(index - 1, 0) : index + 1]
+        closest = min(candidates, key=lambda value: abs(value - duration))
+        return durations[str(closest)]
+
+    def index(self, weights: Mapping[str, float] | None = None) -> "TemplateIndex":
+        # Built on first use per weighting; dropped with the catalog when the
+        # file changes.
+        key = tuple(sorted((weights or {}).items()))
+        index = self._indexes.get(key)
+        if index is None:
+            from generators.template_index import TemplateIndex
+
+            index = self._indexes[key] = TemplateIndex(self.templates, weights)
+        return index
+
+
+# One catalog per templates file, reused until the file's mtime, inode or
+# size changes. A hit costs a stat.
+_catalogs: dict[str, tuple[tuple[int, int, int] | None, TemplateCatalog]] = {}
+_catalog_lock = threading.Lock()
+
+
+def template_catalog(path: str = DEFAULT_TEMPLATES_PATH) -> TemplateCatalog:
+    key = os.path.abspath(path)
+    cached = _catalogs.get(key)
+    if cached is not None and cached[0] == _signature(key):
+        return cached[1]
+    with _catalog_lock:
+        cached = _catalogs.get(key)
+        if cached is not None and cached[0] == _signature(key):
+            return cached[1]
+        catalog = TemplateCatalog(load_templates(path))
+        # An outdated payload is served while another process rebuilds, but
+        # never cached: the next call goes back through load_templates, so a
+        # failed rebuild is retried instead of leaving it stale for good.
+        if _is_current(catalog.payload):
+            # Stat after loading, since loading may have regenerated the file.
+            _catalogs[key] = (_signature(key), catalog)
+        return catalog
 
 
 def get_template(
     workout_type: str, duration: int, path: str = DEFAULT_TEMPLATES_PATH
 ) -> dict[str, Any] | None:
-    payload = load_templates(path)
-    templates = payload.get("templates", {})
-    if workout_type not in templates:
-        return None
+    return template_catalog(path).get(workout_type, duration)
 
-    durations = templates[workout_type]
-    if str(duration) in durations:
-        return durations[str(duration)]
 
-    available = sorted(int(key) for key in durations.keys())
-    if not available:
+def _regenerate(path: str) -> dict[str, Any]:
+    # Callers hold the templates lock. The analysis state sits next to the
+    # templates it produced, so unchanged files are never re-read.
+    report = sync_workouts_to_processed()
+    payload = _read_templates(path)
+    if payload is not None and _is_current(payload) and not report.changed:
+        return payload
+    # The processed dir is fed by the sync, so its report lists every file
+    # that can have moved since the state was written.
+    payload = analyze_patterns(
+        state_path=os.path.join(os.path.dirname(path), STATE_FILENAME),
+        changed=report.changed,
+    )
+    save_templates(payload, path)
+    return payload
+
+
+def _read_templates(path: str) -> dict[str, Any] | None:
+    try:
+        return serialization.load(path)
+    except FileNotFoundError:
         return None
 
-    closest = min(available, key=lambda value: abs(value - duration))
-    return durations[str(closest)]
+
+def _is_current(payload: dict[str, Any]) -> bool:
+    return payload.get("metadata", {}).get("template_version") == TEMPLATE_VERSION
+
+
+def _signature(path: str) -> tuple[int, int, int] | None:
+    try:
+        status = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return status.st_mtime_ns, status.st_ino, status.st_size
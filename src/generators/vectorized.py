@@ -0,0 +1,392 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterable, NamedTuple
+
+import numpy as np
+
+from cycling_workout_extractor.corpus_store import CorpusSnapshot
+from generators.pattern_analyzer import ZONE_BUCKETS, TemplateStats
+from generators.sketches import Histogram
+
+NO_ZONE = -1
+
+
+class IntervalTable(NamedTuple):
+    # One row per group and one per interval of a grouped record. Power and
+    # zone columns are already parsed, with validity masks in place of
+    # missing values.
+    group_types: list[Any]
+    group_durations: list[int]
+    interval_group: np.ndarray
+    position: np.ndarray
+    duration: np.ndarray
+    rest: np.ndarray
+    power: np.ndarray
+    has_power: np.ndarray
+    level: np.ndarray
+    has_level: np.ndarray
+    zone: np.ndarray
+    cadence: np.ndarray
+    has_cadence: np.ndarray
+
+
+def table_from_records(
+    records: Iterable[dict[str, Any]],
+    group_key: Callable[[dict[str, Any]], Any],
+    parse_power: Callable[[Any], int | None],
+    parse_level: Callable[[Any], int | None],
+    normalize_zone: Callable[[str], str],
+) -> IntervalTable:
+    groups: dict[Any, int] = {}
+    powers = _StringColumn()
+    zones = _StringColumn()
+    interval_group: list[int] = []
+    position: list[int] = []
+    duration: list[int] = []
+    power_ids: list[int] = []
+    zone_ids: list[int] = []
+    cadence: list[int] = []
+    has_cadence: list[bool] = []
+    for record in records:
+        key = group_key(record)
+        if key is None:
+            continue
+        group = groups.setdefault(key, len(groups))
+        for index, interval in enumerate(record.get("intervals", [])):
+            interval_group.append(group)
+            position.append(index)
+            duration.append(int(interval.get("duration_seconds", 0)))
+            power_ids.append(powers.intern(interval.get("power_level", "")))
+            zone_ids.append(zones.intern(interval.get("zone") or ""))
+            value = interval.get("cadence_rpm", 0)
+            cadence.append(int(value) if value else 0)
+            has_cadence.append(bool(value))
+
+    return _table(
+        list(groups),
+        np.asarray(interval_group, dtype=np.int64),
+        np.asarray(position, dtype=np.int64),
+        np.asarray(duration, dtype=np.int64),
+        np.asarray(power_ids, dtype=np.int64),
+        powers.values,
+        np.asarray(zone_ids, dtype=np.int64),
+        zones.values,
+        np.asarray(cadence, dtype=np.int64),
+        np.asarray(has_cadence, dtype=bool),
+        parse_power,
+        parse_level,
+        normalize_zone,
+    )
+
+
+def table_from_corpus(
+    snapshot: CorpusSnapshot,
+    parse_power: Callable[[Any], int | None],
+    parse_level: Callable[[Any], int | None],
+    normalize_zone: Callable[[str], str],
+) -> IntervalTable:
+    # Same grouping as the record path over the store's live rows: non-zero
+    # duration, at least one interval, groups in first-seen order.
+    records = snapshot.records[snapshot.live]
+    records = records[(records["duration_minutes"] != 0) & (records["interval_count"] > 0)]
+    keys = np.stack(
+        [records["workout_type"].astype(np.int64), records["duration_minutes"].astype(np.int64)],
+        axis=1,
+    )
+    if len(keys):
+        unique, first, inverse = np.unique(
+            keys, axis=0, return_index=True, return_inverse=True
+        )
+        order = np.argsort(first, kind="stable")
+        rank = np.empty_like(order)
+        rank[order] = np.arange(len(order))
+        record_group = rank[inverse.reshape(-1)]
+        unique = unique[order]
+    else:
+        unique = np.zeros((0, 2), dtype=np.int64)
+        record_group = np.zeros(0, dtype=np.int64)
+
+    counts = records["interval_count"].astype(np.int64)
+    starts = records["interval_offset"].astype(np.int64)
+    total = int(counts.sum())
+    # Row indexes of every interval of every record, record by record.
+    record_of = np.repeat(np.arange(len(records)), counts)
+    position = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows = starts[record_of] + position
+    intervals = snapshot.intervals[rows]
+
+    strings = snapshot.strings
+    return _table(
+        [(strings[type_id], int(minutes)) for type_id, minutes in unique.tolist()],
+        record_group[record_of],
+        position,
+        intervals["duration_seconds"].astype(np.int64),
+        intervals["power_level"].astype(np.int64),
+        strings,
+        intervals["zone"].astype(np.int64),
+        strings,
+        intervals["cadence_rpm"].astype(np.int64),
+        intervals["cadence_rpm"] != 0,
+        parse_power,
+        parse_level,
+        normalize_zone,
+    )
+
+
+def build_templates(table: IntervalTable, workers: int = 1) -> dict[str, dict[str, Any]]:
+    group_count = len(table.group_types)
+    if workers > 1 and group_count > 1:
+        shards = _shards(table, workers)
+        with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+            built: dict[int, dict[str, Any]] = {}
+            for part in pool.map(_build_shard, shards):
+                built.update(part)
+    else:
+        built = _build_shard((table, list(range(group_count))))
+
+    templates: dict[str, dict[str, Any]] = {}
+    for group in range(group_count):
+        workout_type = table.group_types[group]
+        templates.setdefault(workout_type, {})[str(table.group_durations[group])] = built[group]
+    return templates
+
+
+def table_stats(table: IntervalTable) -> dict[tuple[Any, int], TemplateStats]:
+    # The exact, mergeable histograms the python engine keeps per group,
+    # filled from value counts over the columns instead of record by record.
+    groups = len(table.group_types)
+    stats = [TemplateStats() for _ in range(groups)]
+    group = table.interval_group
+    # A record's last interval is followed by another record's position 0.
+    ends = np.flatnonzero(np.append(table.position[1:] == 0, True)) if len(group) else group
+    record_group = group[ends]
+    records = np.bincount(record_group, minlength=groups).tolist()
+    intervals = np.bincount(group, minlength=groups).tolist()
+    for index, item in enumerate(stats):
+        item.records = records[index]
+        item.interval_count = intervals[index]
+
+    def fill(name: str, keys: np.ndarray, values: np.ndarray) -> None:
+        for key, value, count in zip(*_value_counts(keys, values)):
+            getattr(stats[key], name).add(value, count)
+
+    fill("profile_lengths", record_group, table.position[ends] + 1)
+    fill("work", group[~table.rest], table.duration[~table.rest])
+    fill("rest", group[table.rest], table.duration[table.rest])
+    fill("powers", group[table.has_level], table.level[table.has_level])
+    fill("cadences", group[table.has_cadence], table.cadence[table.has_cadence])
+
+    for item in stats:
+        length = item.profile_lengths.max() if item.profile_lengths else 0
+        item.profile = [Histogram() for _ in range(length)]
+    stride = int(table.position.max(initial=0)) + 1
+    profile_keys = group[table.has_power] * stride + table.position[table.has_power]
+    for key, value, count in zip(*_value_counts(profile_keys, table.power[table.has_power])):
+        stats[key // stride].profile[key % stride].add(value, count)
+
+    zoned = table.has_power & (table.zone != NO_ZONE)
+    zone_keys = group[zoned] * len(ZONE_BUCKETS) + table.zone[zoned]
+    for key, value, count in zip(*_value_counts(zone_keys, table.power[zoned])):
+        zone = ZONE_BUCKETS[key % len(ZONE_BUCKETS)]
+        stats[key // len(ZONE_BUCKETS)].zones[zone].add(value, count)
+
+    return {
+        (table.group_types[index], table.group_durations[index]): stats[index]
+        for index in range(groups)
+    }
+
+
+def _build_shard(
+    args: tuple[IntervalTable, list[int]],
+) -> dict[int, dict[str, Any]]:
+    table, group_ids = args
+    groups = len(table.group_types)
+    interval_count = np.bincount(table.interval_group, minlength=groups)
+
+    group = table.interval_group
+    work = _segment_medians(group[~table.rest], table.duration[~table.rest], groups)
+    rest = _segment_medians(group[table.rest], table.duration[table.rest], groups)
+    level = _segment_medians(group[table.has_level], table.level[table.has_level], groups)
+    has_cadence = table.has_cadence
+    cadence = _segment_medians(group[has_cadence], table.cadence[has_cadence], groups)
+
+    zoned = table.has_power & (table.zone != NO_ZONE)
+    zone_keys = group[zoned] * len(ZONE_BUCKETS) + table.zone[zoned]
+    zone = _segment_medians(zone_keys, table.power[zoned], groups * len(ZONE_BUCKETS))
+
+    # Positions run to the longest record in the group; positions where no
+    # record has a parseable power stay empty.
+    lengths = np.zeros(groups, dtype=np.int64)
+    np.maximum.at(lengths, group, table.position + 1)
+    stride = int(lengths.max(initial=0))
+    profile_keys = group[table.has_power] * stride + table.position[table.has_power]
+    profile = _segment_medians(profile_keys, table.power[table.has_power], groups * stride)
+
+    templates: dict[int, dict[str, Any]] = {}
+    for index in group_ids:
+        work_duration = _int_median(work, index, 0)
+        rest_duration = _int_median(rest, index, 0)
+        templates[index] = {
+            "workout_type": table.group_types[index],
+            "duration_minutes": table.group_durations[index],
+            "interval_count": int(interval_count[index]),
+            "work_duration_seconds": work_duration,
+            "rest_duration_seconds": rest_duration,
+            "work_rest_ratio": (
+                f"{work_duration}:{rest_duration}" if work_duration and rest_duration else ""
+            ),
+            "warmup_minutes": 5,
+            "cooldown_minutes": 5,
+            "default_power_level": _label(level, index),
+            "default_cadence_rpm": _int_median(cadence, index, 0),
+            "power_profile": [
+                _label(profile, index * stride + offset)
+                for offset in range(int(lengths[index]))
+            ],
+            "power_by_zone": {
+                name: _label(zone, index * len(ZONE_BUCKETS) + code)
+                for code, name in enumerate(ZONE_BUCKETS)
+            },
+        }
+    return templates
+
+
+def _segment_medians(
+    keys: np.ndarray, values: np.ndarray, size: int
+) -> tuple[np.ndarray, np.ndarray]:
+    # Median of values per key, as statistics.median computes it; returns the
+    # medians and a mask of keys that had any values.
+    counts = np.bincount(keys, minlength=size)
+    present = counts > 0
+    medians = np.zeros(size, dtype=np.float64)
+    if not len(keys):
+        return medians, present
+    low = int(values.min())
+    span = int(values.max()) - low + 1
+    if size * span < 2**62:
+        # Key and value packed into one int64 sort far faster than lexsort.
+        ordered = np.sort(keys * span + (values - low)) % span + low
+    else:
+        ordered = values[np.lexsort((values, keys))]
+    starts = np.cumsum(counts) - counts
+    middle = starts[present] + counts[present] // 2
+    upper = ordered[middle]
+    lower = ordered[np.where(counts[present] % 2, middle, middle - 1)]
+    medians[present] = (lower + upper) / 2
+    return medians, present
+
+
+def _value_counts(
+    keys: np.ndarray, values: np.ndarray
+) -> tuple[list[int], list[int], list[int]]:
+    # Distinct (key, value) pairs and how often each occurs.
+    if not len(keys):
+        return [], [], []
+    low = int(values.min())
+    span = int(values.max()) - low + 1
+    if (int(keys.max()) + 1) * span < 2**62:
+        packed, counts = np.unique(keys * span + (values - low), return_counts=True)
+        return (packed // span).tolist(), (packed % span + low).tolist(), counts.tolist()
+    pairs, counts = np.unique(np.stack([keys, values], axis=1), axis=0, return_counts=True)
+    return pairs[:, 0].tolist(), pairs[:, 1].tolist(), counts.tolist()
+
+
+def _int_median(
+    result: tuple[np.ndarray, np.ndarray], index: int, default: int
+) -> int:
+    medians, present = result
+    return int(medians[index]) if present[index] else default
+
+
+def _label(result: tuple[np.ndarray, np.ndarray], index: int) -> str:
+    medians, present = result
+    return f"{int(medians[index])}/10" if present[index] else ""
+
+
+def _shards(table: IntervalTable, workers: int) -> list[tuple[IntervalTable, list[int]]]:
+    # Groups are dealt out by interval count so shards carry similar work;
+    # each shard keeps the full group numbering but only its own intervals.
+    sizes = np.bincount(table.interval_group, minlength=len(table.group_types))
+    loads = [0] * workers
+    assigned: list[list[int]] = [[] for _ in range(workers)]
+    for group in np.argsort(-sizes, kind="stable").tolist():
+        target = loads.index(min(loads))
+        assigned[target].append(group)
+        loads[target] += int(sizes[group])
+
+    shards = []
+    for group_ids in assigned:
+        if not group_ids:
+            continue
+        mask = np.isin(table.interval_group, group_ids)
+        columns = [
+            column[mask] if isinstance(column, np.ndarray) else column
+            for column in table
+        ]
+        shards.append((IntervalTable(*columns), sorted(group_ids)))
+    return shards
+
+
+def _table(
+    group_keys: list[Any],
+    interval_group: np.ndarray,
+    position: np.ndarray,
+    duration: np.ndarray,
+    power_ids: np.ndarray,
+    power_strings: list[Any],
+    zone_ids: np.ndarray,
+    zone_strings: list[Any],
+    cadence: np.ndarray,
+    has_cadence: np.ndarray,
+    parse_power: Callable[[Any], int | None],
+    parse_level: Callable[[Any], int | None],
+    normalize_zone: Callable[[str], str],
+) -> IntervalTable:
+    # Power and zone strings repeat heavily, so each distinct one is parsed
+    # once and the results are gathered per interval.
+    parsed_power = [parse_power(value) for value in power_strings]
+    parsed_level = [parse_level(value) for value in power_strings]
+    lowered = [(value or "").lower() for value in zone_strings]
+    zone_codes = [
+        ZONE_BUCKETS.index(name) if name else NO_ZONE
+        for name in (normalize_zone(value) for value in lowered)
+    ]
+    is_rest = [value in {"recovery", "cooldown"} for value in lowered]
+
+    power = np.asarray([value or 0 for value in parsed_power], dtype=np.int64)
+    has_power = np.asarray([value is not None for value in parsed_power], dtype=bool)
+    level = np.asarray([value or 0 for value in parsed_level], dtype=np.int64)
+    has_level = np.asarray([value is not None for value in parsed_level], dtype=bool)
+    return IntervalTable(
+        [key[0] for key in group_keys],
+        [key[1] for key in group_keys],
+        interval_group,
+        position,
+        duration,
+        np.asarray(is_rest, dtype=bool)[zone_ids] if len(zone_ids) else np.zeros(0, bool),
+        _gather(power, power_ids),
+        _gather(has_power, power_ids),
+        _gather(level, power_ids),
+        _gather(has_level, power_ids),
+        _gather(np.asarray(zone_codes, dtype=np.int64), zone_ids),
+        cadence,
+        has_cadence,
+    )
+
+
+def _gather(values: np.ndarray, ids: np.ndarray) -> np.ndarray:
+    return values[ids] if len(ids) else np.zeros(0, dtype=values.dtype)
+
+
+class _StringColumn:
+    def __init__(self) -> None:
+        self.values: list[Any] = []
+        self._ids: dict[Any, int] = {}
+
+    def intern(self, value: Any) -> int:
+        index = self._ids.get(value)
+        if index is None:
+            index = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return index
@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any
+from typing import Any, Mapping
 
 from generators.personalizer import personalize
 from generators.scaler import (
@@ -12,12 +12,13 @@ from generators.scaler import (
     scale_vo2max,
     scale_zone2,
 )
-from generators.template_manager import get_template
+from generators.template_manager import get_template, template_catalog
 from generators.validator import validate_generated
 
 
 class WorkoutGenerator:
-    def __init__(self) -> None:
+    def __init__(self, template_weights: Mapping[str, float] | None = None) -> None:
+        self._template_weights = template_weights
         self._scalers = {
             "HIIT": scale_hiit,
             "Zone 2": scale_zone2,
@@ -27,14 +28,32 @@ class WorkoutGenerator:
             "Cadence": scale_cadence,
         }
 
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "WorkoutGenerator":
+        return cls(config.get("templates", {}).get("nearest_weights"))
+
+    def best_template(
+        self, workout_type: str, duration: int, **constraints: Any
+    ) -> dict[str, Any] | None:
+        # Plain nearest duration unless richer constraints (interval_count,
+        # work_rest_ratio, ...; see template_index.FEATURES) are given.
+        if not any(value is not None for value in constraints.values()):
+            return get_template(workout_type, duration)
+        index = template_catalog().index(self._template_weights)
+        matches = index.nearest(
+            workout_type=workout_type, duration_minutes=duration, **constraints
+        )
+        return matches[0].template if matches else None
+
     def generate(
         self,
         duration: int,
         workout_type: str,
         user_ftp: int | None = None,
         fitness_level: str = "intermediate",
+        **constraints: Any,
     ) -> dict[str, Any]:
-        template = get_template(workout_type, duration)
+        template = self.best_template(workout_type, duration, **constraints)
         if not template:
             raise ValueError(f"No template for {workout_type}")
 
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from cycling_workout_extractor.archive import RawArchive
+
+
+def test_archive_round_trip_and_dedup(tmp_path):
+    archive = RawArchive(str(tmp_path))
+    payload = [{"text": "ninety rpm", "start": 0, "duration": 30}]
+    first = archive.put("transcript", "a", payload)
+    second = archive.put("transcript", "b", payload)
+    archive.save()
+
+    reloaded = RawArchive(str(tmp_path))
+    assert first == second
+    assert reloaded.get("transcript", "b") == payload
+    assert reloaded.video_ids("transcript") == ["a", "b"]
+    assert len(list((tmp_path / "objects").rglob("*.json.gz"))) == 1
+
+
+def test_cached_fetcher_respects_ttl_and_offline(tmp_path):
+    calls = []
+
+    def fetch(video_id):
+        calls.append(video_id)
+        return [{"text": video_id}]
+
+    archive = RawArchive(str(tmp_path), ttl_seconds=3600)
+    fetcher = archive.cached_fetcher("transcript", fetch)
+    assert fetcher("a") == fetcher("a") == [{"text": "a"}]
+    assert calls == ["a"]
+
+    archive.ttl_seconds = -1
+    fetcher("a")
+    assert calls == ["a", "a"]
+
+    offline = archive.cached_fetcher("transcript", fetch, offline=True)
+    assert offline("missing") is None
+    assert calls == ["a", "a"]
+
+
+def test_evict_drops_oldest_entries(tmp_path):
+    archive = RawArchive(str(tmp_path), max_bytes=1)
+    archive.put("metadata", "old", {"title": "old"})
+    archive.put("metadata", "new", {"title": "new"})
+    archive.max_bytes = archive._index["metadata:new"]["size"]
+
+    assert archive.evict() == 1
+    assert archive.video_ids("metadata") == ["new"]
+    assert archive.get("metadata", "old") is None
+
+
+def test_save_merges_indexes_from_other_processes(tmp_path):
+    first, second = RawArchive(str(tmp_path)), RawArchive(str(tmp_path))
+    first.put("metadata", "a", {"id": "a"})
+    second.put("metadata", "b", {"id": "b"})
+    first.save()
+    second.save()
+
+    assert RawArchive(str(tmp_path)).video_ids("metadata") == ["a", "b"]
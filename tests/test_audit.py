@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+
+from generators.audit import GENERATED, Corpus, audit_corpus, audit_directory
+from generators.validator import validate_generated
+
+
+def _interval(duration, **fields):
+    return {"start_time": "00:00", "end_time": "01:00", "duration_seconds": duration, **fields}
+
+
+def test_processed_audit_reports_every_interval_missing_bounds(tmp_path):
+    records = {
+        "good": {
+            "video_id": "good",
+            "title": "t",
+            "url": "u",
+            "workout_type": "HIIT",
+            "duration_minutes": 10,
+            "intervals": [_interval(60)],
+        },
+        "bad": {
+            "video_id": "bad",
+            "title": "",
+            "url": "u",
+            "workout_type": "HIIT",
+            "duration_minutes": 10,
+            "intervals": [_interval(60), _interval(60, end_time=""), _interval(60, start_time="")],
+        },
+    }
+    for name, record in records.items():
+        (tmp_path / f"{name}.json").write_text(json.dumps(record), encoding="utf-8")
+
+    report = audit_directory(str(tmp_path)).to_dict()
+
+    assert report["failed"] == 1
+    assert report["reasons"] == {
+        "bad": [
+            "missing title",
+            "interval 2 missing time bounds",
+            "interval 3 missing time bounds",
+        ]
+    }
+    assert report["interval_counts"]["missing time bounds"] == 2
+
+
+def test_generated_audit_agrees_with_validate_generated():
+    records = [
+        {"duration_minutes": 10, "intervals": [_interval(600, zone="main set")]},
+        {"duration_minutes": 20, "intervals": [_interval(600)]},
+        {"duration_minutes": 1, "intervals": [_interval(30, zone="recovery", power_watts=10)]},
+        {"duration_minutes": 2, "intervals": [_interval(60, cadence_rpm=150), _interval(60, cadence_rpm=20)]},
+        {"duration_minutes": 5, "intervals": []},
+    ]
+    report = audit_corpus(Corpus((str(i), r) for i, r in enumerate(records)), GENERATED)
+
+    for row, record in enumerate(records):
+        ok, _ = validate_generated(record, record["duration_minutes"])
+        assert ok == (row not in report.reasons)
+    assert report.reasons[1] == ["duration mismatch"]
+    assert report.reasons[2] == ["interval 1 unrealistic power", "insufficient recovery"]
+    assert report.reasons[3] == ["interval 1 unrealistic cadence", "interval 2 unrealistic cadence"]
+    assert report.reasons[4] == ["missing intervals"]
+    assert report.record_counts["unrealistic cadence"] == 1
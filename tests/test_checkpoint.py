@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from cycling_workout_extractor.checkpoint import Checkpoint
+
+
+def _result(video_id):
+    return video_id, {"video_id": video_id, "status": "ok"}, []
+
+
+def test_checkpoint_resumes_and_skips_torn_lines(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    checkpoint = Checkpoint(path, "s1")
+    checkpoint.append(_result("a"))
+    checkpoint.append(_result("b"))
+    checkpoint.close()
+    with open(path, "a", encoding="utf-8") as handle:
+        handle.write('{"video_id": "c", "ro')
+
+    resumed = Checkpoint(path, "s1")
+    assert resumed.completed_ids() == {"a", "b"}
+    resumed.append(_result("c"))
+    resumed.close()
+    assert [result[0] for result in Checkpoint(path, "s1").results()] == ["a", "b", "c"]
+
+
+def test_checkpoint_from_other_settings_is_discarded(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    old = Checkpoint(path, "s1")
+    old.append(_result("a"))
+    old.close()
+
+    fresh = Checkpoint(path, "s2")
+    assert fresh.completed_ids() == set()
+    fresh.append(_result("b"))
+    fresh.clear()
+    assert not (tmp_path / "checkpoint.jsonl").exists()
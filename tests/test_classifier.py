@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import pytest
+
+from cycling_workout_extractor.classifier import (
+    TRIE_MIN_KEYWORDS,
+    KeywordClassifier,
+    classify_workout_type,
+)
+from cycling_workout_extractor.validator import is_probable_workout
+
+KEYWORDS = {
+    "HIIT": ["intervals", "HIIT"],
+    "Sweet Spot": ["sweet spot", "tempo"],
+    "Power": ["low cadence"],
+    "Cadence": ["cadence"],
+}
+PRIORITY = ["HIIT", "Sweet Spot", "Power", "Cadence"]
+FILLER = {"Filler": [f"filler term {index}" for index in range(TRIE_MIN_KEYWORDS)]}
+
+
+@pytest.mark.parametrize("extra", [{}, FILLER], ids=["substring", "trie"])
+def test_classifier_keeps_priority_semantics(extra):
+    classifier = KeywordClassifier(
+        {**KEYWORDS, **extra}, PRIORITY + list(extra), ["announcement", "news"]
+    )
+
+    assert classifier.classify("Tempo and HIIT", "") == ("HIIT", True)
+    assert classifier.classify("Low Cadence drills", "") == ("Power", True)
+    assert classifier.classify("Spin", "cadence work") == ("Cadence", True)
+    assert classifier.classify("Big Announcement", "sweet spot") == ("Sweet Spot", False)
+    assert classifier.classify("Recovery spin", "") == ("Unknown", True)
+    # Keywords may span the joined title and description.
+    assert classifier.classify("Sweet", "spot") == ("Sweet Spot", True)
+    assert classifier.classify_many([("news", ""), ("filler term 3", "")]) == [
+        ("Unknown", False),
+        ("Filler" if extra else "Unknown", True),
+    ]
+
+
+def test_module_functions_delegate_to_the_compiled_classifier():
+    assert classify_workout_type("Tempo ride", "", KEYWORDS, PRIORITY) == "Sweet Spot"
+    assert classify_workout_type("Tempo ride", "", KEYWORDS, ["Cadence"]) == "Unknown"
+    assert is_probable_workout("Team NEWS", "", ["news"]) is False
+    assert is_probable_workout("Intervals", "", []) is True
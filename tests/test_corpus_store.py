@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+import os
+
+from cycling_workout_extractor.corpus_store import (
+    INTERVALS_FILENAME,
+    CorpusStore,
+    build_corpus,
+)
+from generators.pattern_analyzer import analyze_patterns
+
+
+def _record(video_id, workout_type="HIIT", powers=("7/10", "3/10")):
+    return {
+        "video_id": video_id,
+        "title": video_id,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "workout_type": workout_type,
+        "duration_minutes": 30,
+        "intervals": [
+            {
+                "start_time": f"{index:02d}:00",
+                "end_time": f"{index + 1:02d}:00",
+                "duration_seconds": 60,
+                "power_level": power,
+                "cadence_rpm": 90,
+                "zone": "main set" if index % 2 == 0 else "recovery",
+                "description": "",
+            }
+            for index, power in enumerate(powers)
+        ],
+    }
+
+
+def test_newest_row_wins_and_torn_tail_is_ignored(tmp_path):
+    store = CorpusStore(str(tmp_path / "corpus"))
+    store.append(_record("a"))
+    store.append(_record("b", "Zone 2", ("4/10",)))
+    store.append(_record("a", "VO2max", ("9/10",)))
+    with open(tmp_path / "corpus" / INTERVALS_FILENAME, "ab") as handle:
+        handle.write(b"\x01\x02\x03")
+
+    records = {record["video_id"]: record for record in store.read().iter_records()}
+
+    assert sorted(records) == ["a", "b"]
+    assert records["a"]["workout_type"] == "VO2max"
+    assert [item["power_level"] for item in records["a"]["intervals"]] == ["9/10"]
+    assert records["b"]["intervals"][0]["start_seconds"] == 0
+
+    store.append(_record("c", powers=("6/10",)))
+    assert len(store.read()) == 3
+
+
+def test_analyze_patterns_reads_the_converted_corpus(tmp_path):
+    source = tmp_path / "processed"
+    source.mkdir()
+    for index, workout_type in enumerate(["HIIT", "HIIT", "Zone 2"]):
+        record = _record(f"v{index}", workout_type, ("7/10", "", "5/10"))
+        (source / f"v{index}.json").write_text(json.dumps(record), encoding="utf-8")
+
+    corpus_dir = str(tmp_path / "corpus")
+    assert build_corpus(str(source), corpus_dir) == 3
+
+    from_json = analyze_patterns(os.path.join(str(source), "*.json"))
+    from_corpus = analyze_patterns(corpus_dir=corpus_dir)
+    assert from_corpus["templates"] == from_json["templates"]
+    assert from_corpus["metadata"]["source_corpus"] == corpus_dir
+
+
+def test_compact_drops_superseded_and_removed_rows(tmp_path):
+    root = tmp_path / "corpus"
+    store = CorpusStore(str(root))
+    store.append(_record("a"))
+    store.append(_record("b", "Zone 2", ("4/10",)))
+    store.append(_record("a", "VO2max", ("9/10",)))
+    store.append(_record("c"))
+    assert store.remove(["c"]) == 1
+    before = list(store.read().iter_records())
+    assert [record["video_id"] for record in before] == ["b", "a"]
+
+    assert store.compact() == 3
+    assert store.compact() == 0
+    assert list(store.read().iter_records()) == before
+    assert os.path.getsize(root / INTERVALS_FILENAME) == 2 * 24
+
+    store.append(_record("c", powers=("6/10",)))
+    assert [record["video_id"] for record in store.read().iter_records()] == ["b", "a", "c"]
+
+
+def test_corpus_groups_missing_and_null_types_like_json(tmp_path):
+    source = tmp_path / "processed"
+    source.mkdir()
+    records = [_record("v0", None), _record("v1"), _record("v2")]
+    del records[1]["workout_type"]
+    for record in records:
+        (source / f"{record['video_id']}.json").write_text(json.dumps(record), encoding="utf-8")
+
+    corpus_dir = str(tmp_path / "corpus")
+    build_corpus(str(source), corpus_dir)
+
+    from_json = analyze_patterns(os.path.join(str(source), "*.json"))
+    from_corpus = analyze_patterns(corpus_dir=corpus_dir)
+    assert from_corpus["templates"] == from_json["templates"]
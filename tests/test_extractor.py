@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from cycling_workout_extractor.pipeline import iter_video_metadata
+
+
+class _FakeRequest:
+    def __init__(self, response):
+        self._response = response
+
+    def execute(self):
+        return self._response
+
+
+class _FakeVideos:
+    def __init__(self, catalogue, calls):
+        self._catalogue = catalogue
+        self._calls = calls
+
+    def list(self, part, id):
+        ids = id.split(",")
+        self._calls.append(ids)
+        items = [self._catalogue[video_id] for video_id in ids if video_id in self._catalogue]
+        return _FakeRequest({"items": items})
+
+
+class _FakeYouTube:
+    def __init__(self, catalogue):
+        self.catalogue = catalogue
+        self.calls: list[list[str]] = []
+
+    def videos(self):
+        return _FakeVideos(self.catalogue, self.calls)
+
+
+def _item(video_id):
+    return {
+        "id": video_id,
+        "snippet": {"title": f"Workout {video_id}", "description": ""},
+        "contentDetails": {"duration": "PT30M"},
+    }
+
+
+def test_iter_video_metadata_batches_and_reports_missing():
+    ids = [f"v{idx:03d}" for idx in range(120)]
+    youtube = _FakeYouTube({video_id: _item(video_id) for video_id in ids if video_id != "v007"})
+
+    results = list(iter_video_metadata(youtube, ids))
+
+    assert [len(call) for call in youtube.calls] == [50, 50, 20]
+    assert [video_id for video_id, _, _ in results] == ids
+    metadata = {video_id: entry for video_id, entry, _ in results}
+    assert metadata["v007"] is None
+    assert metadata["v008"]["duration_minutes"] == 30
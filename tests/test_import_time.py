@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative -X importtime budgets in microseconds. Both entry points measure
+# well under a tenth of these; they exist to catch a heavy import sneaking
+# back onto the startup path, not to benchmark the machine.
+MAIN_BUDGET_US = 400_000
+GENERATOR_BUDGET_US = 250_000
+DEFERRED_MODULES = (
+    "pandas",
+    "numpy",
+    "googleapiclient",
+    "youtube_transcript_api",
+    "requests",
+    "dotenv",
+)
+
+
+def _import_times(module: str, path: str) -> dict[str, int]:
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import sys; sys.path.insert(0, {path!r}); import {module}",
+        ],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize(
+    "module, path, budget",
+    [
+        ("main", ROOT, MAIN_BUDGET_US),
+        ("generate_workout", os.path.join(ROOT, "scripts"), GENERATOR_BUDGET_US),
+    ],
+)
+def test_entry_points_defer_heavy_imports(module, path, budget):
+    times = _import_times(module, path)
+
+    loaded = {name.split(".")[0] for name in times}
+    assert not loaded & set(DEFERRED_MODULES)
+    assert times[module] < budget
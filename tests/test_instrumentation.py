@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import json
+
+from cycling_workout_extractor.instrumentation import VIDEO_STAGES, Metrics, percentile
+from cycling_workout_extractor.pipeline import process_video
+
+
+def test_percentile_uses_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.5) == 50.0
+    assert percentile(values, 0.95) == 95.0
+    assert percentile([3.0], 0.95) == 3.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_process_video_adds_stage_timings_and_report(tmp_path):
+    config = {
+        "output": {"workouts_dir": str(tmp_path / "workouts")},
+        "classification": {"priority": ["HIIT"], "keywords": {"HIIT": ["hiit"]}},
+        "non_workout_keywords": [],
+        "instrumentation": {"summary_timings": True},
+    }
+    metadata = {
+        "title": "HIIT session",
+        "description": "no timestamps here",
+        "duration_seconds": 600,
+        "duration_minutes": 10,
+        "url": "https://www.youtube.com/watch?v=v1",
+    }
+    transcript = [{"text": "main set at 8/10", "start": 0, "duration": 60}]
+    metrics = Metrics()
+    metrics.share("metadata", 0.5, ["v1", "v2"])
+
+    _, row, _ = process_video(
+        "v1", metadata, config, transcript_fetcher=lambda _: transcript, metrics=metrics
+    )
+
+    assert row["intervals_count"] == 1
+    assert row["metadata_ms"] == 250.0
+    assert {f"{stage}_ms" for stage in VIDEO_STAGES} <= set(row)
+
+    metrics.write_report(str(tmp_path / "report.json"))
+    with open(tmp_path / "report.json", "r", encoding="utf-8") as handle:
+        stages = json.load(handle)["stages"]
+    assert stages["parse"]["calls"] == 2
+    assert stages["transcript"]["bytes"] > 0
+    assert stages["write"]["bytes"] > 0
+
+
+def test_profile_covers_the_run_and_a_busy_profiler_only_skips_it(
+    tmp_path, monkeypatch, request
+):
+    import cProfile
+    import tracemalloc
+
+    request.addfinalizer(tracemalloc.stop)
+    metrics = Metrics(str(tmp_path / "profile"))
+    with metrics.stage("parse", "v1"):
+        sum(range(1000))
+    metrics.write_report(str(tmp_path / "report.json"))
+    assert (tmp_path / "profile" / "run.prof").exists()
+    assert (tmp_path / "profile" / "parse.tracemalloc").exists()
+
+    class BusyProfile(cProfile.Profile):
+        def enable(self, *args, **kwargs):
+            raise ValueError("Another profiling tool is already active")
+
+    monkeypatch.setattr(cProfile, "Profile", BusyProfile)
+    metrics = Metrics(str(tmp_path / "busy"))
+    with metrics.stage("parse", "v1"):
+        pass
+    metrics.write_report(str(tmp_path / "busy.json"))
+    assert metrics.report()["stages"]["parse"]["calls"] == 1
+    assert not (tmp_path / "busy" / "run.prof").exists()
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import csv
+
+from cycling_workout_extractor.exporter import SUMMARY_COLUMNS, SummaryWriter
+from cycling_workout_extractor.manifest import Manifest
+
+
+def _metadata(video_id, title="HIIT 30"):
+    return {"video_id": video_id, "title": title, "description": "", "duration_seconds": 1800}
+
+
+def test_manifest_skips_unchanged_videos(tmp_path):
+    path = str(tmp_path / "manifest.jsonl")
+    manifest = Manifest.load(path)
+    items = [("a", _metadata("a"), ""), ("b", _metadata("b"), "")]
+    for video_id, _, _ in manifest.track(items, "s1"):
+        manifest.record(video_id, "ok", "s1")
+    manifest.save()
+
+    reloaded = Manifest.load(path)
+    changed = [("a", _metadata("a", title="HIIT 45"), ""), ("b", _metadata("b"), "")]
+    assert [item[0] for item in reloaded.track(changed, "s1")] == ["a"]
+    assert [item[0] for item in reloaded.track(changed, "s2")] == ["a", "b"]
+
+
+def test_manifest_tombstones_removed_videos(tmp_path):
+    manifest = Manifest(str(tmp_path / "manifest.jsonl"))
+    for video_id in ("a", "b"):
+        manifest.record(video_id, "ok", "s1")
+
+    assert manifest.tombstone_missing(["a"]) == ["b"]
+    assert manifest.tombstone_missing(["a"]) == []
+    assert manifest.entries["b"]["removed"]
+
+
+def test_summary_writer_streams_and_carries_over_kept_rows(tmp_path):
+    summary, review = str(tmp_path / "summary.csv"), str(tmp_path / "review.log")
+    previous = SummaryWriter(summary, review, SUMMARY_COLUMNS)
+    previous.start(
+        [
+            ("a", {"video_id": "a", "status": "ok"}, []),
+            ("c", {"video_id": "c", "status": "ok"}, ["c\tmissing intervals"]),
+            ("d", None, ["d\tmissing metadata"]),
+        ]
+    )
+    previous.finish(
+        [{"video_id": "a", "status": "ok"}, {"video_id": "c", "status": "ok"}],
+        ["c\tmissing intervals", "d\tmissing metadata"],
+    )
+
+    writer = SummaryWriter(summary, review, SUMMARY_COLUMNS)
+    writer.start([("b", {"video_id": "b", "status": "needs_review"}, [])], keep_previous=True)
+    writer.append(("e", {"video_id": "e", "status": "ok"}, ["e\tmissing intervals"]))
+    # Rows are on disk as they settle, ahead of finish().
+    with open(summary, "r", encoding="utf-8") as handle:
+        assert [row["video_id"] for row in csv.DictReader(handle)] == ["b", "e"]
+    writer.finish(
+        [{"video_id": "e", "status": "ok"}, {"video_id": "b", "status": "needs_review"}],
+        ["e\tmissing intervals"],
+        keep_ids={"a", "d"},
+    )
+
+    # Finished files are sorted by video_id, carried-over rows included.
+    with open(summary, "r", encoding="utf-8") as handle:
+        assert [row["video_id"] for row in csv.DictReader(handle)] == ["a", "b", "e"]
+    with open(review, "r", encoding="utf-8") as handle:
+        assert handle.read() == "d\tmissing metadata\ne\tmissing intervals\n"
+    assert not (tmp_path / "summary.csv.previous").exists()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from cycling_workout_extractor.parser import (
+    CueEngine,
+    NO_CUES,
+    cue_engine,
+    parse_description_timestamps,
+    transcript_to_intervals,
+)
+
+
+def test_cue_engine_extracts_every_field_in_one_call():
+    engine = cue_engine()
+
+    cues = engine.extract("main set: for the next thirty seconds hit 8/10 at ninety rpm")
+    assert cues == ("8/10", 90, "main set", 30)
+    assert engine.extract("welcome back, remember to hydrate") is NO_CUES
+    assert engine.extract("effort level 6 with a cadence of 95").cadence == 95
+    # Zone precedence follows keyword order, not position in the text.
+    assert engine.extract("recovery then main set").zone == "main set"
+
+
+def test_config_zone_keywords_extend_the_defaults():
+    engine = CueEngine({"Spin Up": "warmup", "set": "main set", "recovery": "ignored"})
+
+    assert engine.extract("spin up easy").zone == "warmup"
+    assert engine.extract("next set").zone == "main set"
+    assert engine.extract("recovery").zone == "recovery"
+    assert cue_engine({"parser": {"zone_keywords": {"spin up": "warmup"}}}).extract(
+        "spin up"
+    ).zone == "warmup"
+
+
+def test_intervals_use_the_engine():
+    transcript = [
+        {"text": "Welcome back", "start": 0, "duration": 5},
+        {"text": "Cool down for 2 minutes at 3/10", "start": 600, "duration": 4},
+    ]
+    assert transcript_to_intervals(transcript, 700) == [
+        {
+            "start_time": "10:00",
+            "end_time": "11:40",
+            "duration_seconds": 120,
+            "power_level": "3/10",
+            "cadence_rpm": 0,
+            "zone": "cooldown",
+            "description": "Cool down for 2 minutes at 3/10",
+        }
+    ]
+
+    intervals = parse_description_timestamps("0:00 Warm up 90 rpm\n5:00 Main set 8/10", 600)
+    assert [interval["zone"] for interval in intervals] == ["warmup", "main set"]
+    assert intervals[0]["cadence_rpm"] == 90
@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import json
+import os
+
+from cycling_workout_extractor.corpus_store import build_corpus
+from generators.pattern_analyzer import (
+    TemplateStats,
+    analyze_patterns,
+    sync_workouts_to_processed,
+)
+
+
+def _write(directory, name, workout_type, duration, powers):
+    record = {
+        "video_id": name,
+        "workout_type": workout_type,
+        "duration_minutes": duration,
+        "intervals": [
+            {
+                "duration_seconds": 60 * (index + 1),
+                "zone": "recovery" if index % 2 else "main set",
+                "power_level": power,
+                "cadence_rpm": 85 + index,
+            }
+            for index, power in enumerate(powers)
+        ],
+    }
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps(record), encoding="utf-8")
+    return path
+
+
+def test_incremental_analysis_matches_full_rebuild(tmp_path, monkeypatch):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    pattern = os.path.join(str(processed), "*.json")
+    state = str(tmp_path / "state.json")
+    _write(processed, "a", "HIIT", 30, ["7/10", "3/10"])
+    _write(processed, "b", "HIIT", 30, ["9/10"])
+    _write(processed, "c", "Zone 2", 60, ["5/10", "4/10", "5/10"])
+    analyze_patterns(pattern, state_path=state)
+
+    changed = _write(processed, "b", "HIIT", 45, ["8/10", "2/10"])
+    os.utime(changed, ns=(0, 1))
+    (processed / "c.json").unlink()
+    _write(processed, "d", "Zone 2", 60, ["6/10"])
+
+    parsed = []
+    from_record = TemplateStats.from_record
+    monkeypatch.setattr(
+        TemplateStats,
+        "from_record",
+        lambda record: parsed.append(record["video_id"]) or from_record(record),
+    )
+    incremental = analyze_patterns(pattern, state_path=state)
+
+    assert sorted(parsed) == ["b", "d"]
+    full = analyze_patterns(pattern)
+    assert json.dumps(incremental) == json.dumps(full)
+    assert set(full["templates"]["HIIT"]) == {"30", "45"}
+    assert full["templates"]["Zone 2"]["60"]["default_power_level"] == "6/10"
+
+
+def test_numpy_engine_matches_python_engine(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    pattern = os.path.join(str(processed), "*.json")
+    _write(processed, "a", "HIIT", 30, ["7/10", "-1/10", " 8/10", "x"])
+    _write(processed, "b", "HIIT", 30, ["9/10", "", "4"])
+    _write(processed, "c", "Zone 2", 60, ["5/10", "4/10"])
+    _write(processed, "d", "Zone 2", 0, ["5/10"])
+    _write(processed, "e", None, 45, ["2/10", "6/10", "3/10", "1/10"])
+
+    expected = json.dumps(analyze_patterns(pattern))
+    for workers in (1, 2):
+        numpy_payload = analyze_patterns(pattern, engine="numpy", workers=workers)
+        assert json.dumps(numpy_payload) == expected
+
+    corpus = str(tmp_path / "corpus")
+    build_corpus(str(processed), corpus)
+    assert json.dumps(analyze_patterns(corpus_dir=corpus, engine="numpy")) == json.dumps(
+        analyze_patterns(corpus_dir=corpus)
+    )
+
+
+def test_sync_copies_only_changes_and_propagates_deletions(tmp_path):
+    workouts = tmp_path / "workouts"
+    processed = tmp_path / "processed"
+    workouts.mkdir()
+    _write(workouts, "a", "HIIT", 30, ["7/10"])
+    _write(workouts, "b", "HIIT", 30, ["9/10"])
+    processed.mkdir()
+    (processed / "manual.json").write_text("{}", encoding="utf-8")
+
+    first = sync_workouts_to_processed(str(workouts), str(processed))
+    assert [os.path.basename(path) for path in first.copied] == ["a.json", "b.json"]
+    assert (processed / "a.json").read_bytes() == (workouts / "a.json").read_bytes()
+
+    os.utime(workouts / "a.json", ns=(0, 1))
+    _write(workouts, "b", "HIIT", 45, ["8/10"])
+    (workouts / "a.json").rename(workouts / "c.json")
+    second = sync_workouts_to_processed(str(workouts), str(processed))
+    assert [os.path.basename(path) for path in second.changed] == [
+        "b.json",
+        "c.json",
+        "a.json",
+    ]
+
+    third = sync_workouts_to_processed(str(workouts), str(processed))
+    assert third.changed == [] and third.unchanged == 2
+    assert sorted(path.name for path in processed.glob("*.json")) == [
+        "b.json",
+        "c.json",
+        "manual.json",
+    ]
+
+
+def test_changed_paths_narrow_the_refresh(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    pattern = os.path.join(str(processed), "*.json")
+    state = str(tmp_path / "state.json")
+    _write(processed, "a", "HIIT", 30, ["7/10"])
+    _write(processed, "b", "HIIT", 30, ["9/10"])
+    _write(processed, "c", "Zone 2", 60, ["5/10"])
+    analyze_patterns(pattern, state_path=state)
+
+    unlisted = _write(processed, "a", "HIIT", 30, ["1/10"])
+    os.utime(unlisted, ns=(0, 1))
+    listed = _write(processed, "b", "HIIT", 30, ["3/10"])
+    os.utime(listed, ns=(0, 1))
+    (processed / "c.json").unlink()
+    elsewhere = str(tmp_path / "other" / "x.json")
+    payload = analyze_patterns(
+        pattern,
+        state_path=state,
+        changed=[str(listed), str(processed / "c.json"), elsewhere],
+    )
+
+    # c.json is retired; a.json moved outside the list, so it keeps its old
+    # stats (7 and 3 -> 5).
+    assert list(payload["templates"]) == ["HIIT"]
+    assert payload["templates"]["HIIT"]["30"]["default_power_level"] == "5/10"
+    # Without the list every file is checked again.
+    full = analyze_patterns(pattern, state_path=state)
+    assert full["templates"]["HIIT"]["30"]["default_power_level"] == "2/10"
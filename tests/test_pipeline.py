@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import pytest
+
+from cycling_workout_extractor.pipeline import (
+    collect_results,
+    process_videos,
+    triage_item,
+)
+
+
+def _config(tmp_path):
+    return {
+        "output": {"workouts_dir": str(tmp_path / "workouts")},
+        "classification": {
+            "priority": ["HIIT", "Zone 2"],
+            "keywords": {"HIIT": ["hiit"], "Zone 2": ["endurance"]},
+        },
+        "non_workout_keywords": ["announcement"],
+    }
+
+
+def _items():
+    items = []
+    for idx in range(40):
+        video_id = f"v{idx:02d}"
+        title = "Big announcement" if idx % 7 == 0 else f"HIIT session {idx}"
+        metadata = {
+            "video_id": video_id,
+            "title": title,
+            "description": "0:00 Warm up at 5/10\n5:00 Main set 8/10 at 95 rpm",
+            "duration_seconds": 1800,
+            "duration_minutes": 30,
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+        }
+        items.append((video_id, metadata, ""))
+    items.reverse()
+    items.append(("v99", None, ""))
+    items.append(("v98", None, "quota"))
+    return items
+
+
+def test_process_videos_concurrent_output_is_deterministic(tmp_path):
+    config = _config(tmp_path)
+    serial = collect_results(process_videos(_items(), config, workers=1))
+    concurrent = collect_results(process_videos(_items(), config, workers=4))
+
+    assert concurrent == serial
+    rows, entries = concurrent
+    assert [row["video_id"] for row in rows] == sorted(row["video_id"] for row in rows)
+    assert entries[-2:] == ["v98\terror: quota", "v99\tmissing metadata"]
+    assert (tmp_path / "workouts" / "v01.json").exists()
+
+
+def test_in_flight_videos_finish_when_the_items_stop(tmp_path):
+    class QuotaStop(Exception):
+        pass
+
+    def items():
+        yield from _items()[:10]
+        raise QuotaStop()
+
+    results = []
+    with pytest.raises(QuotaStop):
+        for result in process_videos(items(), _config(tmp_path), workers=4):
+            results.append(result[0])
+    assert sorted(results) == sorted(item[0] for item in _items()[:10])
+
+
+def test_triage_item_settles_non_workouts_without_a_fetch(tmp_path):
+    config = _config(tmp_path)
+    items = [
+        {"video_id": "a", "title": "HIIT blast", "description": "", "url": "u/a"},
+        {"video_id": "b", "title": "Season announcement", "description": "", "url": "u/b"},
+        {"video_id": "c", "title": "Easy spin", "description": "", "url": "u/c"},
+    ]
+
+    results = [triage_item(item, config) for item in items]
+    assert results[0] is None and results[2] is None
+    assert results[1][1]["status"] == "skipped"
+    assert results[1][1]["duration_minutes"] is None
+
+    items[2]["duration_minutes"] = 45
+    skipped = triage_item(items[2], config, skip_unknown=True)
+    assert skipped[2] == ["c\tunclassified: Easy spin"]
+    assert skipped[1]["duration_minutes"] == 45
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import pytest
+
+from cycling_workout_extractor.quota import (
+    QuotaExhausted,
+    QuotaScheduler,
+    ScheduledYouTube,
+    estimate_quota,
+)
+
+
+class _Response:
+    def __init__(self, status):
+        self.status = status
+
+
+class _HttpError(Exception):
+    def __init__(self, status, content=b""):
+        super().__init__(status)
+        self.resp = _Response(status)
+        self.content = content
+
+
+class _Client:
+    def __init__(self, key, failures):
+        self.key = key
+        self._failures = failures
+
+    def videos(self):
+        return self
+
+    def list(self, **kwargs):
+        return self
+
+    def execute(self):
+        failures = self._failures.get(self.key, [])
+        if failures:
+            raise failures.pop(0)
+        return {"key": self.key}
+
+
+def _scheduler(tmp_path, keys, failures, **kwargs):
+    return QuotaScheduler(
+        keys,
+        state_path=str(tmp_path / "quota.json"),
+        daily_quota=kwargs.pop("daily_quota", 100),
+        client_factory=lambda key: _Client(key, failures),
+        sleep=lambda seconds: None,
+        **kwargs,
+    )
+
+
+def test_rotates_to_next_key_when_quota_is_exceeded(tmp_path):
+    failures = {"k1": [_HttpError(403, b'{"reason": "quotaExceeded"}')]}
+    scheduler = _scheduler(tmp_path, ["k1", "k2"], failures)
+    youtube = ScheduledYouTube(scheduler)
+
+    assert youtube.videos().list(id="a").execute() == {"key": "k2"}
+    remaining = sorted(scheduler.remaining().values())
+    assert remaining == [0, 99]
+
+
+def test_backs_off_on_rate_limits_and_persists_usage(tmp_path):
+    failures = {"k1": [_HttpError(429), _HttpError(403, b"rateLimitExceeded")]}
+    scheduler = _scheduler(tmp_path, ["k1"], failures)
+    youtube = ScheduledYouTube(scheduler)
+
+    assert youtube.videos().list(id="a").execute() == {"key": "k1"}
+    scheduler.save()
+
+    reloaded = _scheduler(tmp_path, ["k1"], {})
+    assert list(reloaded.remaining().values()) == [97]
+
+
+def test_raises_when_every_key_is_spent(tmp_path):
+    scheduler = _scheduler(tmp_path, ["k1"], {}, daily_quota=1)
+    youtube = ScheduledYouTube(scheduler)
+    youtube.videos().list(id="a").execute()
+
+    with pytest.raises(QuotaExhausted):
+        youtube.videos().list(id="b").execute()
+
+
+def test_non_retryable_errors_are_raised(tmp_path):
+    failures = {"k1": [_HttpError(404)]}
+    scheduler = _scheduler(tmp_path, ["k1"], failures)
+
+    with pytest.raises(_HttpError):
+        ScheduledYouTube(scheduler).videos().list(id="a").execute()
+
+
+def test_estimate_quota():
+    usage = estimate_quota(playlist_count=2, known_videos=120, triaged_videos=20)
+    assert usage == {"playlistItems.list": 5, "videos.list": 2, "total": 7}
+
+
+def test_concurrent_saves_merge_each_processes_spend(tmp_path):
+    first = _scheduler(tmp_path, ["k1", "k2"], {})
+    second = _scheduler(tmp_path, ["k1", "k2"], {})
+    for _ in range(3):
+        ScheduledYouTube(first).videos().list(id="a").execute()
+    for _ in range(5):
+        ScheduledYouTube(second).videos().list(id="a").execute()
+    first.save()
+    second.save()
+    # A second save adds nothing that was already saved.
+    first.save()
+
+    reloaded = _scheduler(tmp_path, ["k1", "k2"], {})
+    assert sum(100 - value for value in reloaded.remaining().values()) == 8
+
+
+def test_quota_failures_do_not_use_up_retries(tmp_path):
+    keys = [f"k{index}" for index in range(6)]
+    quota_error = b'{"reason": "quotaExceeded"}'
+    failures = {key: [_HttpError(403, quota_error)] for key in keys}
+    scheduler = _scheduler(tmp_path, keys, failures, max_retries=2)
+
+    with pytest.raises(QuotaExhausted):
+        ScheduledYouTube(scheduler).videos().list(id="a").execute()
+    assert all(not pending for pending in failures.values())
+
+
+def test_gives_up_after_max_retries(tmp_path):
+    failures = {"k1": [_HttpError(503) for _ in range(4)]}
+    scheduler = _scheduler(tmp_path, ["k1"], failures, max_retries=2)
+
+    with pytest.raises(_HttpError):
+        ScheduledYouTube(scheduler).videos().list(id="a").execute()
+    assert len(failures["k1"]) == 1
@@ -1,6 +1,16 @@
 from __future__ import annotations
 
-from generators.scaler import scale_hiit, scale_zone2
+import pytest
+
+from generators.scaler import (
+    scale_batch,
+    scale_cadence,
+    scale_hiit,
+    scale_power,
+    scale_sweetspot,
+    scale_vo2max,
+    scale_zone2,
+)
 
 
 def test_scale_hiit_interval_count():
@@ -27,3 +37,44 @@ def test_scale_zone2_structure():
     result = scale_zone2(template, 40)
     zones = [interval["zone"] for interval in result["intervals"]]
     assert zones == ["warmup", "main set", "cooldown"]
+
+
+@pytest.mark.parametrize(
+    "scaler",
+    [scale_hiit, scale_zone2, scale_sweetspot, scale_vo2max, scale_power, scale_cadence],
+)
+def test_scale_batch_matches_single_scalers(scaler):
+    templates = [
+        {
+            "duration_minutes": 30,
+            "interval_count": 5,
+            "work_duration_seconds": 45,
+            "rest_duration_seconds": 75,
+            "default_power_level": "7/10",
+            "default_cadence_rpm": 90,
+            "power_profile": ["3/10", "", "8/10", "6/10", "9/10"],
+            "power_by_zone": {"warmup": "4/10", "recovery": "2/10"},
+        },
+        # Base duration 0, no profile and defaults everywhere else.
+        {"duration_minutes": 0, "interval_count": 4, "warmup_minutes": 10},
+        # One interval per 40 minutes lands on halves: round half to even.
+        {"duration_minutes": 40, "interval_count": 1, "work_duration_seconds": 30},
+    ]
+    durations = list(range(20, 125, 5)) + [1, 10, 45, 50]
+    for template in templates:
+        batch = scale_batch(scaler, template, durations)
+        assert batch == [scaler(template, duration) for duration in durations]
+
+    # Variants never share interval dicts.
+    batch[0]["intervals"][0]["power_level"] = "changed"
+    assert all(
+        result["intervals"][0]["power_level"] != "changed" for result in batch[1:]
+    )
+
+
+def test_scale_batch_raises_like_the_scalers_without_cycle_length():
+    template = {"duration_minutes": 30, "work_duration_seconds": 0, "rest_duration_seconds": 0}
+    with pytest.raises(ZeroDivisionError):
+        scale_sweetspot(template, 45)
+    with pytest.raises(ZeroDivisionError):
+        scale_batch(scale_sweetspot, template, [30, 45])
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import json
+
+from cycling_workout_extractor import search
+from cycling_workout_extractor.exporter import write_json
+from cycling_workout_extractor.search import SearchIndex, index_directory
+
+
+def _record(video_id, title, workout_type, duration, cadences, powers):
+    return {
+        "video_id": video_id,
+        "title": title,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "workout_type": workout_type,
+        "duration_minutes": duration,
+        "intervals": [
+            {
+                "duration_seconds": 60,
+                "power_level": power,
+                "cadence_rpm": cadence,
+                "zone": "main set",
+                "description": f"- 1 min @ {power} ({cadence} rpm)",
+            }
+            for cadence, power in zip(cadences, powers)
+        ],
+    }
+
+
+def test_write_json_indexes_text_and_attributes(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    write_json(
+        _record("a", "Sweet Spot Over-Unders", "Sweet Spot", 45, [95, 80], ["8/10", "5/10"]),
+        str(tmp_path / "workouts"),
+        search=index,
+        description="Classic over-unders around threshold",
+    )
+    index.add(_record("b", "Sweet Spot Endurance", "Sweet Spot", 45, [80], ["6/10"]))
+    index.add(_record("c", "Over-Unders Express", "HIIT", 30, [95], ["9/10"]))
+
+    hits = index.search("over-unders", workout_type="Sweet Spot", duration=45, cadence=95)
+    assert [hit.video_id for hit in hits] == ["a"]
+    assert hits[0].snippet == "Sweet Spot [Over-Unders]"
+
+    # Cadence and power must hold for the same interval.
+    assert [hit.video_id for hit in index.search(cadence=95, power=(8, 10))] == ["a", "c"]
+    assert index.search(cadence=80, power=8) == []
+    assert [hit.video_id for hit in index.search(duration=(40, 50))] == ["a", "b"]
+
+
+def test_rewrite_and_remove_replace_previous_entries(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.add(_record("a", "Tempo Climb", "Sweet Spot", 45, [70], ["6/10"]))
+    index.add(_record("a", "Sprint Ladder", "HIIT", 30, [110], ["9/10"]))
+
+    assert index.count() == 1
+    assert index.search("tempo") == []
+    assert [hit.video_id for hit in index.search("ladder", cadence=110)] == ["a"]
+    assert index.search(cadence=70) == []
+
+    assert index.remove("a")
+    assert index.search("ladder") == []
+    assert not index.remove("a")
+
+
+def test_rebuild_drops_workouts_missing_from_the_directory(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    index.add(_record("gone", "Tempo Climb", "Sweet Spot", 45, [70], ["6/10"]))
+    workouts = tmp_path / "workouts"
+    workouts.mkdir()
+    record = _record("kept", "Sprint Ladder", "HIIT", 30, [110], ["9/10"])
+    (workouts / "kept.json").write_text(json.dumps(record), encoding="utf-8")
+
+    assert index_directory(index, str(workouts)) == 1
+    assert [hit.video_id for hit in index.search()] == ["kept"]
+    assert index.search("tempo") == []
+
+
+def test_every_plan_returns_the_same_hits(tmp_path, monkeypatch):
+    index = SearchIndex(str(tmp_path / "search.db"))
+    for number in range(60):
+        index.add(
+            _record(
+                f"v{number:02d}",
+                "Over-Unders" if number % 3 else "Endurance",
+                "HIIT" if number % 2 else "Sweet Spot",
+                30 + 15 * (number % 3),
+                [80 + 5 * (number % 5), 95],
+                [f"{number % 10}/10", "5/10"],
+            )
+        )
+    index.add(_record("v05", "Recovery Spin", "Zone 2", 60, [70], ["2/10"]))
+    index.remove("v07")
+    # The planner counts follow rewrites and removals.
+    kept = index._conn.execute(
+        "SELECT value, row_count FROM interval_counts "
+        "WHERE column_name = 'cadence_rpm' AND row_count > 0"
+    ).fetchall()
+    recounted = index._conn.execute(
+        "SELECT cadence_rpm, COUNT(*) FROM intervals GROUP BY cadence_rpm"
+    ).fetchall()
+    assert kept == recounted
+
+    query = dict(text="over-unders", workout_type="HIIT", duration=(40, 50), power=(7, 9))
+    expected = ["v19", "v37", "v49"]
+    assert [hit.video_id for hit in index.search(**query)] == expected
+    plans = [
+        (search._SCAN, None),
+        (search._WORKOUTS, None),
+        (search._INTERVALS, "power"),
+    ]
+    for plan in plans:
+        monkeypatch.setattr(search, "_choose_plan", lambda *args, plan=plan: plan)
+        assert [hit.video_id for hit in index.search(**query)] == expected
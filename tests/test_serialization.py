@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from cycling_workout_extractor import serialization
+from cycling_workout_extractor.serialization import GZIP, PRETTY, Serializer
+
+RECORD = {
+    "video_id": "v1",
+    "title": "Zwift – Sweet Spot",
+    "duration_minutes": 30,
+    "intervals": [{"zone": "main set", "power_level": "7/10", "cadence_rpm": 90}],
+}
+
+
+@pytest.mark.parametrize(
+    "serializer",
+    [Serializer(), Serializer(PRETTY), Serializer(compression=GZIP)],
+    ids=["compact", "pretty", "gzip"],
+)
+def test_round_trip_detects_framing(tmp_path, serializer):
+    path = str(tmp_path / "v1.json")
+    written = serializer.dump(RECORD, path)
+
+    assert written == (tmp_path / "v1.json").stat().st_size
+    assert serialization.load(path) == RECORD
+
+
+def test_formats_match_stdlib_layouts(monkeypatch):
+    assert Serializer(PRETTY).dumps(RECORD) == json.dumps(RECORD, indent=2).encode()
+
+    payload = {**RECORD, "by_duration": {30: "HIIT", None: ""}}
+    compact = Serializer().dumps(payload)
+    monkeypatch.setattr(serialization, "_orjson", lambda: None)
+    assert Serializer().dumps(payload) == compact
+    assert serialization.loads(compact)["by_duration"] == {"30": "HIIT", "null": ""}
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pytest
+
+from cycling_workout_extractor.extractor import iter_playlist_items
+from cycling_workout_extractor.parser import transcript_to_intervals
+from cycling_workout_extractor.pipeline import iter_video_metadata
+from cycling_workout_extractor.quota import QuotaExhausted, QuotaScheduler, ScheduledYouTube
+from cycling_workout_extractor.simulator import YouTubeSimulator
+
+
+def test_playlists_paginate_over_the_synthetic_catalog():
+    simulator = YouTubeSimulator(["PL1", "PL2"], videos=230)
+    client = simulator.client("key")
+
+    first = list(iter_playlist_items(client, "PL1"))
+    second = list(iter_playlist_items(client, "PL2"))
+    ids = {item["video_id"] for item in first + second}
+
+    assert len(ids) == 230
+    assert len(first) + len(second) > 230
+    assert simulator.calls["playlistItems.list"] == 6
+
+    metadata = list(iter_video_metadata(client, sorted(ids)[:60]))
+    assert len(metadata) == 60
+    assert all(entry["duration_seconds"] > 0 for _, entry, _ in metadata)
+    assert simulator.calls["videos.list"] == 2
+
+
+def test_transcripts_are_deterministic_and_parseable():
+    simulator = YouTubeSimulator(["PL1"], videos=50, seed=3)
+    transcripts = [simulator.fetch_transcript(f"sim{index:08d}") for index in range(50)]
+
+    assert transcripts == [
+        YouTubeSimulator(["PL1"], videos=50, seed=3).fetch_transcript(f"sim{index:08d}")
+        for index in range(50)
+    ]
+    assert any(transcript_to_intervals(segments, 3600) for segments in transcripts)
+    assert simulator.fetch_transcript("unknown") == []
+
+
+def test_quota_exhaustion_surfaces_through_the_scheduler(tmp_path):
+    simulator = YouTubeSimulator(["PL1"], videos=500, quota_units=3)
+    scheduler = QuotaScheduler(
+        ["a", "b"],
+        state_path=str(tmp_path / "quota.json"),
+        client_factory=simulator.client,
+        sleep=lambda seconds: None,
+    )
+
+    with pytest.raises(QuotaExhausted):
+        list(iter_playlist_items(ScheduledYouTube(scheduler), "PL1"))
+    assert simulator.calls["playlistItems.list"] == 8
+
+
+def test_playlist_pages_are_computed_without_listing_the_catalog():
+    def member(index, slot, count):
+        return index % count == slot or (index % 20 == 0 and (index + 1) % count == slot)
+
+    simulator = YouTubeSimulator(["PL1", "PL2", "PL3"], videos=1001)
+    client = simulator.client("key")
+    for slot, playlist_id in enumerate(simulator.playlist_ids):
+        ids = [item["video_id"] for item in iter_playlist_items(client, playlist_id)]
+        assert ids == [f"sim{index:08d}" for index in range(1001) if member(index, slot, 3)]
+
+    # A page deep into a huge catalog costs the same as the first one.
+    simulator = YouTubeSimulator(["PL1", "PL2", "PL3"], videos=1_000_000_000)
+    page = simulator.playlist_page("key", "PL2", "300000000", 50)
+    indexes = [int(item["contentDetails"]["videoId"][3:]) for item in page["items"]]
+    assert len(indexes) == 50 and indexes[0] > 800_000_000
+    window = range(indexes[0], indexes[-1] + 1)
+    assert [index for index in window if member(index, 1, 3)] == indexes
+    assert page["nextPageToken"] == "300000050"
+
+
+def test_simulated_runs_keep_their_quota_state_in_memory(tmp_path):
+    config = {
+        "api": {"quota_state": str(tmp_path / "quota.json")},
+        "output": {"logs_dir": str(tmp_path)},
+    }
+    simulator = YouTubeSimulator(["PL1"], videos=10, keys=2)
+    scheduler = QuotaScheduler.from_config(
+        config, simulator.api_keys, state_path=None, client_factory=simulator.client
+    )
+
+    list(iter_playlist_items(ScheduledYouTube(scheduler), "PL1"))
+    scheduler.save()
+    assert simulator.api_keys == ["simulated-0", "simulated-1"]
+    assert not (tmp_path / "quota.json").exists()
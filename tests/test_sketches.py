@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import random
+import statistics
+
+import numpy as np
+import pytest
+
+from generators.sketches import Histogram
+
+
+def test_histogram_matches_median_and_numpy_quantiles():
+    rng = random.Random(7)
+    for size in (1, 2, 3, 10, 101, 1000):
+        values = [rng.randint(-3, 12) for _ in range(size)]
+        histogram = Histogram(values)
+
+        assert histogram.median() == statistics.median(values)
+        for fraction in (0.0, 0.1, 0.25, 0.5, 0.9, 0.95, 1.0):
+            assert histogram.quantile(fraction) == pytest.approx(
+                np.quantile(values, fraction)
+            )
+
+
+def test_shards_merge_and_subtract_exactly():
+    left = Histogram([60, 60, 90, 120])
+    right = Histogram([30, 60])
+
+    merged = Histogram().merge(left).merge(right)
+    assert merged == Histogram([60, 60, 90, 120, 30, 60])
+    assert len(merged) == 6
+
+    merged.subtract(right)
+    assert merged == left
+    with pytest.raises(ValueError):
+        merged.subtract(right)
+    assert Histogram.from_pairs(left.to_pairs()) == left
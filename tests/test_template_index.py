@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+from generators.template_index import TemplateIndex
+
+
+def _template(duration, count, work, rest, power="7/10"):
+    return {
+        "duration_minutes": duration,
+        "interval_count": count,
+        "work_duration_seconds": work,
+        "rest_duration_seconds": rest,
+        "work_rest_ratio": f"{work}:{rest}" if work and rest else "",
+        "default_power_level": power,
+    }
+
+
+TEMPLATES = {
+    "HIIT": {
+        "30": _template(30, 10, 60, 60),
+        "40": _template(40, 30, 30, 90),
+        "45": _template(45, 12, 60, 60),
+        "60": _template(60, 8, 120, 0, ""),
+    },
+    "Zone 2": {"40": _template(40, 12, 600, 60, "5/10")},
+}
+
+
+def test_nearest_uses_every_constraint_given():
+    index = TemplateIndex(TEMPLATES)
+
+    assert index.nearest(workout_type="HIIT", duration_minutes=40)[0].template is (
+        TEMPLATES["HIIT"]["40"]
+    )
+    best = index.nearest(
+        workout_type="HIIT", duration_minutes=40, interval_count=12, work_rest_ratio="1:1"
+    )[0]
+    assert best.template is TEMPLATES["HIIT"]["45"]
+
+    ranked = index.nearest(k=10, interval_count=12, default_power_level="5/10")
+    assert [match.template for match in ranked[:2]] == [
+        TEMPLATES["Zone 2"]["40"],
+        TEMPLATES["HIIT"]["45"],
+    ]
+    assert len(ranked) == 5
+    assert [match.distance for match in ranked] == sorted(match.distance for match in ranked)
+    assert index.nearest(workout_type="Cadence", duration_minutes=30) == []
+
+
+def test_weights_and_constraints_are_validated():
+    heavy = TemplateIndex(TEMPLATES, {"duration_minutes": 100.0})
+    assert heavy.nearest(
+        workout_type="HIIT", duration_minutes=40, interval_count=12, work_rest_ratio="1:1"
+    )[0].template is TEMPLATES["HIIT"]["40"]
+
+    with pytest.raises(ValueError):
+        TemplateIndex(TEMPLATES, {"tempo": 1.0})
+    with pytest.raises(ValueError):
+        heavy.nearest(cadence=90)
+    with pytest.raises(ValueError):
+        heavy.nearest(work_rest_ratio="hard")
+    for k in (0, -1):
+        with pytest.raises(ValueError):
+            heavy.nearest(k=k, duration_minutes=40)
+
+
+def test_generator_picks_the_best_fitting_template(tmp_path, monkeypatch):
+    from generators import workout_generator
+    from generators.pattern_analyzer import TEMPLATE_VERSION
+    from generators.template_manager import get_template, template_catalog
+    from generators.workout_generator import WorkoutGenerator
+
+    path = tmp_path / "templates.json"
+    payload = {"metadata": {"template_version": TEMPLATE_VERSION}, "templates": TEMPLATES}
+    path.write_text(json.dumps(payload), encoding="utf-8")
+    monkeypatch.setattr(workout_generator, "template_catalog", lambda: template_catalog(str(path)))
+    monkeypatch.setattr(
+        workout_generator,
+        "get_template",
+        lambda workout_type, duration: get_template(workout_type, duration, str(path)),
+    )
+
+    generator = WorkoutGenerator()
+    assert generator.best_template("HIIT", 40) == TEMPLATES["HIIT"]["40"]
+    assert generator.best_template("HIIT", 40, interval_count=None) == TEMPLATES["HIIT"]["40"]
+    assert (
+        generator.best_template("HIIT", 40, interval_count=12, work_rest_ratio="1:1")
+        == TEMPLATES["HIIT"]["45"]
+    )
+    weighted = WorkoutGenerator.from_config(
+        {"templates": {"nearest_weights": {"duration_minutes": 100.0}}}
+    )
+    assert (
+        weighted.best_template("HIIT", 40, interval_count=12, work_rest_ratio="1:1")
+        == TEMPLATES["HIIT"]["40"]
+    )
+
+    workout = generator.generate(40, "HIIT", interval_count=12, work_rest_ratio="1:1")
+    # The 45-minute template's 60s/60s cycles, scaled to 40 minutes.
+    assert [interval["duration_seconds"] for interval in workout["intervals"][:2]] == [60, 60]
+    assert workout["duration_minutes"] == 40
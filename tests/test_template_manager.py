@@ -3,13 +3,16 @@ from __future__ import annotations
 import json
 import os
 
+from generators.pattern_analyzer import TEMPLATE_VERSION, SyncReport, TemplateStats
 from generators.template_manager import get_template, load_templates
 
 
 def test_load_templates_creates_file(tmp_path, monkeypatch):
+    # load_templates syncs ./workouts into ./data/processed first.
+    monkeypatch.chdir(tmp_path)
     template_path = tmp_path / "workout_templates.json"
-    processed_dir = tmp_path / "processed"
-    processed_dir.mkdir()
+    processed_dir = tmp_path / "data" / "processed"
+    processed_dir.mkdir(parents=True)
 
     sample = {
         "video_id": "x",
@@ -45,3 +48,127 @@ def test_load_templates_creates_file(tmp_path, monkeypatch):
 
     template = get_template("HIIT", 30, str(template_path))
     assert template is not None
+
+
+def test_catalog_is_cached_until_the_file_changes(tmp_path, monkeypatch):
+    from generators import template_manager
+
+    def write(durations):
+        payload = {
+            "metadata": {"template_version": TEMPLATE_VERSION},
+            "templates": {
+                "HIIT": {str(value): {"duration_minutes": value} for value in durations}
+            },
+        }
+        path.write_text(json.dumps(payload), encoding="utf-8")
+
+    path = tmp_path / "templates.json"
+    write([20, 40, 60])
+    loads = []
+    load_templates = template_manager.load_templates
+    monkeypatch.setattr(
+        template_manager,
+        "load_templates",
+        lambda target: loads.append(target) or load_templates(target),
+    )
+
+    assert get_template("HIIT", 30, str(path))["duration_minutes"] == 20
+    assert get_template("HIIT", 55, str(path))["duration_minutes"] == 60
+    assert get_template("HIIT", 90, str(path))["duration_minutes"] == 60
+    assert get_template("Zone 2", 30, str(path)) is None
+    assert len(loads) == 1
+
+    write([30, 45])
+    os.utime(path, ns=(0, 1))
+    assert get_template("HIIT", 40, str(path))["duration_minutes"] == 45
+    assert get_template("HIIT", 10, str(path))["duration_minutes"] == 30
+    assert len(loads) == 2
+
+
+def test_regeneration_is_single_flight(tmp_path, monkeypatch):
+    import fcntl
+    import multiprocessing
+    import time
+
+    from generators import template_manager
+
+    path = tmp_path / "templates.json"
+    rebuilds = tmp_path / "rebuilds"
+
+    def analyze(state_path, changed):
+        with open(rebuilds, "a", encoding="utf-8") as handle:
+            handle.write("x")
+        time.sleep(0.2)
+        return {"metadata": {"template_version": TEMPLATE_VERSION}, "templates": {}}
+
+    monkeypatch.setattr(
+        template_manager, "sync_workouts_to_processed", lambda: SyncReport([], [], 0)
+    )
+    monkeypatch.setattr(template_manager, "analyze_patterns", analyze)
+
+    # Without a file every caller waits on the one rebuild.
+    context = multiprocessing.get_context("fork")
+    workers = [
+        context.Process(target=load_templates, args=(str(path),)) for _ in range(4)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert rebuilds.read_text() == "x"
+    assert load_templates(str(path))["metadata"]["template_version"] == TEMPLATE_VERSION
+
+    # With an outdated file, callers serve it while a rebuild holds the lock.
+    stale = {"metadata": {"template_version": 0}, "templates": {"HIIT": {}}}
+    path.write_text(json.dumps(stale), encoding="utf-8")
+    with open(f"{path}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        assert load_templates(str(path)) == stale
+        # The stale catalog is served but not cached.
+        assert get_template("HIIT", 30, str(path)) is None
+        fcntl.flock(lock, fcntl.LOCK_UN)
+    assert rebuilds.read_text() == "x"
+    # The other rebuild never wrote; the next lookup rebuilds itself.
+    assert get_template("HIIT", 30, str(path)) is None
+    assert rebuilds.read_text() == "xx"
+    assert load_templates(str(path))["metadata"]["template_version"] == TEMPLATE_VERSION
+    assert rebuilds.read_text() == "xx"
+
+
+def test_refresh_reparses_only_changed_workouts(tmp_path, monkeypatch):
+    from generators.template_manager import refresh_templates
+
+    monkeypatch.chdir(tmp_path)
+    workouts = tmp_path / "workouts"
+    workouts.mkdir()
+
+    def write(name, power):
+        record = {
+            "video_id": name,
+            "workout_type": "HIIT",
+            "duration_minutes": 30,
+            "intervals": [{"duration_seconds": 60, "zone": "main set", "power_level": power}],
+        }
+        (workouts / f"{name}.json").write_text(json.dumps(record), encoding="utf-8")
+
+    write("a", "7/10")
+    write("b", "9/10")
+    path = os.path.join("data", "templates", "workout_templates.json")
+    assert refresh_templates(path)["templates"]["HIIT"]["30"]["default_power_level"] == "8/10"
+
+    parsed = []
+    from_record = TemplateStats.from_record
+    monkeypatch.setattr(
+        TemplateStats,
+        "from_record",
+        lambda record: parsed.append(record["video_id"]) or from_record(record),
+    )
+    refresh_templates(path)
+    assert parsed == []
+
+    write("b", "5/10")
+    os.utime(workouts / "b.json", ns=(0, 1))
+    payload = refresh_templates(path)
+    assert parsed == ["b"]
+    assert payload["templates"]["HIIT"]["30"]["default_power_level"] == "6/10"
+    assert load_templates(path) == payload
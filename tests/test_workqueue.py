@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from cycling_workout_extractor.workqueue import WorkQueue
+
+
+def test_claims_do_not_overlap_and_results_merge(tmp_path):
+    path = str(tmp_path / "queue.db")
+    queue = WorkQueue(path)
+    queue.enqueue(["c", "a", "b", "d"])
+
+    other = WorkQueue(path)
+    first = queue.claim("w1", 2)
+    second = other.claim("w2", 5)
+    assert first == ["a", "b"]
+    assert second == ["c", "d"]
+    assert queue.claim("w1", 5) == []
+
+    for video_id in first:
+        assert queue.complete("w1", (video_id, {"video_id": video_id}, []), fingerprint="f")
+    # Only the lease owner can settle a video.
+    queue.mark_unchanged("w1", ["c", "d"])
+    assert not queue.complete("w1", ("c", None, []))
+    other.mark_unchanged("w2", ["c"])
+    other.release("w2", ["d"])
+    assert queue.counts() == {"done": 2, "unchanged": 1, "pending": 1}
+    assert [result[0] for result, _ in queue.results()] == ["a", "b"]
+
+
+def test_expired_leases_are_retried_then_abandoned(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=-1, max_attempts=2)
+    queue.enqueue(["a"])
+
+    assert queue.claim("w1", 1) == ["a"]
+    assert queue.claim("w2", 1) == ["a"]
+    assert queue.claim("w3", 1) == []
+
+    (result, _), = queue.results()
+    assert result == ("a", None, ["a\terror: abandoned after 2 attempts"])
+
+
+def test_completing_after_the_lease_expired_is_refused(tmp_path):
+    queue = WorkQueue(str(tmp_path / "queue.db"), lease_seconds=-1)
+    queue.enqueue(["a"])
+
+    assert queue.claim("w1", 1) == ["a"]
+    assert not queue.complete("w1", ("a", {"video_id": "a"}, []))
+    assert queue.counts() == {"leased": 1}
+    assert queue.claim("w2", 1) == ["a"]